@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework',
     'rest_framework.authtoken',
@@ -54,6 +55,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -139,14 +141,124 @@ MEDIA_URL = '/static/media/'
 STATIC_ROOT = '/vol/web/static'
 MEDIA_ROOT = '/vol/web/media'
 
+# Uploads are stored once per distinct content, see core.storage.
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+
+# Deployments set core.storage.CompressedManifestStaticFilesStorage, which
+# hashes collected file names and writes .gz/.br copies for the proxy.
+# It needs collectstatic to have run, so it is not the default.
+STATICFILES_STORAGE = os.environ.get(
+    "STATICFILES_STORAGE",
+    'django.contrib.staticfiles.storage.StaticFilesStorage',
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'core.User'
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Bounded store for cached list responses; point API_CACHE_BACKEND and
+    # API_CACHE_LOCATION at a shared cache to share entries across workers.
+    'api-responses': {
+        'BACKEND': os.environ.get(
+            "API_CACHE_BACKEND",
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get("API_CACHE_LOCATION", 'api-responses'),
+        'TIMEOUT': int(os.environ.get("API_CACHE_TIMEOUT", 300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get("API_CACHE_MAX_ENTRIES", 200)),
+            'CULL_FREQUENCY': int(os.environ.get("API_CACHE_CULL_FREQUENCY", 3)),
+        },
+    },
+}
+
+# Per-user list response cache, see recipe.mixins.CachedListMixin.
+# MAX_ENTRIES * MAX_ENTRY_BYTES bounds the LocMemCache of each uWSGI
+# worker, about 50 MiB by default.
+RESPONSE_CACHE = {
+    'CACHE': 'api-responses',
+    'MAX_ENTRY_BYTES': int(os.environ.get("API_CACHE_MAX_ENTRY_BYTES", 256 * 1024)),
+}
+
+# In-process LRU (plus optional shared cache alias) for token lookups,
+# see user.authentication.CachedTokenAuthentication.
+TOKEN_AUTH_CACHE = {
+    'MAX_ENTRIES': int(os.environ.get("TOKEN_AUTH_CACHE_MAX_ENTRIES", 10000)),
+    'TTL': int(os.environ.get("TOKEN_AUTH_CACHE_TTL", 60)),
+    'SHARED_CACHE': os.environ.get("TOKEN_AUTH_SHARED_CACHE") or None,
+}
+
+# Tag/ingradient autocomplete, see recipe.autocomplete. Suggestions are
+# cached in-process per user, prefix and data version.
+AUTOCOMPLETE = {
+    'LIMIT': 10,
+    'MAX_LIMIT': 50,
+    'CACHE_MAX_ENTRIES': int(os.environ.get("AUTOCOMPLETE_CACHE_MAX_ENTRIES", 10000)),
+    'CACHE_TTL': int(os.environ.get("AUTOCOMPLETE_CACHE_TTL", 60)),
+}
+
+# Resized copies of uploaded recipe images, generated by a bounded pool
+# of background threads, see recipe.images.
+IMAGE_PROCESSING = {
+    'WORKERS': int(os.environ.get("IMAGE_WORKERS", 2)),
+    'MAX_PENDING': int(os.environ.get("IMAGE_MAX_PENDING", 64)),
+    'EAGER': False,
+    'QUALITY': 85,
+    'VARIANTS': {
+        'thumb': {'size': (200, 200), 'format': 'JPEG', 'list': True},
+        'medium': {'size': (800, 800), 'format': 'JPEG'},
+        'webp': {'size': (800, 800), 'format': 'WEBP'},
+    },
+}
+
+# Resumable chunked image uploads, see recipe.uploads. Chunks must fit
+# within the proxy's client_max_body_size.
+IMAGE_UPLOAD = {
+    'MAX_BYTES': int(os.environ.get("IMAGE_UPLOAD_MAX_BYTES", 10 << 20)),
+    'MAX_CHUNK_BYTES': int(os.environ.get("IMAGE_UPLOAD_MAX_CHUNK_BYTES", 1 << 20)),
+    'EXPIRES': int(os.environ.get("IMAGE_UPLOAD_EXPIRES", 86400)),
+}
+
+# Brotli or gzip for responses of these types, see
+# core.middleware.CompressionMiddleware. Smaller responses are sent as
+# they are; streamed ones are flushed every STREAM_FLUSH_BYTES of input.
+RESPONSE_COMPRESSION = {
+    'MIN_SIZE': int(os.environ.get("COMPRESSION_MIN_SIZE", 1024)),
+    'GZIP_LEVEL': int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6)),
+    'BROTLI_QUALITY': int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 4)),
+    'STREAM_FLUSH_BYTES': 64 * 1024,
+    # Only the API's own media types. HTML pages carry CSRF tokens next
+    # to reflected input, which compression would expose to BREACH.
+    'TYPES': [
+        'application/json',
+        'application/msgpack',
+        'application/x-ndjson',
+        'text/csv',
+        'application/vnd.oai.openapi',
+    ],
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # JSON is encoded and decoded with orjson. MessagePack is only used
+    # when a client asks for application/msgpack.
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'core.renderers.MessagePackRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        'core.parsers.MessagePackParser',
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
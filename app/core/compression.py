@@ -0,0 +1,115 @@
+"""
+gzip and Brotli encoding for API responses and collected static files.
+"""
+import zlib
+
+import brotli
+from django.conf import settings
+
+
+def get_config():
+    """Return the RESPONSE_COMPRESSION setting."""
+    return getattr(settings, "RESPONSE_COMPRESSION", {})
+
+
+class GzipEncoder:
+    """Incremental gzip stream."""
+    coding = "gzip"
+    extension = ".gz"
+
+    def __init__(self, level=6):
+        # 16 + MAX_WBITS writes a gzip header and trailer around deflate.
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        """Return everything compressed so far, keeping the stream open."""
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    """Incremental Brotli stream."""
+    coding = "br"
+    extension = ".br"
+
+    def __init__(self, quality=4):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        """Return everything compressed so far, keeping the stream open."""
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def get_encoder(coding, config=None):
+    """Return a new encoder for coding at the configured level."""
+    config = get_config() if config is None else config
+    if coding == "br":
+        return BrotliEncoder(config.get("BROTLI_QUALITY", 4))
+    return GzipEncoder(config.get("GZIP_LEVEL", 6))
+
+
+def compress(data, encoder):
+    """Return data compressed in one go."""
+    return encoder.compress(data) + encoder.finish()
+
+
+def compress_stream(chunks, encoder, flush_bytes=64 * 1024):
+    """
+    Yield chunks compressed as one stream.
+
+    Output is flushed after every flush_bytes of input rather than after
+    each chunk, so small chunks such as one row each still compress well
+    while the client keeps receiving data as it is produced.
+    """
+    pending = 0
+    for chunk in chunks:
+        data = encoder.compress(chunk)
+        pending += len(chunk)
+        if pending >= flush_bytes:
+            data += encoder.flush()
+            pending = 0
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+def negotiate(accept_encoding, codings=("br", "gzip")):
+    """
+    Return the first of codings the Accept-Encoding header allows.
+
+    The highest q-value wins; ties go to the earlier of codings. "*"
+    covers codings the header does not name and q=0 refuses one.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+
+    best, best_weight = None, 0.0
+    for coding in codings:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
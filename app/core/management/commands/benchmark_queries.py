@@ -0,0 +1,278 @@
+"""
+Django command to benchmark the query plans of the hot recipe queries.
+
+Seed a large dataset, print the plans, then compare them without the
+indexes the hot queries rely on:
+
+    python manage.py benchmark_queries --recipes 1000000 --keep
+    python manage.py benchmark_queries --reuse --keep --no-indexes
+    python manage.py benchmark_queries --reuse
+
+--no-indexes drops only MEASURED_INDEXES for the run and recreates them
+from their saved definitions afterwards; other migrations are untouched.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Exists, F, OuterRef
+
+from core.models import Ingradient, Recipe, Tag, User
+from recipe import autocomplete
+
+EMAIL_DOMAIN = "@benchmark.invalid"
+
+MEASURED_INDEXES = [
+    "recipe_user_id_desc_idx",
+    "core_recipe_tags_tag_id_recipe_idx",
+    "core_recipe_ingradients_ingradient_id_recipe_idx",
+    "recipe_search_vector_gin_idx",
+    "core_tag_upper_name_trgm_idx",
+    "core_ingradient_upper_name_trgm_idx",
+]
+
+
+class Command(BaseCommand):
+    """Django command to seed data and EXPLAIN the hot recipe queries."""
+
+    help = "Seed a benchmark dataset and EXPLAIN the hot recipe queries."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=1_000_000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument(
+            "--tags", type=int, default=50,
+            help="Tags and ingradients per user.",
+        )
+        parser.add_argument(
+            "--reuse", action="store_true",
+            help="Use the dataset left by a previous --keep run.",
+        )
+        parser.add_argument(
+            "--keep", action="store_true",
+            help="Leave the dataset in place afterwards.",
+        )
+        parser.add_argument(
+            "--no-indexes", action="store_true",
+            help="Explain without the measured indexes, then restore them.",
+        )
+        parser.add_argument(
+            "--analyze", action="store_true",
+            help="Run the queries (EXPLAIN ANALYZE) and report timings.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if not options["reuse"]:
+            started = time.monotonic()
+            self.seed(options["recipes"], options["users"], options["tags"])
+            self.stdout.write(
+                f"Seeded {options['recipes']} recipes in "
+                f"{time.monotonic() - started:.1f}s"
+            )
+
+        user = User.objects.filter(
+            email__endswith=EMAIL_DOMAIN
+        ).order_by("id").first()
+        if user is None:
+            self.stderr.write("No benchmark data, run without --reuse.")
+            return
+
+        dropped = self.drop_indexes() if options["no_indexes"] else []
+        try:
+            for name, queryset in self.hot_queries(user):
+                self.explain(name, queryset, options["analyze"])
+        finally:
+            self.restore_indexes(dropped)
+            if not options["keep"]:
+                self.cleanup()
+
+    def drop_indexes(self):
+        """Drop the measured indexes; return their definitions."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname, indexdef FROM pg_indexes "
+                "WHERE indexname = ANY(%s)",
+                [MEASURED_INDEXES],
+            )
+            dropped = cursor.fetchall()
+            for name, _ in dropped:
+                cursor.execute(f'DROP INDEX "{name}"')
+        self.stdout.write(
+            f"Dropped {', '.join(name for name, _ in dropped) or 'nothing'}"
+        )
+        return dropped
+
+    def restore_indexes(self, dropped):
+        """Recreate indexes dropped by drop_indexes()."""
+        with connection.cursor() as cursor:
+            # Inside a transaction, deferred foreign key checks from the
+            # seed must run before an index can be built on the table.
+            if dropped and connection.in_atomic_block:
+                cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            for _, definition in dropped:
+                cursor.execute(definition)
+
+    def seed(self, recipes, users, tags):
+        """Insert users, recipes, tags, ingradients and links in bulk."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {User._meta.db_table} "
+                "(password, is_superuser, email, name, is_active, is_staff) "
+                "SELECT '!', false, 'bench-' || g || %s, '', "
+                "true, false FROM generate_series(1, %s) g RETURNING id",
+                [EMAIL_DOMAIN, users],
+            )
+            user_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute(
+                f"INSERT INTO {Recipe._meta.db_table} "
+                "(user_id, title, time_minutes, price, description, link, "
+                "image_variants) "
+                "SELECT (%s::bigint[])[1 + g %% %s], 'Recipe ' || g, 10, "
+                "5.00, repeat('description ', 20), '', '{}' "
+                "FROM generate_series(1, %s) g",
+                [user_ids, users, recipes],
+            )
+            for model, field in ((Tag, "tags"), (Ingradient, "ingradients")):
+                through = Recipe._meta.get_field(field).remote_field.through
+                target = Recipe._meta.get_field(field).m2m_reverse_name()
+                cursor.execute(
+                    f"INSERT INTO {model._meta.db_table} (user_id, name) "
+                    "SELECT u, 'name ' || n FROM unnest(%s::bigint[]) u, "
+                    "generate_series(1, %s) n",
+                    [user_ids, tags],
+                )
+                cursor.execute(
+                    f"INSERT INTO {through._meta.db_table} "
+                    f"(recipe_id, {target}) "
+                    f"SELECT r.id, t.id FROM {Recipe._meta.db_table} r "
+                    f"JOIN {model._meta.db_table} t ON t.user_id = r.user_id "
+                    "AND t.name IN ('name ' || (1 + r.id / %s %% %s), "
+                    "'name ' || (1 + (r.id / %s + 1) %% %s)) "
+                    "WHERE r.user_id = ANY(%s)",
+                    [users, tags, users, tags, user_ids],
+                )
+            # VACUUM fills the visibility map so index-only scans are
+            # chosen; it cannot run inside a transaction.
+            analyze = "ANALYZE" if connection.in_atomic_block else (
+                "VACUUM ANALYZE"
+            )
+            tables = [
+                model._meta.db_table
+                for model in (User, Recipe, Tag, Ingradient)
+            ] + [
+                Recipe._meta.get_field(field).remote_field.through
+                ._meta.db_table
+                for field in ("tags", "ingradients")
+            ]
+            for table in tables:
+                cursor.execute(f"{analyze} {table}")
+
+    def hot_queries(self, user):
+        """Return (name, queryset) for the queries the API runs most."""
+        recipes = Recipe.objects.filter(user=user)
+        middle = recipes.order_by("id").values_list("id", flat=True)[
+            recipes.count() // 2
+        ]
+        tag = Tag.objects.filter(user=user).order_by("id").first()
+        ing = Ingradient.objects.filter(user=user).order_by("id").first()
+        search = SearchQuery(
+            recipes.get(id=middle).title, config="english",
+        )
+
+        return [
+            ("recipe list", recipes.order_by("-id")),
+            ("recipe page", recipes.order_by("-id")[:50]),
+            (
+                "recipe page after cursor",
+                recipes.filter(id__lt=middle).order_by("-id")[:50],
+            ),
+            (
+                "recipes by tag",
+                recipes.filter(Exists(Recipe.tags.through.objects.filter(
+                    recipe_id=OuterRef("pk"), tag_id__in=[tag.id],
+                ))).order_by("-id"),
+            ),
+            (
+                "recipes by ingradient",
+                recipes.filter(Exists(
+                    Recipe.ingradients.through.objects.filter(
+                        recipe_id=OuterRef("pk"), ingradient_id__in=[ing.id],
+                    )
+                )).order_by("-id"),
+            ),
+            (
+                "recipe search",
+                recipes.filter(search_vector=search).annotate(
+                    rank=SearchRank(F("search_vector"), search)
+                ).order_by("-rank", "-id"),
+            ),
+            ("tag list", Tag.objects.filter(user=user).order_by("-name")),
+            (
+                "tag autocomplete",
+                autocomplete.suggestions(
+                    Tag.objects.filter(user=user), "name 1"
+                ).values("id", "name")[:10],
+            ),
+            # Across every user, so the trigram index on UPPER(name) is
+            # the cheapest way in rather than the user_id index.
+            (
+                "tag names containing",
+                Tag.objects.filter(name__icontains="ame 42"),
+            ),
+            (
+                "ingradient list",
+                Ingradient.objects.filter(user=user).order_by("-name"),
+            ),
+        ]
+
+    def explain(self, name, queryset, analyze):
+        """Print the plan of queryset and a one-line summary."""
+        plan = queryset.explain(analyze=analyze)
+        nodes = [
+            node for node in (
+                "Seq Scan", "Sort", "Index Only Scan", "Index Scan",
+                "Bitmap Heap Scan", "Bitmap Index Scan",
+            )
+            if node in plan
+        ]
+        summary = ", ".join(nodes) or "no scans"
+        timing = [
+            line.strip() for line in plan.splitlines()
+            if line.startswith("Execution Time")
+        ]
+        if timing:
+            summary += f" ({timing[0]})"
+
+        self.stdout.write(self.style.SUCCESS(f"{name}: {summary}"))
+        self.stdout.write(plan)
+
+    def cleanup(self):
+        """Remove the benchmark dataset."""
+        users = (
+            f"SELECT id FROM {User._meta.db_table} WHERE email LIKE %s"
+        )
+        recipes = (
+            f"SELECT id FROM {Recipe._meta.db_table} "
+            f"WHERE user_id IN ({users})"
+        )
+        pattern = ["%" + EMAIL_DOMAIN]
+        with connection.cursor() as cursor:
+            for field in ("tags", "ingradients"):
+                through = Recipe._meta.get_field(field).remote_field.through
+                cursor.execute(
+                    f"DELETE FROM {through._meta.db_table} "
+                    f"WHERE recipe_id IN ({recipes})",
+                    pattern,
+                )
+            for model in (Recipe, Tag, Ingradient):
+                cursor.execute(
+                    f"DELETE FROM {model._meta.db_table} "
+                    f"WHERE user_id IN ({users})",
+                    pattern,
+                )
+            cursor.execute(
+                f"DELETE FROM {User._meta.db_table} WHERE email LIKE %s",
+                pattern,
+            )
@@ -0,0 +1,151 @@
+"""
+Django command to time serializing and rendering a large recipe list.
+
+Seeds recipes for a throwaway user inside a transaction that is rolled
+back afterwards, then compares the DRF serializers against the .values()
+fast path, queries included, and DRF's stdlib JSON renderer and parser
+against the orjson and MessagePack ones:
+
+    python manage.py benchmark_serializers --recipes 10000
+"""
+import time
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Ingradient, Recipe, Tag, User
+from core.parsers import MessagePackParser, ORJSONParser
+from core.renderers import MessagePackRenderer, ORJSONRenderer
+from recipe.fastpath import ValuesSerializer
+from recipe.serializers import RecipeSerializer
+from recipe.views import RELATION_PREFETCHES
+
+
+class Rollback(Exception):
+    """Raised to roll the seeded data back."""
+
+
+class Command(BaseCommand):
+    """Django command to benchmark recipe list serialization."""
+
+    help = "Benchmark recipe list serializers, renderers and parsers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=10000)
+        parser.add_argument(
+            "--tags", type=int, default=5,
+            help="Tags and ingradients linked to each recipe.",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            with transaction.atomic():
+                user = self.seed(options["recipes"], options["tags"])
+                data = self.run(user, options["repeat"])
+                self.run_renderers(data, options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, recipes, tags):
+        """Create a user whose recipes each link to tags and ingradients."""
+        user = User.objects.create_user("bench@benchmark.invalid", "x")
+        vocabulary = {
+            model: model.objects.bulk_create(
+                model(user=user, name=f"{model.__name__} {i}")
+                for i in range(tags * 4)
+            )
+            for model in (Tag, Ingradient)
+        }
+        created = Recipe.objects.bulk_create(
+            Recipe(
+                user=user, title=f"Recipe {i}", time_minutes=i % 120,
+                price=Decimal(i % 4000) / 100, link="http://example.com/r",
+            )
+            for i in range(recipes)
+        )
+        for field, model in (("tags", Tag), ("ingradients", Ingradient)):
+            m2m = Recipe._meta.get_field(field)
+            through = m2m.remote_field.through
+            source, target = m2m.m2m_column_name(), m2m.m2m_reverse_name()
+            objs = vocabulary[model]
+            through.objects.bulk_create(
+                through(**{
+                    source: recipe.id,
+                    target: objs[(n + i) % len(objs)].id,
+                })
+                for n, recipe in enumerate(created)
+                for i in range(tags)
+            )
+        return user
+
+    def best_of(self, repeat, function, *args):
+        """Return (fastest time of repeat calls, result)."""
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = function(*args)
+            best = min(best, time.perf_counter() - started)
+        return best, result
+
+    def run(self, user, repeat):
+        """Time both paths, check they render the same; return the data."""
+        context = {"request": RequestFactory().get("/api/recipe/recipes/")}
+        queryset = Recipe.objects.filter(user=user).order_by("-id")
+        renderer = JSONRenderer()
+
+        def serializer():
+            return RecipeSerializer(
+                queryset.prefetch_related(*RELATION_PREFETCHES),
+                many=True, context=context,
+            ).data
+
+        def fast_path():
+            fast = ValuesSerializer(RecipeSerializer, context=context)
+            return ValuesSerializer(
+                RecipeSerializer, queryset.values(*fast.columns()),
+                many=True, context=context,
+            ).data
+
+        results = {}
+        for name, build in (
+            ("RecipeSerializer", serializer), ("ValuesSerializer", fast_path)
+        ):
+            best, data = self.best_of(repeat, build)
+            results[name] = best, renderer.render(data)
+            self.stdout.write(
+                f"{name}: {best * 1000:.0f} ms for {len(data)} recipes"
+            )
+
+        (slow, slow_body), (fast, fast_body) = results.values()
+        if slow_body != fast_body:
+            self.stderr.write("Rendered JSON differs between the paths!")
+        self.stdout.write(self.style.SUCCESS(
+            f"Speedup: {slow / fast:.1f}x, identical output: "
+            f"{slow_body == fast_body}"
+        ))
+        return data
+
+    def run_renderers(self, data, repeat):
+        """Time rendering data and parsing it back in each format."""
+        for renderer, parser in (
+            (JSONRenderer(), JSONParser()),
+            (ORJSONRenderer(), ORJSONParser()),
+            (MessagePackRenderer(), MessagePackParser()),
+        ):
+            render, body = self.best_of(repeat, renderer.render, data)
+            parse, _ = self.best_of(
+                repeat, lambda: parser.parse(BytesIO(body))
+            )
+            self.stdout.write(
+                f"{type(renderer).__name__}: render {render * 1000:.0f} ms, "
+                f"{type(parser).__name__}: parse {parse * 1000:.0f} ms, "
+                f"{len(body)} bytes"
+            )
@@ -0,0 +1,237 @@
+"""
+Django command to remove uploaded media that nothing references any more.
+
+    python manage.py gc_media --dry-run
+    python manage.py gc_media --quarantine /vol/web/quarantine
+"""
+import os
+import re
+import shutil
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import ImageBlob, ImageUpload, Recipe
+from core.storage import ContentAddressedStorage
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+
+
+def scan(path):
+    """Yield (DirEntry, storage name) for every file under path."""
+    root = settings.MEDIA_ROOT
+    try:
+        entries = os.scandir(path)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from scan(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry, os.path.relpath(entry.path, root)
+
+
+def batched(items, size):
+    """Yield lists of at most size items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    """Django command to garbage collect orphaned media files."""
+
+    help = "Delete or quarantine uploaded files no recipe references."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only report what would be removed.",
+        )
+        parser.add_argument(
+            "--quarantine", metavar="DIR",
+            help="Move orphans under DIR instead of deleting them.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="File names checked against the database per query.",
+        )
+        parser.add_argument(
+            "--min-age", type=int, default=3600,
+            help="Skip files modified less than this many seconds ago.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.options = options
+        self.cutoff = time.time() - options["min_age"]
+        variants = "|".join(
+            re.escape(name)
+            for name in getattr(settings, "IMAGE_PROCESSING", {}).get(
+                "VARIANTS", {}
+            )
+        )
+        # Variants written before content-addressed storage were named
+        # after their image: <image stem>_<variant>.<ext>.
+        self.variant_re = variants and re.compile(
+            rf"^(.*)_(?:{variants})\.\w+$"
+        )
+
+        started = time.monotonic()
+        totals = [0, 0, 0]
+        for directory, referenced, remove in (
+            (
+                os.path.join("uploads", "recipe"),
+                self.referenced_uploads, self.remove,
+            ),
+            (
+                ContentAddressedStorage.prefix,
+                self.referenced_blobs, self.remove_blob,
+            ),
+            (
+                os.path.join("uploads", "partial"),
+                self.referenced_partials, self.remove,
+            ),
+        ):
+            stats = self.collect(directory, referenced, remove)
+            totals = [total + n for total, n in zip(totals, stats)]
+
+        if not options["dry_run"]:
+            self.expire_uploads()
+
+        elapsed = time.monotonic() - started
+        scanned, orphans, size = totals
+        verb = "Would remove" if options["dry_run"] else "Removed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {orphans} of {scanned} files ({size} bytes) in "
+            f"{elapsed:.1f}s, {scanned / max(elapsed, 1e-6):.0f} files/s"
+        ))
+
+    def collect(self, directory, referenced, remove):
+        """Remove orphans in directory; return (scanned, orphans, bytes)."""
+        scanned = orphans = size = 0
+        path = os.path.join(settings.MEDIA_ROOT, directory)
+        for batch in batched(scan(path), self.options["batch_size"]):
+            scanned += len(batch)
+            candidates = [
+                (entry, name) for entry, name in batch
+                if entry.stat().st_mtime < self.cutoff
+            ]
+            keep = referenced([name for _, name in candidates])
+            for entry, name in candidates:
+                if name in keep:
+                    continue
+                file_size = entry.stat().st_size
+                if not remove(entry.path, name):
+                    continue
+                orphans += 1
+                size += file_size
+
+        self.stdout.write(
+            f"{directory}: {orphans} orphaned of {scanned} files"
+        )
+        return scanned, orphans, size
+
+    def remove(self, path, name):
+        """Delete or quarantine the orphan at path; return True."""
+        if self.options["verbosity"] > 1:
+            self.stdout.write(f"  {name}")
+        if self.options["dry_run"]:
+            return True
+
+        quarantine = self.options["quarantine"]
+        if quarantine:
+            target = os.path.join(quarantine, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(path, target)
+        else:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return True
+
+    def remove_blob(self, path, name):
+        """
+        Remove the orphaned blob at path unless a save now references it.
+
+        The blob's row is locked, created with no references if missing,
+        so a concurrent save either committed its reference first and
+        the blob is kept, or waits for the row and then finds the file
+        gone and writes it again.
+        """
+        if self.options["dry_run"]:
+            return self.remove(path, name)
+
+        with transaction.atomic():
+            blob, _ = ImageBlob.objects.select_for_update().get_or_create(
+                name=name, defaults={"refs": 0}
+            )
+            if blob.refs:
+                return False
+            blob.delete()
+            return self.remove(path, name)
+
+    def referenced_uploads(self, names):
+        """Return the names a recipe uses as its image or an image variant."""
+        variants_of = {}
+        for name in names:
+            match = self.variant_re and self.variant_re.match(name)
+            if match:
+                for ext in IMAGE_EXTENSIONS:
+                    variants_of.setdefault(match.group(1) + ext, []).append(
+                        name
+                    )
+
+        used = set(Recipe.objects.filter(
+            image__in=list(names) + list(variants_of)
+        ).values_list("image", flat=True))
+        for image in list(used):
+            used.update(variants_of.get(image, []))
+
+        return used
+
+    def referenced_blobs(self, names):
+        """Return the blobs that still hold a reference."""
+        return set(ImageBlob.objects.filter(
+            name__in=names, refs__gt=0
+        ).values_list("name", flat=True))
+
+    def referenced_partials(self, names):
+        """Return the partial files of uploads that may still resume."""
+        ids = {
+            os.path.splitext(os.path.basename(name))[0]: name
+            for name in names
+        }
+        live = ImageUpload.objects.filter(
+            id__in=[i for i in ids if self.is_uuid(i)],
+            created_at__gte=self.upload_cutoff(),
+        ).values_list("id", flat=True)
+
+        return {ids[str(upload_id)] for upload_id in live}
+
+    @staticmethod
+    def is_uuid(value):
+        """Return whether value looks like a UUID."""
+        return re.fullmatch(r"[0-9a-f-]{36}", value) is not None
+
+    def upload_cutoff(self):
+        """Return when the oldest resumable upload may have been opened."""
+        expires = getattr(settings, "IMAGE_UPLOAD", {}).get("EXPIRES", 86400)
+        return timezone.now() - timedelta(seconds=expires)
+
+    def expire_uploads(self):
+        """Delete the rows of uploads too old to resume."""
+        ImageUpload.objects.filter(
+            created_at__lt=self.upload_cutoff()
+        ).delete()
@@ -0,0 +1,329 @@
+"""
+Django command to bulk load recipes from a JSON Lines file.
+
+Each line is a recipe as written by the export action:
+
+    {"user": "cook@example.com", "title": "Dal", "time_minutes": 30,
+     "price": "4.50", "description": "", "link": "",
+     "tags": ["Veg"], "ingradients": ["Lentils", "Salt"]}
+
+"user" may be left out when --user is given. Each batch is committed
+together with the file offset it ends at, so an interrupted import picks
+up exactly where it stopped when run again with the same file.
+"""
+import csv
+import io
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+
+from core.models import (
+    ImportCheckpoint,
+    Ingradient,
+    Recipe,
+    Tag,
+    User,
+    UserDataVersion,
+)
+
+RELATIONS = (("tags", Tag), ("ingradients", Ingradient))
+
+
+def text(value, name, max_length=None):
+    """Return value as text PostgreSQL accepts, or raise ValueError."""
+    value = str(value)
+    if "\x00" in value:
+        raise ValueError(f"{name} must not contain NUL characters.")
+    if max_length is not None and len(value) > max_length:
+        raise ValueError(f"{name} must be at most {max_length} characters.")
+    return value
+
+
+class Command(BaseCommand):
+    """Django command to import recipes from JSON Lines in bulk."""
+
+    help = "Stream recipes from a JSON Lines file into the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSON Lines file to import.")
+        parser.add_argument(
+            "--user", metavar="EMAIL",
+            help="Owner of recipes whose line has no \"user\".",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=10000,
+            help="Recipes written per transaction.",
+        )
+        parser.add_argument(
+            "--restart", action="store_true",
+            help="Ignore a previous run's checkpoint and start over.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        path = options["path"]
+        if not os.path.isfile(path):
+            raise CommandError(f"No such file: {path}")
+
+        self.default_user = options["user"]
+        self.users = {}
+        self.names = {model: {} for _, model in RELATIONS}
+        self.use_copy = connection.vendor == "postgresql"
+
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+            source=os.path.realpath(path)
+        )
+        if options["restart"] or checkpoint.offset > os.path.getsize(path):
+            checkpoint.offset = checkpoint.lines = checkpoint.rows = 0
+        elif checkpoint.offset:
+            self.stdout.write(
+                f"Resuming after line {checkpoint.lines} "
+                f"({checkpoint.rows} recipes already imported)"
+            )
+
+        started = time.monotonic()
+        imported = self.errors = 0
+        with open(path, "rb") as file:
+            file.seek(checkpoint.offset)
+            batch = []
+            for line in file:
+                checkpoint.offset += len(line)
+                checkpoint.lines += 1
+                if not line.strip():
+                    continue
+                try:
+                    batch.append(self.parse(line))
+                except (
+                    ValueError, KeyError, TypeError, InvalidOperation
+                ) as error:
+                    self.errors += 1
+                    self.stderr.write(f"Line {checkpoint.lines}: {error}")
+                if len(batch) >= options["batch_size"]:
+                    imported += self.load(batch, checkpoint)
+                    self.progress(checkpoint, imported, started)
+                    batch = []
+            imported += self.load(batch, checkpoint)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} recipes in {elapsed:.1f}s "
+            f"({imported / max(elapsed, 1e-6):.0f} rows/s), "
+            f"{self.errors} lines skipped"
+        ))
+
+    def parse(self, line):
+        """Return (email, recipe fields, {relation: names}) for a line."""
+        data = json.loads(line)
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object.")
+        email = data.get("user") or self.default_user
+        if not email:
+            raise ValueError("No user; pass --user or add \"user\".")
+        email = text(email, "user")
+        title = text(data["title"], "title", 255)
+        if not title:
+            raise ValueError("title must be 1 to 255 characters.")
+        time_minutes = int(data["time_minutes"])
+        low, high = connection.ops.integer_field_range("IntegerField")
+        if not low <= time_minutes <= high:
+            raise ValueError(f"Invalid time_minutes {time_minutes}.")
+        try:
+            price = Decimal(str(data["price"])).quantize(Decimal("0.01"))
+            if not price.is_finite() or abs(price) >= 1000:
+                raise InvalidOperation
+        except InvalidOperation:
+            raise ValueError(f"Invalid price {data['price']!r}.")
+        link = text(data.get("link") or "", "link", 255)
+
+        fields = {
+            "title": title,
+            "time_minutes": time_minutes,
+            "price": price,
+            "description": text(data.get("description") or "", "description"),
+            "link": link,
+        }
+        relations = {
+            field: sorted({
+                text(name, field, 255) for name in data.get(field) or []
+            })
+            for field, _ in RELATIONS
+        }
+        for names in relations.values():
+            if not all(names):
+                raise ValueError("Names must be 1 to 255 characters.")
+        return email, fields, relations
+
+    def resolve_users(self, emails):
+        """Fill self.users with the ids of emails."""
+        missing = set(emails) - self.users.keys()
+        if missing:
+            self.users.update(
+                User.objects.filter(email__in=missing).values_list(
+                    "email", "id"
+                )
+            )
+
+    def resolve_names(self, model, keys):
+        """Fill self.names[model] for (user_id, name) keys, creating any."""
+        known = self.names[model]
+        missing = set(keys) - known.keys()
+        if not missing:
+            return
+
+        def select():
+            rows = model.objects.filter(
+                user_id__in={user for user, _ in missing},
+                name__in={name for _, name in missing},
+            ).values_list("user_id", "name", "id")
+            for user_id, name, pk in rows:
+                if (user_id, name) in missing:
+                    known[user_id, name] = pk
+
+        select()
+        new = [key for key in missing if key not in known]
+        if new:
+            model.objects.bulk_create(
+                [model(user_id=user, name=name) for user, name in new],
+                ignore_conflicts=True,
+            )
+            select()
+
+    def load(self, batch, checkpoint):
+        """Write batch and checkpoint in one transaction; return rows."""
+        self.resolve_users(email for email, _, _ in batch)
+        rows = []
+        for email, fields, relations in batch:
+            user_id = self.users.get(email)
+            if user_id is None:
+                self.stderr.write(f"Unknown user {email}, recipe skipped")
+                continue
+            rows.append((user_id, fields, relations))
+
+        try:
+            with transaction.atomic():
+                self.write(rows)
+                checkpoint.rows += len(rows)
+                checkpoint.save()
+            return len(rows)
+        except DatabaseError:
+            self.forget_names()
+
+        # Something in the batch was refused; write its rows one at a
+        # time so only the bad ones are skipped and the import moves on.
+        written = 0
+        with transaction.atomic():
+            for row in rows:
+                try:
+                    with transaction.atomic():
+                        self.write([row])
+                    written += 1
+                except DatabaseError as error:
+                    self.forget_names()
+                    self.errors += 1
+                    self.stderr.write(
+                        f"Recipe {row[1]['title']!r} skipped: {error}"
+                    )
+            checkpoint.rows += written
+            checkpoint.save()
+
+        return written
+
+    def write(self, rows):
+        """Insert rows with their links and bump their owners' versions."""
+        for field, model in RELATIONS:
+            self.resolve_names(model, {
+                (user_id, name)
+                for user_id, _, relations in rows
+                for name in relations[field]
+            })
+        if not rows:
+            return
+        ids = self.insert_recipes(rows)
+        for field, model in RELATIONS:
+            self.insert_links(field, model, ids, rows)
+        for user_id in {user_id for user_id, _, _ in rows}:
+            UserDataVersion.bump(user_id)
+
+    def forget_names(self):
+        """Drop cached name ids, which a rolled-back write may have made."""
+        for known in self.names.values():
+            known.clear()
+
+    def insert_recipes(self, rows):
+        """Insert the recipes of rows; return their ids in order."""
+        if not self.use_copy:
+            recipes = Recipe.objects.bulk_create([
+                Recipe(user_id=user_id, **fields)
+                for user_id, fields, _ in rows
+            ])
+            return [recipe.id for recipe in recipes]
+
+        table = Recipe._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+                "FROM generate_series(1, %s)",
+                [table, len(rows)],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            self.copy(cursor, table, [
+                "id", "user_id", "title", "time_minutes", "price",
+                "description", "link", "image_variants",
+            ], (
+                [pk, user_id, f["title"], f["time_minutes"], f["price"],
+                 f["description"], f["link"], "{}"]
+                for pk, (user_id, f, _) in zip(ids, rows)
+            ))
+
+        return ids
+
+    def insert_links(self, field, model, ids, rows):
+        """Link the inserted recipes to their tags or ingradients."""
+        m2m = Recipe._meta.get_field(field)
+        through = m2m.remote_field.through
+        source, target = m2m.m2m_column_name(), m2m.m2m_reverse_name()
+        names = self.names[model]
+        links = [
+            (recipe_id, names[user_id, name])
+            for recipe_id, (user_id, _, relations) in zip(ids, rows)
+            for name in relations[field]
+        ]
+        if not links:
+            return
+
+        if not self.use_copy:
+            through.objects.bulk_create([
+                through(**{source: recipe_id, target: pk})
+                for recipe_id, pk in links
+            ])
+            return
+
+        with connection.cursor() as cursor:
+            self.copy(cursor, through._meta.db_table, [source, target], links)
+
+    def copy(self, cursor, table, columns, rows):
+        """COPY rows into columns of table as CSV."""
+        buffer = io.StringIO()
+        # Quoting every value keeps empty strings from loading as NULL.
+        csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+        buffer.seek(0)
+        # copy_expert() bypasses Django's cursor wrapper, so translate its
+        # errors to Django's DatabaseError here.
+        with connection.wrap_database_errors:
+            cursor.copy_expert(
+                f"COPY {table} ({', '.join(columns)}) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+
+    def progress(self, checkpoint, imported, started):
+        """Report progress after a batch."""
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"line {checkpoint.lines}: {imported} recipes, "
+            f"{imported / max(elapsed, 1e-6):.0f} rows/s"
+        )
@@ -0,0 +1,80 @@
+"""
+Middleware shared by the APIs.
+"""
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from core import compression
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with Brotli or gzip, as the client accepts.
+
+    Only RESPONSE_COMPRESSION TYPES are compressed, and ordinary responses
+    below MIN_SIZE bytes or that would not shrink are sent as they are.
+    HTML and responses setting the CSRF cookie never are, whatever TYPES
+    says, as compressing secrets beside reflected input enables BREACH.
+    Streamed responses, whose size is unknown, are compressed as they are
+    streamed. Like Django's GZipMiddleware, a compressed response's ETag
+    is made weak, which conditional requests still match.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        config = compression.get_config()
+        if not self.is_compressible(response, config):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        coding = compression.negotiate(
+            request.META.get("HTTP_ACCEPT_ENCODING", "")
+        )
+        if coding is None:
+            return response
+
+        encoder = compression.get_encoder(coding, config)
+        if response.streaming:
+            response.streaming_content = compression.compress_stream(
+                response.streaming_content,
+                encoder,
+                config.get("STREAM_FLUSH_BYTES", 64 * 1024),
+            )
+            if response.has_header("Content-Length"):
+                del response.headers["Content-Length"]
+        else:
+            content = compression.compress(response.content, encoder)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers["Content-Length"] = str(len(content))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = coding
+
+        return response
+
+    def is_compressible(self, response, config):
+        """Return whether response may be sent compressed."""
+        if response.has_header("Content-Encoding"):
+            return False
+        if response.status_code == 206:
+            return False
+        if not response.streaming and (
+            len(response.content) < config.get("MIN_SIZE", 1024)
+        ):
+            return False
+
+        if settings.CSRF_COOKIE_NAME in response.cookies:
+            return False
+
+        content_type = response.get("Content-Type", "").split(";")[0]
+        content_type = content_type.strip().lower()
+        if content_type == "text/html":
+            return False
+        return content_type.startswith(tuple(config.get("TYPES", ())))
@@ -0,0 +1,49 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:28
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def _dedupe(apps, model_name, field_name):
+    """Merge rows sharing (user, name) into the lowest id before the
+    unique constraint is added, moving their recipe links over."""
+    model = apps.get_model('core', model_name)
+    through = getattr(apps.get_model('core', 'Recipe'), field_name).through
+    fk = f'{model_name.lower()}_id'
+
+    dupes = (
+        model.objects.values('user_id', 'name')
+        .annotate(keep=Min('id'), n=Count('id'))
+        .filter(n__gt=1)
+    )
+    for dupe in dupes.iterator():
+        extra = list(
+            model.objects.filter(user_id=dupe['user_id'], name=dupe['name'])
+            .exclude(id=dupe['keep'])
+            .values_list('id', flat=True)
+        )
+        recipe_ids = set(
+            through.objects.filter(**{f'{fk}__in': extra})
+            .values_list('recipe_id', flat=True)
+        )
+        through.objects.bulk_create(
+            [through(recipe_id=r, **{fk: dupe['keep']}) for r in recipe_ids],
+            ignore_conflicts=True,
+        )
+        model.objects.filter(id__in=extra).delete()
+
+
+def dedupe_names(apps, schema_editor):
+    _dedupe(apps, 'Tag', 'tags')
+    _dedupe(apps, 'Ingradient', 'ingradients')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_names, migrations.RunPython.noop),
+    ]
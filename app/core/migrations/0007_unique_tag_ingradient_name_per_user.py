@@ -0,0 +1,21 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_dedupe_tag_ingradient_names'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='ingradient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_ingradient_name_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_tag_name_per_user'),
+        ),
+    ]
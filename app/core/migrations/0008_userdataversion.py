@@ -0,0 +1,34 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def create_versions(apps, schema_editor):
+    User = apps.get_model('core', 'User')
+    UserDataVersion = apps.get_model('core', 'UserDataVersion')
+    UserDataVersion.objects.bulk_create(
+        UserDataVersion(user_id=user_id)
+        for user_id in User.objects.values_list('id', flat=True).iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_unique_tag_ingradient_name_per_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDataVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='data_version', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.BigIntegerField(default=0)),
+                ('modified_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
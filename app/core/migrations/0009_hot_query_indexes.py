@@ -0,0 +1,32 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:38
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+def reverse_index(table, column):
+    """Index a recipe link table by its target, covering recipe_id."""
+    name = f'{table}_{column}_recipe_idx'
+    return migrations.RunSQL(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" '
+        f'ON "{table}" ("{column}", "recipe_id");',
+        f'DROP INDEX CONCURRENTLY IF EXISTS "{name}";',
+    )
+
+
+class Migration(migrations.Migration):
+    # Built concurrently so large tables stay writable during the deploy.
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_userdataversion'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(fields=['user', '-id'], name='recipe_user_id_desc_idx'),
+        ),
+        reverse_index('core_recipe_tags', 'tag_id'),
+        reverse_index('core_recipe_ingradients', 'ingradient_id'),
+    ]
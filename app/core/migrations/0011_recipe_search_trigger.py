@@ -0,0 +1,78 @@
+from django.db import migrations
+
+VECTOR = (
+    "setweight(to_tsvector('english', coalesce({row}.title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce({row}.description, '')), 'B')"
+)
+
+CREATE_TRIGGER = f"""
+CREATE OR REPLACE FUNCTION core_recipe_search_vector_update()
+RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {VECTOR.format(row='NEW')};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_recipe_search_vector_trigger
+BEFORE INSERT OR UPDATE OF title, description ON core_recipe
+FOR EACH ROW EXECUTE FUNCTION core_recipe_search_vector_update();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS core_recipe_search_vector_trigger ON core_recipe;
+DROP FUNCTION IF EXISTS core_recipe_search_vector_update();
+"""
+
+BACKFILL_BATCH = 10000
+
+
+def create_search(apps, schema_editor):
+    """Install the trigger, backfill in batches and build the GIN index.
+
+    PostgreSQL only; other databases fall back to substring search.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(CREATE_TRIGGER)
+        cursor.execute('SELECT coalesce(max(id), 0) FROM core_recipe')
+        last_id = cursor.fetchone()[0]
+        for start in range(0, last_id, BACKFILL_BATCH):
+            cursor.execute(
+                f'UPDATE core_recipe SET search_vector = '
+                f'{VECTOR.format(row="core_recipe")} '
+                f'WHERE id > %s AND id <= %s',
+                [start, start + BACKFILL_BATCH],
+            )
+        cursor.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS '
+            'recipe_search_vector_gin_idx '
+            'ON core_recipe USING gin (search_vector)'
+        )
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'DROP INDEX CONCURRENTLY IF EXISTS recipe_search_vector_gin_idx'
+        )
+        cursor.execute(DROP_TRIGGER)
+
+
+class Migration(migrations.Migration):
+    # Non-atomic so the backfill commits per batch and the index can be
+    # built concurrently on a live table.
+    atomic = False
+
+    dependencies = [
+        ('core', '0010_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search, drop_search),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations
+
+TABLES = ('core_tag', 'core_ingradient')
+
+
+def create_indexes(apps, schema_editor):
+    """Index tag and ingradient names for trigram and ILIKE lookups.
+
+    Skipped when the server does not ship pg_trgm; autocomplete then
+    falls back to unindexed substring matching.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for table in TABLES:
+            cursor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_name_trgm_idx '
+                f'ON {table} USING gin (name gin_trgm_ops)'
+            )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        for table in TABLES:
+            cursor.execute(
+                f'DROP INDEX CONCURRENTLY IF EXISTS {table}_name_trgm_idx'
+            )
+
+
+class Migration(migrations.Migration):
+    # Built concurrently so large tables stay writable during the deploy.
+    atomic = False
+
+    dependencies = [
+        ('core', '0011_recipe_search_trigger'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
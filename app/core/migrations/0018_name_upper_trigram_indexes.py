@@ -0,0 +1,63 @@
+from django.db import migrations
+
+TABLES = ('core_tag', 'core_ingradient')
+
+
+def has_trigram(cursor):
+    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    return cursor.fetchone() is not None
+
+
+def index_upper_names(apps, schema_editor):
+    """Index UPPER(name), which istartswith and icontains compare.
+
+    Django compiles both lookups to UPPER("name"::text) LIKE UPPER(%s),
+    which the index on the raw column cannot answer. Autocomplete also
+    matches trigram similarity on UPPER(name), so the raw index goes.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        if not has_trigram(cursor):
+            return
+        for table in TABLES:
+            cursor.execute(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS '
+                f'{table}_upper_name_trgm_idx '
+                f'ON {table} USING gin ((UPPER(name)) gin_trgm_ops)'
+            )
+            cursor.execute(
+                f'DROP INDEX CONCURRENTLY IF EXISTS {table}_name_trgm_idx'
+            )
+
+
+def index_names(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        if not has_trigram(cursor):
+            return
+        for table in TABLES:
+            cursor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_name_trgm_idx '
+                f'ON {table} USING gin (name gin_trgm_ops)'
+            )
+            cursor.execute(
+                'DROP INDEX CONCURRENTLY IF EXISTS '
+                f'{table}_upper_name_trgm_idx'
+            )
+
+
+class Migration(migrations.Migration):
+    # Built concurrently so large tables stay writable during the deploy.
+    atomic = False
+
+    dependencies = [
+        ('core', '0017_importcheckpoint'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_upper_names, index_names),
+    ]
@@ -1,4 +1,7 @@
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models import F
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,  # contains functionality for
     # authentication system (no fields)
@@ -68,10 +71,38 @@ class Recipe(models.Model):
     tags = models.ManyToManyField("Tag")
     ingradients = models.ManyToManyField("Ingradient")
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # Read from the image once when it is uploaded, so clients can lay
+    # out recipes without fetching it (see recipe.images.image_metadata).
+    image_width = models.PositiveIntegerField(null=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, editable=False)
+    image_size = models.PositiveIntegerField(null=True, editable=False)
+    image_placeholder = models.CharField(
+        max_length=64, null=True, editable=False,
+    )
+    # Storage names of the resized copies of image, keyed by variant
+    # name; filled in the background after upload (see recipe.images).
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Weighted title/description vector, kept current by a database
+    # trigger on PostgreSQL (see migration 0011) and GIN indexed there.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Serves the per-user list ordered by -id without a sort, and
+            # keyset pagination's "id < cursor" range scans.
+            models.Index(
+                fields=["user", "-id"], name="recipe_user_id_desc_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def image_files(self):
+        """Return the storage names of the image and its variants."""
+        names = [self.image.name] if self.image else []
+        return names + list(self.image_variants.values())
+
 
 class Tag(models.Model):
     """Tags for filtering recipes."""
@@ -81,6 +112,14 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"],
+                name="unique_tag_name_per_user",
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -93,5 +132,75 @@ class Ingradient(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"],
+                name="unique_ingradient_name_per_user",
+            ),
+        ]
+
     def __str__(self):
         return self.name
+
+
+class UserDataVersion(models.Model):
+    """Per-user version stamp of recipe data, bumped on every write."""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="data_version",
+    )
+    version = models.BigIntegerField(default=0)
+    modified_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def bump(cls, user_id):
+        """Advance the user's version after a write to their data."""
+        cls.objects.filter(user_id=user_id).update(
+            version=F("version") + 1, modified_at=timezone.now(),
+        )
+
+    @classmethod
+    def current(cls, user_id):
+        """Return the user's (version, modified_at), (0, None) if unset."""
+        row = cls.objects.filter(user_id=user_id).values_list(
+            "version", "modified_at"
+        ).first()
+
+        return row or (0, None)
+
+
+class ImageUpload(models.Model):
+    """A resumable, chunked upload of a recipe image in progress."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="image_uploads",
+    )
+    filename = models.CharField(max_length=255)
+    size = models.PositiveIntegerField()
+    offset = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def partial_name(self):
+        """Return the media storage name the chunks are written to."""
+        return os.path.join("uploads", "partial", f"{self.id}.part")
+
+
+class ImageBlob(models.Model):
+    """Reference count of a file in the content-addressed image storage."""
+    name = models.CharField(max_length=255, primary_key=True)
+    refs = models.PositiveIntegerField(default=0)
+
+
+class ImportCheckpoint(models.Model):
+    """How far the import_recipes command got through an input file."""
+    source = models.CharField(max_length=1024, unique=True)
+    offset = models.BigIntegerField(default=0)
+    lines = models.BigIntegerField(default=0)
+    rows = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,73 @@
+"""
+Fast JSON and MessagePack renderers for the APIs.
+"""
+from decimal import Decimal
+
+import msgpack
+import orjson
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+encoder = JSONEncoder()
+
+
+def default(obj):
+    """
+    Convert what orjson and msgpack cannot encode themselves.
+
+    Decimals become strings, keeping every digit, like DecimalField's
+    output; anything else is converted as DRF's JSON encoder would.
+    """
+    if isinstance(obj, Decimal):
+        return str(obj)
+    return encoder.default(obj)
+
+
+def dumps(data):
+    """Return data as compact UTF-8 JSON bytes."""
+    return orjson.dumps(
+        data,
+        default=default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z,
+    )
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer encoding with orjson.
+
+    The output matches the default compact, unicode JSONRenderer output.
+    Indented output, as the browsable API asks for, and data orjson
+    rejects, such as integers beyond 64 bits, are left to the stdlib
+    encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = dumps(data)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escape the line separators JSON allows but JavaScript does not.
+        if b"\xe2\x80" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return ret
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """MessagePack, for clients that ask for application/msgpack."""
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=default, use_bin_type=True)
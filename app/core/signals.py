@@ -0,0 +1,62 @@
+"""
+Signal handlers keeping each user's data version and stored files current.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Ingradient, Recipe, Tag, UserDataVersion
+from core.storage import release_on_commit
+
+_bulk_write = ContextVar("bulk_write", default=False)
+
+
+@contextmanager
+def bulk_write():
+    """
+    Skip the per-row version bumps of writes made inside the block.
+
+    The caller bumps each affected user once afterwards, so deleting n
+    rows does not cost n extra UPDATEs.
+    """
+    token = _bulk_write.set(True)
+    try:
+        yield
+    finally:
+        _bulk_write.reset(token)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_data_version(sender, instance, created, **kwargs):
+    """Start a version stamp for every new user."""
+    if created:
+        UserDataVersion.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingradient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingradient)
+def bump_on_write(sender, instance, **kwargs):
+    """Bump the owner's version when a recipe, tag or ingradient changes."""
+    if not _bulk_write.get():
+        UserDataVersion.bump(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingradients.through)
+def bump_on_link(sender, instance, action, **kwargs):
+    """Bump the owner's version when recipe links change."""
+    if action in ("post_add", "post_remove", "post_clear"):
+        UserDataVersion.bump(instance.user_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def release_image_files(sender, instance, **kwargs):
+    """Release a deleted recipe's image and variants from storage."""
+    release_on_commit(instance.image.storage, instance.image_files())
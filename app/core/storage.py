@@ -0,0 +1,215 @@
+"""
+Content-addressed, deduplicating file storage for uploaded images, and
+precompressing storage for collected static files.
+"""
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from core import compression
+from core.models import ImageBlob
+
+HASH_BYTES = 64 * 1024
+
+_saved = ContextVar("saved_blobs", default=None)
+
+
+def hash_file(path):
+    """Return the SHA-256 hex digest of the file at path."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_BYTES), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File storage keeping each distinct file once, named by its SHA-256.
+
+    save() hashes the content while streaming it to a temporary file and
+    then moves it to blobs/<xx>/<digest><ext>, or drops it when that blob
+    already exists. Every save() takes a reference on the blob and every
+    delete() releases one; the file is removed with its last reference.
+    A blob's bytes never change, so its URL can be cached indefinitely.
+
+    Names outside blobs/, from before this storage, are plain files.
+    """
+    prefix = "blobs"
+
+    def get_available_name(self, name, max_length=None):
+        """Return name; _save picks the final, content-derived name."""
+        return name
+
+    def _receive(self, content):
+        """Return (temporary path, digest) holding the bytes of content."""
+        if hasattr(content, "temporary_file_path"):
+            path = content.temporary_file_path()
+            return path, hash_file(path)
+
+        directory = self.path(self.prefix)
+        os.makedirs(directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        digest = hashlib.sha256()
+        with os.fdopen(fd, "wb") as file:
+            for chunk in content.chunks():
+                digest.update(chunk)
+                file.write(chunk)
+
+        return path, digest.hexdigest()
+
+    def _save(self, name, content):
+        path, digest = self._receive(content)
+        ext = os.path.splitext(name)[1].lower()
+        name = os.path.join(self.prefix, digest[:2], digest + ext)
+        full_path = self.path(name)
+
+        # The reference row stays locked until commit, so a concurrent
+        # delete() of the same blob cannot remove the file under us.
+        with transaction.atomic():
+            self.retain(name)
+            if os.path.exists(full_path):
+                os.remove(path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                file_move_safe(path, full_path, allow_overwrite=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+
+        saved = _saved.get()
+        if saved is not None:
+            saved.append((self, name))
+
+        return name
+
+    def retain(self, name):
+        """Take a reference on the blob name."""
+        blobs = ImageBlob.objects.filter(name=name)
+        if blobs.update(refs=F("refs") + 1):
+            return
+        try:
+            with transaction.atomic():
+                ImageBlob.objects.create(name=name, refs=1)
+        except IntegrityError:
+            blobs.update(refs=F("refs") + 1)
+
+    def discard(self, name):
+        """Remove the blob name if nothing references it."""
+        with transaction.atomic():
+            blob, _ = ImageBlob.objects.select_for_update().get_or_create(
+                name=name, defaults={"refs": 0}
+            )
+            if blob.refs == 0:
+                blob.delete()
+                super().delete(name)
+
+    def delete(self, name):
+        """Release a reference; remove the file with the last one."""
+        if not name.startswith(self.prefix + "/"):
+            return super().delete(name)
+
+        with transaction.atomic():
+            blob = ImageBlob.objects.select_for_update().filter(
+                name=name
+            ).first()
+            if blob is not None and blob.refs > 1:
+                blob.refs = F("refs") - 1
+                blob.save(update_fields=["refs"])
+                return
+            if blob is not None:
+                blob.delete()
+            super().delete(name)
+
+
+@contextmanager
+def atomic_save():
+    """
+    Run the block in a transaction, removing blobs it saved if it fails.
+
+    Rolling back undoes the references the block's saves took, but not
+    the files they moved into place, which would be left unreferenced.
+    """
+    saved = []
+    token = _saved.set(saved)
+    try:
+        with transaction.atomic():
+            yield
+    except BaseException:
+        for storage, name in saved:
+            storage.discard(name)
+        raise
+    finally:
+        _saved.reset(token)
+
+
+def release_on_commit(storage, names):
+    """Delete names from storage once the current transaction commits."""
+    names = [name for name in names if name]
+    if not names:
+        return
+
+    def release():
+        for name in names:
+            storage.delete(name)
+
+    transaction.on_commit(release)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest static files storage that also writes .gz and .br copies.
+
+    After collectstatic has hashed the files, each hashed file with a
+    compressible extension gets maximally compressed siblings, such as
+    base.1a2b3c4d5e6f.css.gz, for the proxy to send in its place to
+    clients accepting that encoding. Copies that would not be smaller
+    are not written.
+    """
+    compress_extensions = (
+        ".css", ".js", ".svg", ".json", ".map", ".txt", ".html", ".xml",
+    )
+    min_compress_size = 256
+
+    def post_process(self, paths, dry_run=False, **options):
+        results = list(super().post_process(paths, dry_run, **options))
+        if not dry_run:
+            # Files adjusted over several passes appear more than once;
+            # the last entry has the final hashed name.
+            final = {
+                name: hashed_name
+                for name, hashed_name, processed in results
+                if hashed_name and not isinstance(processed, Exception)
+            }
+            for hashed_name in final.values():
+                self.compress(hashed_name)
+
+        yield from results
+
+    def compress(self, name):
+        """Write the compressed siblings of the stored file name."""
+        if not name.endswith(self.compress_extensions):
+            return
+        with self.open(name) as file:
+            data = file.read()
+        if len(data) < self.min_compress_size:
+            return
+
+        for encoder in (
+            compression.GzipEncoder(9), compression.BrotliEncoder(11)
+        ):
+            target = name + encoder.extension
+            if self.exists(target):
+                self.delete(target)
+            content = compression.compress(data, encoder)
+            if len(content) < len(data):
+                self.save(target, ContentFile(content))
@@ -0,0 +1,39 @@
+"""
+Query-count budget helpers shared by the API tests.
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def count_queries(func):
+    """Call func and return the number of queries it issued."""
+    with CaptureQueriesContext(connection) as ctx:
+        func()
+
+    return len(ctx.captured_queries)
+
+
+class QueryBudgetMixin:
+    """TestCase mixin asserting an endpoint runs in a fixed query budget."""
+
+    def assertQueryBudget(self, seed, call, sizes=(1, 5), budget=None):
+        """
+        Assert call() issues the same number of queries at every size.
+
+        seed(n) is called to grow the data set to n rows before each
+        measurement, so an N+1 shows up as a count that grows with n.
+        When budget is given the count must also not exceed it.
+        """
+        counts = []
+        for size in sizes:
+            seed(size)
+            counts.append(count_queries(call))
+
+        self.assertEqual(
+            len(set(counts)), 1,
+            f"Query count grows with row count: {dict(zip(sizes, counts))}",
+        )
+        if budget is not None:
+            self.assertLessEqual(counts[0], budget)
+
+        return counts[0]
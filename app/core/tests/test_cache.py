@@ -0,0 +1,36 @@
+"""
+Tests for the in-process caches.
+"""
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core.cache import LRUCache
+
+
+class LRUCacheTests(SimpleTestCase):
+    """Test the bounded, expiring LRU mapping."""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest untouched entry is evicted when full."""
+        cache = LRUCache(max_entries=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+
+    @patch("core.cache.time.monotonic")
+    def test_entries_expire(self, mock_monotonic):
+        """Test entries are not returned after their TTL."""
+        mock_monotonic.return_value = 100
+        cache = LRUCache(max_entries=2, ttl=10)
+        cache.set("a", 1)
+
+        mock_monotonic.return_value = 109
+        self.assertEqual(cache.get("a"), 1)
+        mock_monotonic.return_value = 110
+        self.assertIsNone(cache.get("a"))
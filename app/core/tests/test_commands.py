@@ -5,8 +5,17 @@ from unittest.mock import patch
 from psycopg2 import OperationalError as Psycopg2Error  # possible error that
 # we get when we connect db before db is up
 from django.core.management import call_command
+from django.db import connection
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from decimal import Decimal
+from io import StringIO
+import json
+import os
+import tempfile
+import time
+from django.test import SimpleTestCase, TestCase, override_settings
+from core.management.commands import import_recipes
+from core.models import ImageBlob, ImageUpload, Recipe, Tag, User
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -34,3 +43,354 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class BenchmarkQueriesCommandTests(TestCase):
+    """Test the benchmark_queries command."""
+
+    def test_benchmark_reports_plans_and_cleans_up(self):
+        """Test the command explains each hot query and removes its data."""
+        out = StringIO()
+
+        call_command(
+            "benchmark_queries", recipes=200, users=4, tags=5, stdout=out,
+        )
+
+        output = out.getvalue()
+        for name in ("recipe page after cursor", "recipes by tag",
+                     "tag list"):
+            self.assertIn(f"{name}:", output)
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_no_indexes_restores_them(self):
+        """Test --no-indexes explains without the indexes, then restores."""
+        out = StringIO()
+
+        call_command(
+            "benchmark_queries", recipes=200, users=4, tags=5,
+            no_indexes=True, stdout=out,
+        )
+
+        # Named once, as dropped, and never in a plan.
+        self.assertEqual(out.getvalue().count("recipe_user_id_desc_idx"), 1)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM pg_indexes WHERE indexname = %s",
+                ["recipe_user_id_desc_idx"],
+            )
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+class GCMediaCommandTests(TestCase):
+    """Test the gc_media command."""
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        settings = override_settings(MEDIA_ROOT=self.media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        user = User.objects.create_user("user@example.com", "test123")
+        recipe = Recipe.objects.create(
+            user=user, title="Soup", time_minutes=5, price=Decimal("1.00"),
+            image="uploads/recipe/used.jpg",
+        )
+        ImageBlob.objects.create(name="blobs/aa/kept.png", refs=1)
+        self.upload = ImageUpload.objects.create(
+            recipe=recipe, filename="photo.png", size=100,
+        )
+        self.kept = [
+            "uploads/recipe/used.jpg",
+            "uploads/recipe/used_thumb.jpg",
+            "blobs/aa/kept.png",
+            self.upload.partial_name,
+        ]
+        self.orphans = [
+            "uploads/recipe/gone.jpg",
+            "uploads/recipe/gone_thumb.jpg",
+            "blobs/bb/gone.png",
+            "uploads/partial/00000000-0000-0000-0000-000000000000.part",
+        ]
+        for name in self.kept + self.orphans:
+            self._write(name, age=7200)
+        self._write("uploads/recipe/new.jpg", age=0)
+
+    def _write(self, name, age):
+        """Create a media file last modified age seconds ago."""
+        path = os.path.join(self.media.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(b"x" * 10)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+
+    def _exists(self, name):
+        return os.path.exists(os.path.join(self.media.name, name))
+
+    def test_removes_orphans(self):
+        """Test unreferenced files are deleted and referenced ones kept."""
+        out = StringIO()
+
+        call_command("gc_media", batch_size=2, stdout=out)
+
+        for name in self.kept + ["uploads/recipe/new.jpg"]:
+            self.assertTrue(self._exists(name), name)
+        for name in self.orphans:
+            self.assertFalse(self._exists(name), name)
+        self.assertIn("Removed 4 of 9 files (40 bytes)", out.getvalue())
+        self.assertIn("files/s", out.getvalue())
+
+    def test_dry_run(self):
+        """Test a dry run reports orphans without removing them."""
+        out = StringIO()
+
+        call_command("gc_media", dry_run=True, stdout=out)
+
+        for name in self.orphans:
+            self.assertTrue(self._exists(name), name)
+        self.assertIn("Would remove 4 of 9 files", out.getvalue())
+
+    def test_quarantine(self):
+        """Test orphans can be moved aside instead of deleted."""
+        with tempfile.TemporaryDirectory() as quarantine:
+            call_command("gc_media", quarantine=quarantine, stdout=StringIO())
+
+            for name in self.orphans:
+                self.assertFalse(self._exists(name), name)
+                self.assertTrue(
+                    os.path.exists(os.path.join(quarantine, name)), name
+                )
+
+    def test_unreferenced_blob_rows_removed(self):
+        """Test a blob left with no references loses its row and file."""
+        ImageBlob.objects.create(name="blobs/bb/gone.png", refs=0)
+
+        call_command("gc_media", stdout=StringIO())
+
+        self.assertFalse(self._exists("blobs/bb/gone.png"))
+        self.assertFalse(
+            ImageBlob.objects.filter(name="blobs/bb/gone.png").exists()
+        )
+
+    def test_blob_referenced_since_scan_kept(self):
+        """Test a blob referenced after the scan's lookup is not removed."""
+        with patch(
+            "core.management.commands.gc_media.Command.referenced_blobs",
+            return_value=set(),
+        ):
+            out = StringIO()
+            call_command("gc_media", stdout=out)
+
+        self.assertTrue(self._exists("blobs/aa/kept.png"))
+        self.assertEqual(
+            ImageBlob.objects.get(name="blobs/aa/kept.png").refs, 1
+        )
+        self.assertIn("blobs: 1 orphaned of 2 files", out.getvalue())
+
+    def test_expired_uploads_collected(self):
+        """Test uploads too old to resume lose their row and file."""
+        ImageUpload.objects.filter(id=self.upload.id).update(
+            created_at="2000-01-01T00:00:00Z"
+        )
+
+        call_command("gc_media", stdout=StringIO())
+
+        self.assertFalse(self._exists(self.upload.partial_name))
+        self.assertFalse(ImageUpload.objects.exists())
+
+
+class ImportRecipesCommandTests(TestCase):
+    """Test the import_recipes command."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("cook@example.com", "test123")
+        self.other = User.objects.create_user("other@example.com", "test123")
+        Tag.objects.create(user=self.user, name="Veg")
+        self.file = tempfile.NamedTemporaryFile("w", suffix=".jsonl")
+        self.addCleanup(self.file.close)
+
+    def _write(self, *rows):
+        """Append rows to the input file as JSON Lines."""
+        for row in rows:
+            self.file.write(
+                row if isinstance(row, str) else json.dumps(row)
+            )
+            self.file.write("\n")
+        self.file.flush()
+
+    def _import(self, **options):
+        """Run the command and return its output."""
+        out = StringIO()
+        call_command(
+            "import_recipes", self.file.name, stdout=out, stderr=out,
+            **options,
+        )
+        return out.getvalue()
+
+    def _recipe(self, title, **fields):
+        return {
+            "title": title, "time_minutes": 10, "price": "4.50", **fields,
+        }
+
+    def test_import_recipes_with_links(self):
+        """Test recipes are created with their tags and ingradients."""
+        self._write(
+            self._recipe(
+                "Dal", user="cook@example.com", tags=["Veg", "Quick"],
+                ingradients=["Lentils"],
+            ),
+            self._recipe("Soup", user="other@example.com", tags=["Veg"]),
+        )
+
+        out = self._import(batch_size=1)
+
+        dal = Recipe.objects.get(title="Dal")
+        self.assertEqual(dal.user, self.user)
+        self.assertEqual(dal.price, Decimal("4.50"))
+        self.assertEqual(dal.description, "")
+        self.assertEqual(
+            sorted(tag.name for tag in dal.tags.all()), ["Quick", "Veg"]
+        )
+        self.assertEqual([i.name for i in dal.ingradients.all()], ["Lentils"])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(
+            Recipe.objects.get(title="Soup").tags.get().user, self.other
+        )
+        self.assertIn("Imported 2 recipes", out)
+        self.assertIn("rows/s", out)
+
+    def test_default_user(self):
+        """Test --user owns lines without a user."""
+        self._write(self._recipe("Dal"))
+
+        self._import(user="other@example.com")
+
+        self.assertEqual(Recipe.objects.get().user, self.other)
+
+    def test_invalid_lines_skipped(self):
+        """Test bad lines are reported and the rest imported."""
+        self._write(
+            "not json",
+            self._recipe("Dal", user="cook@example.com", price="x"),
+            self._recipe("Soup", user="nobody@example.com"),
+            self._recipe("Stew", user="cook@example.com"),
+        )
+
+        out = self._import()
+
+        self.assertEqual(
+            list(Recipe.objects.values_list("title", flat=True)), ["Stew"]
+        )
+        self.assertIn("Line 1:", out)
+        self.assertIn("Line 2:", out)
+        self.assertIn("Unknown user nobody@example.com", out)
+
+    def test_invalid_prices_and_links_skipped(self):
+        """Test non-finite prices and over-long links reject their line."""
+        self._write(
+            self._recipe("NaN", user="cook@example.com", price="NaN"),
+            self._recipe("sNaN", user="cook@example.com", price="sNaN"),
+            self._recipe("Inf", user="cook@example.com", price="Infinity"),
+            self._recipe(
+                "Long", user="cook@example.com", link="http://x/" + "a" * 250
+            ),
+            self._recipe("Stew", user="cook@example.com"),
+        )
+
+        out = self._import()
+
+        self.assertEqual(
+            list(Recipe.objects.values_list("title", flat=True)), ["Stew"]
+        )
+        for line in range(1, 5):
+            self.assertIn(f"Line {line}:", out)
+
+    def test_out_of_range_and_nul_lines_skipped(self):
+        """Test values the database would refuse reject their line."""
+        self._write(
+            self._recipe("Big", user="cook@example.com", time_minutes=10**12),
+            self._recipe("Nul", user="cook@example.com", description="a\0"),
+            self._recipe("Tag", user="cook@example.com", tags=["V\0g"]),
+            self._recipe("Stew", user="cook@example.com"),
+        )
+
+        out = self._import()
+
+        self.assertEqual(
+            list(Recipe.objects.values_list("title", flat=True)), ["Stew"]
+        )
+        self.assertIn("3 lines skipped", out)
+
+    def test_refused_row_skipped_from_batch(self):
+        """Test a row the database refuses does not sink its batch."""
+        self._write(
+            self._recipe("Dal", user="cook@example.com", tags=["Veg"]),
+            self._recipe("Big", user="cook@example.com", time_minutes=10**12),
+            self._recipe("Stew", user="cook@example.com", tags=["New"]),
+        )
+
+        with patch.object(
+            connection.ops, "integer_field_range",
+            return_value=(-10**18, 10**18),
+        ):
+            out = self._import()
+
+        self.assertEqual(
+            sorted(Recipe.objects.values_list("title", flat=True)),
+            ["Dal", "Stew"],
+        )
+        self.assertEqual(
+            Recipe.objects.get(title="Stew").tags.get().name, "New"
+        )
+        self.assertIn("Recipe 'Big' skipped", out)
+        self.assertIn("Imported 2 recipes", out)
+        self.assertIn("1 lines skipped", out)
+
+    def test_resume(self):
+        """Test a second run only imports lines added since the first."""
+        self._write(self._recipe("Dal", user="cook@example.com"))
+        self._import()
+        self._write(self._recipe("Soup", user="cook@example.com"))
+
+        out = self._import()
+
+        self.assertIn("Resuming after line 1", out)
+        self.assertEqual(
+            sorted(Recipe.objects.values_list("title", flat=True)),
+            ["Dal", "Soup"],
+        )
+
+    def test_crash_resumes_from_last_batch(self):
+        """Test a failed batch is retried and earlier ones are not."""
+        self._write(*[
+            self._recipe(f"Recipe {i}", user="cook@example.com")
+            for i in range(3)
+        ])
+        load = import_recipes.Command.load
+        calls = []
+
+        def failing_load(command, batch, checkpoint):
+            calls.append(batch)
+            if len(calls) == 2:
+                raise RuntimeError("crash")
+            return load(command, batch, checkpoint)
+
+        with patch.object(import_recipes.Command, "load", failing_load):
+            with self.assertRaises(RuntimeError):
+                self._import(batch_size=2)
+        self.assertEqual(Recipe.objects.count(), 2)
+
+        self._import(batch_size=2)
+
+        self.assertEqual(Recipe.objects.count(), 3)
+
+    def test_restart(self):
+        """Test --restart ignores the checkpoint."""
+        self._write(self._recipe("Dal", user="cook@example.com"))
+        self._import()
+
+        self._import(restart=True)
+
+        self.assertEqual(Recipe.objects.filter(title="Dal").count(), 2)
@@ -0,0 +1,254 @@
+"""
+Tests for response compression and precompressed static files.
+"""
+import gzip
+import os
+import tempfile
+from decimal import Decimal
+
+import brotli
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, override_settings,
+)
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import compression
+from core.middleware import CompressionMiddleware
+from core.models import Recipe
+
+RECIPES_URL = reverse("recipe:recipe-list")
+EXPORT_URL = reverse("recipe:recipe-export")
+
+
+class NegotiateTests(SimpleTestCase):
+    """Test choosing a content coding from Accept-Encoding."""
+
+    def test_negotiate(self):
+        """Test q-values, wildcards and refusals are honoured."""
+        cases = [
+            ("", None),
+            ("identity", None),
+            ("gzip", "gzip"),
+            ("gzip, deflate, br", "br"),
+            ("br;q=0.5, gzip", "gzip"),
+            ("br;q=0, *", "gzip"),
+            ("*", "br"),
+            ("GZIP;Q=0.8", "gzip"),
+            ("gzip;q=0, br;q=invalid", None),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(compression.negotiate(header), expected)
+
+    def test_compress_stream_flushes(self):
+        """Test streamed output is flushed once enough input is pending."""
+        for encoder, decompress in (
+            (compression.GzipEncoder(), gzip.decompress),
+            (compression.BrotliEncoder(), brotli.decompress),
+        ):
+            with self.subTest(coding=encoder.coding):
+                chunks = compression.compress_stream(
+                    (b"row %d\n" % i for i in range(1000)), encoder, 1024
+                )
+                first = next(chunks)
+
+                self.assertTrue(first)
+                body = first + b"".join(chunks)
+                self.assertEqual(
+                    decompress(body),
+                    b"".join(b"row %d\n" % i for i in range(1000)),
+                )
+
+
+class CompressionMiddlewareTests(TestCase):
+    """Test API responses are compressed when worthwhile."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@example.com", "test123"
+        )
+        self.client.force_authenticate(self.user)
+        Recipe.objects.bulk_create(
+            Recipe(
+                user=self.user, title=f"Recipe {i}", time_minutes=i,
+                price=Decimal("1.00"), description="",
+            )
+            for i in range(50)
+        )
+
+    def test_large_response_compressed(self):
+        """Test a large list is compressed with the accepted coding."""
+        plain = self.client.get(RECIPES_URL).content
+        for coding, decompress in (
+            ("br", brotli.decompress), ("gzip", gzip.decompress)
+        ):
+            with self.subTest(coding=coding):
+                res = self.client.get(
+                    RECIPES_URL, HTTP_ACCEPT_ENCODING=f"{coding}, identity"
+                )
+
+                self.assertEqual(res["Content-Encoding"], coding)
+                self.assertIn("Accept-Encoding", res["Vary"])
+                self.assertEqual(
+                    int(res["Content-Length"]), len(res.content)
+                )
+                self.assertLess(len(res.content), len(plain))
+                self.assertEqual(decompress(res.content), plain)
+
+    def test_not_accepted(self):
+        """Test clients not accepting a coding get identity, with Vary."""
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING="identity")
+
+        self.assertFalse(res.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", res["Vary"])
+
+    @override_settings(RESPONSE_COMPRESSION={
+        "MIN_SIZE": 1 << 20, "TYPES": ["application/json"],
+    })
+    def test_below_threshold(self):
+        """Test responses below MIN_SIZE are sent uncompressed."""
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertFalse(res.has_header("Content-Encoding"))
+
+    @override_settings(RESPONSE_COMPRESSION={"MIN_SIZE": 0, "TYPES": []})
+    def test_other_types(self):
+        """Test content types outside TYPES are sent uncompressed."""
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertFalse(res.has_header("Content-Encoding"))
+
+    @override_settings(RESPONSE_COMPRESSION={"MIN_SIZE": 0, "TYPES": [
+        "text/", "application/json",
+    ]})
+    def test_html_and_csrf_responses_not_compressed(self):
+        """Test HTML and CSRF cookie responses are never compressed."""
+        html = self.client.get(
+            RECIPES_URL, HTTP_ACCEPT="text/html", HTTP_ACCEPT_ENCODING="gzip"
+        )
+        self.assertTrue(html["Content-Type"].startswith("text/html"))
+        self.assertFalse(html.has_header("Content-Encoding"))
+
+        def get_response(request):
+            response = HttpResponse(
+                b"[]" * 1000, content_type="application/json"
+            )
+            response.set_cookie(settings.CSRF_COOKIE_NAME, "secret")
+            return response
+
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+        res = CompressionMiddleware(get_response)(request)
+
+        self.assertFalse(res.has_header("Content-Encoding"))
+
+    def test_conditional_get(self):
+        """Test the weakened ETag of a compressed list still gives 304."""
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertTrue(res["ETag"].startswith('W/"'))
+
+        res = self.client.get(
+            RECIPES_URL,
+            HTTP_ACCEPT_ENCODING="gzip",
+            HTTP_IF_NONE_MATCH=res["ETag"],
+        )
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_streamed_export(self):
+        """Test streamed exports are compressed as they are streamed."""
+        plain = b"".join(
+            self.client.get(EXPORT_URL, {"format": "jsonl"}).streaming_content
+        )
+
+        res = self.client.get(
+            EXPORT_URL, {"format": "jsonl"}, HTTP_ACCEPT_ENCODING="gzip"
+        )
+
+        self.assertTrue(res.streaming)
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertFalse(res.has_header("Content-Length"))
+        self.assertEqual(
+            gzip.decompress(b"".join(res.streaming_content)), plain
+        )
+
+
+class CompressedStaticFilesTests(SimpleTestCase):
+    """Test collectstatic writes compressed copies of hashed files."""
+
+    def setUp(self):
+        source = tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        target = tempfile.TemporaryDirectory()
+        self.addCleanup(target.cleanup)
+        self.root = target.name
+        files = {
+            "css/site.css": b"body { color: red; }\n" * 100,
+            "js/tiny.js": b"1;",
+            "img/logo.png": b"\x89PNG" + b"\0" * 1000,
+        }
+        for name, data in files.items():
+            path = os.path.join(source.name, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as file:
+                file.write(data)
+        self.settings = override_settings(
+            STATIC_ROOT=self.root,
+            STATICFILES_DIRS=[source.name],
+            STATICFILES_FINDERS=[
+                "django.contrib.staticfiles.finders.FileSystemFinder",
+            ],
+            STATICFILES_STORAGE=(
+                "core.storage.CompressedManifestStaticFilesStorage"
+            ),
+        )
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+    def collected(self):
+        """Return the collected file names."""
+        return sorted(
+            os.path.relpath(os.path.join(path, name), self.root)
+            for path, _, names in os.walk(self.root)
+            for name in names
+        )
+
+    def test_compressed_siblings(self):
+        """Test hashed text files get smaller .gz and .br copies."""
+        call_command("collectstatic", interactive=False, verbosity=0)
+
+        names = self.collected()
+        css = [
+            name for name in names
+            if name.startswith("css/site.") and name.endswith(".css")
+            and name != "css/site.css"
+        ]
+        self.assertEqual(len(css), 1)
+        hashed = os.path.join(self.root, css[0])
+        with open(hashed, "rb") as file:
+            data = file.read()
+        with open(hashed + ".gz", "rb") as file:
+            self.assertEqual(gzip.decompress(file.read()), data)
+        with open(hashed + ".br", "rb") as file:
+            self.assertEqual(brotli.decompress(file.read()), data)
+
+        self.assertNotIn("css/site.css.gz", names)
+        self.assertFalse(any(
+            name.startswith(("js/", "img/")) and name.endswith((".gz", ".br"))
+            for name in names
+        ))
+
+    def test_recollect_replaces_copies(self):
+        """Test running collectstatic again leaves one copy per coding."""
+        call_command("collectstatic", interactive=False, verbosity=0)
+        call_command("collectstatic", interactive=False, verbosity=0)
+
+        gz = [name for name in self.collected() if name.endswith(".gz")]
+        self.assertEqual(len(gz), 1)
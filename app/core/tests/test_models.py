@@ -3,11 +3,13 @@ Test for Models.
 """
 from decimal import Decimal
 from django.test import TestCase
+from django.db import IntegrityError
 from django.contrib.auth import get_user_model
 from core.models import (
     Recipe,
     Tag,
     Ingradient,
+    UserDataVersion,
     recipe_image_file_path
 )
 from unittest.mock import patch
@@ -85,6 +87,24 @@ class ModelTest(TestCase):
 
         self.assertEqual(str(tag), tag.name)
 
+    def test_tag_name_unique_per_user(self):
+        """Test a user cannot have two tags with the same name."""
+        user = create_user()
+        other = create_user(email="other@example.com")
+        Tag.objects.create(user=user, name="Tag1")
+        Tag.objects.create(user=other, name="Tag1")
+
+        with self.assertRaises(IntegrityError):
+            Tag.objects.create(user=user, name="Tag1")
+
+    def test_ingradient_name_unique_per_user(self):
+        """Test a user cannot have two ingradients with the same name."""
+        user = create_user()
+        Ingradient.objects.create(user=user, name="Salt")
+
+        with self.assertRaises(IntegrityError):
+            Ingradient.objects.create(user=user, name="Salt")
+
     def test_create_ingradeint(self):
         """Test creating a new ingradients."""
         user = create_user()
@@ -95,6 +115,30 @@ class ModelTest(TestCase):
 
         self.assertEqual(str(ingradient), ingradient.name)
 
+    def test_data_version_bumped_on_write(self):
+        """Test a user's data version advances on recipe data writes."""
+        user = create_user()
+        version, _ = UserDataVersion.current(user.id)
+        tag = Tag.objects.create(user=user, name="Tag1")
+        recipe = Recipe.objects.create(
+            user=user, title="Soup", time_minutes=5, price=Decimal("1.00"),
+        )
+        recipe.tags.add(tag)
+        tag.delete()
+
+        self.assertEqual(UserDataVersion.current(user.id)[0], version + 4)
+
+    def test_user_delete_removes_data_version(self):
+        """Test deleting a user with recipes deletes cleanly."""
+        user = create_user()
+        Recipe.objects.create(
+            user=user, title="Soup", time_minutes=5, price=Decimal("1.00"),
+        )
+
+        user.delete()
+
+        self.assertFalse(UserDataVersion.objects.exists())
+
     @patch("core.models.uuid.uuid4")
     def test_recipe_file_name_uuid(self, mock_uuid):
         """Test generating image path."""
@@ -0,0 +1,170 @@
+"""
+Tests for the orjson and MessagePack renderers and parsers.
+"""
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from io import BytesIO
+
+import msgpack
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+from core.models import Recipe
+from core.parsers import MessagePackParser, ORJSONParser
+from core.renderers import MessagePackRenderer, ORJSONRenderer
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """Test ORJSONRenderer output matches DRF's JSONRenderer."""
+
+    def test_matches_json_renderer(self):
+        """Test typical response data renders byte for byte the same."""
+        data = ReturnDict([
+            ("id", 1),
+            ("title", "Crème brûlée \"quoted\" \u2028\u2029"),
+            ("price", "5.25"),
+            ("tags", [{"id": 2, "name": "Veg"}]),
+            ("image", None),
+            ("ratio", 0.5),
+            ("ok", True),
+            ("when", datetime(2024, 5, 1, 12, 30, 1, 5, tzinfo=timezone.utc)),
+            ("day", date(2024, 5, 1)),
+            ("uuid", uuid.UUID(int=7)),
+            ("error", ErrorDetail("Invalid.", code="invalid")),
+            ("lazy", gettext_lazy("This field is required.")),
+            (3, "int key"),
+        ], serializer=None)
+
+        self.assertEqual(
+            ORJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_decimal_kept_exact(self):
+        """Test raw Decimals render as strings with every digit."""
+        data = {"price": Decimal("12345678901234567890.01")}
+
+        self.assertEqual(
+            ORJSONRenderer().render(data),
+            b'{"price":"12345678901234567890.01"}',
+        )
+
+    def test_none_and_big_int(self):
+        """Test None renders empty and huge ints fall back to stdlib."""
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+        self.assertEqual(ORJSONRenderer().render([2 ** 70]), b"[%d]" % 2 ** 70)
+
+    def test_indent_delegated(self):
+        """Test indented output is left to the stdlib encoder."""
+        data = {"a": [1]}
+        media_type = "application/json; indent=4"
+
+        self.assertEqual(
+            ORJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type),
+        )
+
+
+class ParserTests(SimpleTestCase):
+    """Test the orjson and MessagePack parsers."""
+
+    def test_orjson_matches_json_parser(self):
+        """Test JSON bodies parse as with DRF's JSONParser."""
+        body = '{"title": "Dal é", "price": 5.25, "tags": [{"name": "V"}]}'
+
+        self.assertEqual(
+            ORJSONParser().parse(BytesIO(body.encode())),
+            JSONParser().parse(BytesIO(body.encode())),
+        )
+
+    def test_orjson_other_charset(self):
+        """Test bodies in another declared charset are decoded first."""
+        body = '{"title": "Café"}'.encode("latin-1")
+
+        data = ORJSONParser().parse(
+            BytesIO(body), parser_context={"encoding": "latin-1"}
+        )
+
+        self.assertEqual(data, {"title": "Café"})
+
+    def test_invalid_bodies(self):
+        """Test malformed bodies raise ParseError."""
+        for parser, body in (
+            (ORJSONParser(), b"{"),
+            (ORJSONParser(), b"NaN"),
+            (MessagePackParser(), b"\xc1"),
+            (MessagePackParser(), msgpack.packb({"a": 1}) + b"\x01"),
+        ):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError):
+                    parser.parse(BytesIO(body))
+
+    def test_msgpack_round_trip(self):
+        """Test rendered MessagePack parses back to the data."""
+        data = {"title": "Dal", "price": Decimal("1.50"), "tags": [1, 2]}
+
+        body = MessagePackRenderer().render(data)
+
+        self.assertEqual(
+            MessagePackParser().parse(BytesIO(body)),
+            {"title": "Dal", "price": "1.50", "tags": [1, 2]},
+        )
+
+
+class ContentNegotiationTests(TestCase):
+    """Test the APIs speak MessagePack when asked to."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@example.com", "test123"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_json_by_default(self):
+        """Test responses stay JSON without an Accept header."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res["Content-Type"], "application/json")
+
+    def test_msgpack_request_and_response(self):
+        """Test a recipe can be created and listed in MessagePack."""
+        body = msgpack.packb({
+            "title": "Dal", "time_minutes": 30, "price": "4.50",
+            "tags": [{"name": "Veg"}],
+        })
+
+        res = self.client.post(
+            RECIPES_URL, body, content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack",
+        )
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res["Content-Type"], "application/msgpack")
+        created = msgpack.unpackb(res.content)
+        self.assertEqual(created["price"], "4.50")
+        self.assertEqual(created["tags"][0]["name"], "Veg")
+        self.assertTrue(Recipe.objects.filter(id=created["id"]).exists())
+
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT="application/msgpack")
+
+        self.assertEqual(msgpack.unpackb(res.content)[0]["title"], "Dal")
+
+    def test_invalid_json_body(self):
+        """Test a malformed JSON body is a 400."""
+        res = self.client.post(
+            RECIPES_URL, b"{", content_type="application/json"
+        )
+
+        self.assertEqual(res.status_code, 400)
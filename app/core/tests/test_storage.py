@@ -0,0 +1,101 @@
+"""
+Tests for the content-addressed image storage.
+"""
+import hashlib
+import os
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase
+
+from core.models import ImageBlob, Recipe
+from core.storage import ContentAddressedStorage, atomic_save
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Test deduplicating, reference counted storage."""
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.storage = ContentAddressedStorage(location=self.tempdir.name)
+
+    def test_named_by_digest(self):
+        """Test a file is stored under the SHA-256 of its bytes."""
+        name = self.storage.save("uploads/photo.JPG", ContentFile(b"abc"))
+
+        digest = hashlib.sha256(b"abc").hexdigest()
+        self.assertEqual(name, f"blobs/{digest[:2]}/{digest}.jpg")
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), b"abc")
+
+    def test_duplicate_stored_once(self):
+        """Test saving the same bytes twice keeps one file, two refs."""
+        first = self.storage.save("a.png", ContentFile(b"same"))
+        second = self.storage.save("b.png", ContentFile(b"same"))
+
+        self.assertEqual(first, second)
+        self.assertEqual(ImageBlob.objects.get(name=first).refs, 2)
+        blob_dir = os.path.dirname(self.storage.path(first))
+        self.assertEqual(os.listdir(blob_dir), [os.path.basename(first)])
+
+    def test_delete_releases_reference(self):
+        """Test a blob is only removed with its last reference."""
+        name = self.storage.save("a.png", ContentFile(b"shared"))
+        self.storage.save("b.png", ContentFile(b"shared"))
+
+        self.storage.delete(name)
+        self.assertTrue(self.storage.exists(name))
+        self.storage.delete(name)
+
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+
+    def test_atomic_save_failure_removes_new_blobs(self):
+        """Test a failed block drops blobs it created, keeping others."""
+        shared = self.storage.save("a.png", ContentFile(b"shared"))
+
+        with self.assertRaises(RuntimeError), atomic_save():
+            new = self.storage.save("b.png", ContentFile(b"new"))
+            self.storage.save("c.png", ContentFile(b"shared"))
+            raise RuntimeError
+
+        self.assertFalse(self.storage.exists(new))
+        self.assertFalse(ImageBlob.objects.filter(name=new).exists())
+        self.assertTrue(self.storage.exists(shared))
+        self.assertEqual(ImageBlob.objects.get(name=shared).refs, 1)
+
+    def test_legacy_names_deleted(self):
+        """Test files stored before deduplication are deleted directly."""
+        path = self.storage.path("uploads/recipe/old.jpg")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as file:
+            file.write(b"old")
+
+        self.storage.delete("uploads/recipe/old.jpg")
+
+        self.assertFalse(os.path.exists(path))
+
+    def test_recipe_delete_releases_image(self):
+        """Test deleting a recipe releases its image and variants."""
+        user = get_user_model().objects.create_user(
+            "user@example.com", "test123"
+        )
+        storage = Recipe._meta.get_field("image").storage
+        image = storage.save("photo.png", ContentFile(b"image"))
+        thumb = storage.save("photo_thumb.jpg", ContentFile(b"thumb"))
+        self.addCleanup(storage.delete, thumb)
+        self.addCleanup(storage.delete, image)
+        recipe = Recipe.objects.create(
+            user=user, title="Soup", time_minutes=5, price=Decimal("1.00"),
+            image=image, image_variants={"thumb": thumb},
+        )
+        storage.save("copy.png", ContentFile(b"image"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+
+        self.assertEqual(ImageBlob.objects.get(name=image).refs, 1)
+        self.assertFalse(storage.exists(thumb))
@@ -0,0 +1,82 @@
+"""
+Name suggestions for the tag and ingradient autocomplete action.
+"""
+import threading
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import BooleanField, Case, Q, When
+from django.db.models.functions import Upper
+
+from core.cache import LRUCache
+
+_trigram_enabled = {}
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_config():
+    """Return the AUTOCOMPLETE setting."""
+    return getattr(settings, "AUTOCOMPLETE", {})
+
+
+def get_cache():
+    """Return the in-process cache of hot prefixes, created on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = get_config()
+                _cache = LRUCache(
+                    config.get("CACHE_MAX_ENTRIES", 10000),
+                    config.get("CACHE_TTL", 60),
+                )
+    return _cache
+
+
+def trigram_enabled():
+    """Return whether pg_trgm is installed in the default database."""
+    if connection.vendor != "postgresql":
+        return False
+
+    name = connection.settings_dict["NAME"]
+    if name not in _trigram_enabled:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            )
+            _trigram_enabled[name] = cursor.fetchone() is not None
+    return _trigram_enabled[name]
+
+
+def suggestions(queryset, term):
+    """
+    Return queryset filtered to names matching term, best first.
+
+    Prefix matches come first, then fuzzy matches by trigram similarity.
+    Django compares istartswith and icontains on UPPER(name), so the
+    fuzzy match does too and the trigram GIN index on UPPER(name)
+    answers both when pg_trgm is installed; otherwise fuzzy matching
+    degrades to a substring match.
+    """
+    prefix = Q(name__istartswith=term)
+    queryset = queryset.annotate(is_prefix=Case(
+        When(prefix, then=True), default=False, output_field=BooleanField(),
+    ))
+
+    if trigram_enabled():
+        queryset = queryset.alias(upper_name=Upper("name")).filter(
+            prefix | Q(upper_name__trigram_similar=term.upper())
+        ).annotate(similarity=TrigramSimilarity("name", term))
+        ordering = ("-is_prefix", "-similarity", "name")
+    else:
+        queryset = queryset.filter(prefix | Q(name__icontains=term))
+        ordering = ("-is_prefix", "name")
+
+    return queryset.order_by(*ordering)
+
+
+def suggest(queryset, term, limit):
+    """Return up to limit {id, name} rows of queryset matching term."""
+    return list(suggestions(queryset, term).values("id", "name")[:limit])
@@ -0,0 +1,93 @@
+"""
+BlurHash encoder: a ~30 character placeholder any BlurHash client decodes.
+
+See https://github.com/woltapp/blurhash for the format. Encode a small
+image, e.g. 32 pixels wide; the cost grows with its pixel count.
+"""
+import math
+
+CHARACTERS = (
+    "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+    "#$%*+,-.:;=?@[]^_{|}~"
+)
+
+
+def encode83(value, length):
+    """Return value as length base 83 digits."""
+    return "".join(
+        CHARACTERS[value // 83 ** (length - i) % 83]
+        for i in range(1, length + 1)
+    )
+
+
+def srgb_to_linear(value):
+    value = value / 255
+    if value <= 0.04045:
+        return value / 12.92
+    return ((value + 0.055) / 1.055) ** 2.4
+
+
+def linear_to_srgb(value):
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def encode(image, x_components=4, y_components=3):
+    """Return the BlurHash of image, a PIL image in RGB mode."""
+    width, height = image.size
+    pixels = [
+        tuple(srgb_to_linear(channel) for channel in pixel)
+        for pixel in image.getdata()
+    ]
+
+    factors = []
+    for j in range(y_components):
+        cos_y = [math.cos(math.pi * j * y / height) for y in range(height)]
+        for i in range(x_components):
+            cos_x = [math.cos(math.pi * i * x / width) for x in range(width)]
+            norm = 1 if i == j == 0 else 2
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                for x in range(width):
+                    basis = cos_x[x] * cos_y[y]
+                    pr, pg, pb = pixels[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            scale = norm / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = encode83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        actual_max = max(abs(value) for factor in ac for value in factor)
+        quantised = max(0, min(82, int(actual_max * 166 - 0.5)))
+        max_value = (quantised + 1) / 166
+    else:
+        quantised, max_value = 0, 1
+    result += encode83(quantised, 1)
+    result += encode83(
+        (linear_to_srgb(dc[0]) << 16)
+        + (linear_to_srgb(dc[1]) << 8)
+        + linear_to_srgb(dc[2]),
+        4,
+    )
+
+    def quantise(value):
+        return max(0, min(18, int(
+            math.floor(sign_pow(value / max_value, 0.5) * 9 + 9.5)
+        )))
+
+    for r, g, b in ac:
+        result += encode83(
+            quantise(r) * 19 * 19 + quantise(g) * 19 + quantise(b), 2
+        )
+
+    return result
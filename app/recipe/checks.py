@@ -0,0 +1,28 @@
+"""
+System checks for the recipe app's settings.
+"""
+from django.core.checks import Error, register
+
+from recipe import images
+
+
+@register()
+def check_image_variants(app_configs, **kwargs):
+    """Check every IMAGE_PROCESSING variant has a format we can write."""
+    errors = []
+    for variant, options in images.get_config().get("VARIANTS", {}).items():
+        image_format = options.get("format", "JPEG")
+        if image_format not in images.EXTENSIONS:
+            errors.append(Error(
+                f"Image variant {variant!r} has unsupported format "
+                f"{image_format!r}.",
+                hint=f"Use one of {', '.join(images.EXTENSIONS)}.",
+                id="recipe.E001",
+            ))
+        if "size" not in options:
+            errors.append(Error(
+                f"Image variant {variant!r} has no size.",
+                id="recipe.E002",
+            ))
+
+    return errors
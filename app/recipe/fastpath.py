@@ -0,0 +1,133 @@
+"""
+Read-only fast path rendering serializer output from .values() rows.
+
+ModelSerializer.to_representation walks bound fields, attribute lookups
+and a nested serializer per related object for every row. Here the
+field plan is worked out once per response, each row is a plain dict
+from .values() and each many-to-many relation is fetched as one grouped
+map, while the field to_representation methods themselves are reused so
+the output stays identical to the serializer's.
+"""
+from rest_framework import serializers
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+
+class ValuesSerializer:
+    """
+    Stand-in for serializer_class that reads .values() rows.
+
+    Supports plain model fields, file fields, nested many serializers of
+    plain fields and many primary-key relations, which covers the recipe
+    read serializers. Sparse fieldsets in the context are honoured since
+    fields come from a serializer_class instance.
+    """
+
+    def __init__(self, serializer_class, instance=None, many=False,
+                 context=None):
+        self.template = serializer_class(context=context or {})
+        self.model = serializer_class.Meta.model
+        self.instance = instance
+        self.many = many
+
+    @property
+    def fields(self):
+        return self.template.fields
+
+    def is_relation(self, field):
+        """Return whether field renders a many-to-many relation."""
+        return isinstance(
+            field, (serializers.ListSerializer, serializers.ManyRelatedField)
+        )
+
+    def columns(self):
+        """Return the columns to select with .values(); id comes first."""
+        columns = ["id"]
+        for field in self.fields.values():
+            if not self.is_relation(field) and field.source not in columns:
+                columns.append(field.source)
+        return columns
+
+    def converter(self, field):
+        """Return a function from a column value to field's output."""
+        if isinstance(field, serializers.FileField):
+            model_field = self.model._meta.get_field(field.source)
+
+            def convert(name):
+                return field.to_representation(
+                    model_field.attr_class(None, model_field, name)
+                )
+            return convert
+
+        return field.to_representation
+
+    def links(self, field, ids):
+        """Return {id: [output of related objects]} for a relation."""
+        m2m = self.model._meta.get_field(field.source)
+        through = m2m.remote_field.through
+        source = m2m.m2m_field_name()
+        target = m2m.m2m_reverse_field_name()
+        rows = through.objects.filter(
+            **{f"{source}_id__in": ids}
+        ).order_by(f"{target}_id")
+
+        grouped = {pk: [] for pk in ids}
+        if isinstance(field, serializers.ManyRelatedField):
+            for pk, related_id in rows.values_list(
+                f"{source}_id", f"{target}_id"
+            ):
+                grouped[pk].append(related_id)
+            return grouped
+
+        child = field.child.fields
+        plan = [
+            (name, f"{target}__{item.source}", item.to_representation)
+            for name, item in child.items()
+        ]
+        for row in rows.values(
+            f"{source}_id", *(column for _, column, _ in plan)
+        ):
+            grouped[row[f"{source}_id"]].append({
+                name: None if row[column] is None else convert(row[column])
+                for name, column, convert in plan
+            })
+        return grouped
+
+    def to_representation(self, rows):
+        """Return the output dicts of rows."""
+        plan = []
+        relations = []
+        for name, field in self.fields.items():
+            if self.is_relation(field):
+                relations.append((name, field))
+                plan.append((name, None, None))
+            else:
+                plan.append((name, field.source, self.converter(field)))
+
+        ids = [row["id"] for row in rows]
+        links = {
+            name: self.links(field, ids) if ids else {}
+            for name, field in relations
+        }
+
+        results = []
+        for row in rows:
+            item = {}
+            for name, column, convert in plan:
+                if column is None:
+                    item[name] = links[name][row["id"]]
+                else:
+                    value = row[column]
+                    item[name] = None if value is None else convert(value)
+            results.append(item)
+
+        return results
+
+    @property
+    def data(self):
+        if self.many:
+            return ReturnList(
+                self.to_representation(list(self.instance)), serializer=self
+            )
+        return ReturnDict(
+            self.to_representation([self.instance])[0], serializer=self
+        )
@@ -0,0 +1,194 @@
+"""
+Recipe image metadata, and background generation of resized variants.
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from core.models import Recipe, UserDataVersion
+from recipe import blurhash
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+
+PLACEHOLDER_PIXELS = 32
+
+# EXIF Orientation tag, and its values that turn the image sideways.
+ORIENTATION = 0x0112
+TRANSPOSED = (5, 6, 7, 8)
+
+
+def get_config():
+    """Return the IMAGE_PROCESSING setting."""
+    return getattr(settings, "IMAGE_PROCESSING", {})
+
+
+def variant_name(name, variant, image_format):
+    """Return the storage name of a variant of the image stored as name."""
+    stem = os.path.splitext(name)[0]
+    return f"{stem}_{variant}.{EXTENSIONS[image_format]}"
+
+
+def image_metadata(file):
+    """
+    Return the Recipe image columns for file, an uploaded image.
+
+    Width and height are as displayed, after any EXIF rotation. The
+    placeholder is a BlurHash of a tiny copy, which JPEG decoding can
+    produce at a fraction of the full decode cost.
+    """
+    file.seek(0)
+    with Image.open(file) as image:
+        width, height = image.size
+        if image.getexif().get(ORIENTATION) in TRANSPOSED:
+            width, height = height, width
+        image.draft("RGB", (PLACEHOLDER_PIXELS, PLACEHOLDER_PIXELS))
+        small = ImageOps.exif_transpose(image).convert("RGB")
+    small.thumbnail((PLACEHOLDER_PIXELS, PLACEHOLDER_PIXELS))
+    file.seek(0)
+
+    return {
+        "image_width": width,
+        "image_height": height,
+        "image_size": file.size,
+        "image_placeholder": blurhash.encode(small),
+    }
+
+
+def render_variant(image, size, image_format, quality):
+    """Return image scaled to fit size, encoded as image_format bytes."""
+    variant = image.copy()
+    variant.thumbnail(size, Image.LANCZOS)
+    if image_format == "JPEG" and variant.mode != "RGB":
+        variant = variant.convert("RGB")
+
+    buffer = io.BytesIO()
+    variant.save(buffer, format=image_format, quality=quality)
+    return buffer.getvalue()
+
+
+def generate_variants(recipe_id, name):
+    """
+    Write every configured variant of the image stored as name.
+
+    The variants are recorded only if the recipe still has that image,
+    so a replacement uploaded in the meantime is never overwritten with
+    stale variants; their storage references are released otherwise, or
+    if any variant fails.
+    """
+    storage = Recipe._meta.get_field("image").storage
+    config = get_config()
+    if not Recipe.objects.filter(pk=recipe_id, image=name).exists():
+        return {}
+
+    with storage.open(name) as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+
+    variants = {}
+    try:
+        for variant, options in config.get("VARIANTS", {}).items():
+            image_format = options.get("format", "JPEG")
+            data = render_variant(
+                image, options["size"], image_format,
+                options.get("quality", config.get("QUALITY", 85)),
+            )
+            variants[variant] = storage.save(
+                variant_name(name, variant, image_format), ContentFile(data)
+            )
+
+        updated = Recipe.objects.filter(pk=recipe_id, image=name).update(
+            image_variants=variants
+        )
+    except BaseException:
+        # Each save took a blob reference that nothing would release.
+        for stored in variants.values():
+            storage.delete(stored)
+        raise
+    if updated:
+        user_id = Recipe.objects.values_list("user_id", flat=True).get(
+            pk=recipe_id
+        )
+        UserDataVersion.bump(user_id)
+    else:
+        for stored in variants.values():
+            storage.delete(stored)
+
+    return variants
+
+
+class WorkerPool:
+    """
+    Bounded thread pool for work that must not block the request.
+
+    At most IMAGE_PROCESSING["MAX_PENDING"] jobs are queued or running;
+    further jobs are dropped with a warning instead of piling up memory.
+    With IMAGE_PROCESSING["EAGER"] jobs run inline, for tests.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        """Create the executor on first use."""
+        with self._lock:
+            if self._executor is None:
+                config = get_config()
+                self._slots = threading.BoundedSemaphore(
+                    config.get("MAX_PENDING", 64)
+                )
+                self._executor = ThreadPoolExecutor(
+                    max_workers=config.get("WORKERS", 2),
+                    thread_name_prefix="recipe-images",
+                )
+
+    def submit(self, func, *args):
+        """Run func(*args) in the background; return False if full."""
+        if get_config().get("EAGER"):
+            self._call(func, *args)
+            return True
+
+        if self._executor is None:
+            self._start()
+        if not self._slots.acquire(blocking=False):
+            logger.warning("Image worker queue full, dropped %s", func)
+            return False
+
+        self._executor.submit(self._run, func, *args)
+        return True
+
+    def _call(self, func, *args):
+        """Run a job, logging rather than raising its failure."""
+        try:
+            func(*args)
+        except Exception:
+            logger.exception("Image job %s%r failed", func.__name__, args)
+
+    def _run(self, func, *args):
+        """Run a job on a worker thread and release its slot."""
+        try:
+            self._call(func, *args)
+        finally:
+            connections.close_all()
+            self._slots.release()
+
+
+pool = WorkerPool()
+
+
+def schedule_variants(recipe):
+    """Generate the variants of recipe's image once the upload commits."""
+    name = recipe.image.name
+    transaction.on_commit(
+        lambda: pool.submit(generate_variants, recipe.id, name)
+    )
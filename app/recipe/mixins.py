@@ -0,0 +1,204 @@
+"""
+Mixins for the recipe API views.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from core.models import UserDataVersion
+
+
+def normalize_ids(value):
+    """Normalize a comma separated id list to a sorted tuple."""
+    return tuple(sorted({int(part) for part in value.split(",")}))
+
+
+def normalize_names(value):
+    """Normalize a comma separated name list to a sorted tuple."""
+    return tuple(sorted(
+        {part.strip() for part in value.split(",")} - {""}
+    ))
+
+
+class DataVersionMixin:
+    """Look up the requesting user's data version once per request."""
+
+    def get_data_version(self):
+        """Return the user's (version, modified_at)."""
+        if not hasattr(self, "_data_version"):
+            self._data_version = UserDataVersion.current(
+                self.request.user.id
+            )
+        return self._data_version
+
+
+class ConditionalGetMixin(DataVersionMixin):
+    """
+    Answer list with 304 Not Modified when the user's data is unchanged.
+    Other read actions can opt in by routing through conditional().
+
+    The validators come from the user's UserDataVersion row, a single
+    primary-key lookup, so a 304 is returned before the queryset is
+    evaluated or anything is serialized.
+    """
+
+    def get_validators(self):
+        """Return (etag, last_modified) for the current request."""
+        version, modified_at = self.get_data_version()
+        params = sorted(self.request.query_params.lists())
+        key = repr((
+            self.request.user.id,
+            version,
+            self.action,
+            self.kwargs.get(self.lookup_url_kwarg or self.lookup_field),
+            params,
+            self.request.accepted_media_type,
+        ))
+        etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+        last_modified = int(modified_at.timestamp()) if modified_at else None
+
+        return etag, last_modified
+
+    def conditional(self, handler, request, *args, **kwargs):
+        """Run handler unless the client's cached copy is still current."""
+        etag, last_modified = self.get_validators()
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified,
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+            patch_cache_control(response, private=True, no_cache=True)
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """List objects, or 304 if the client's copy is current."""
+        return self.conditional(super().list, request, *args, **kwargs)
+
+
+class CachedListMixin(DataVersionMixin):
+    """
+    Cache list response data per user, data version and query params.
+
+    Writes bump the user's data version, which is part of the key, so a
+    write invalidates every cached list of that user at once and stale
+    entries simply age out. Only requests whose params are all listed in
+    cache_params are cached; each maps to a normaliser so equivalent
+    params such as "2,1" and "1, 2" share an entry. The backing cache and
+    its size bound come from RESPONSE_CACHE and CACHES.
+    """
+    cache_params = {}
+
+    def get_list_cache_key(self):
+        """Return the cache key for this list request, or None."""
+        params = {}
+        for name, value in self.request.query_params.items():
+            normalize = self.cache_params.get(name)
+            if normalize is None:
+                return None
+            try:
+                params[name] = normalize(value)
+            except ValueError:
+                return None
+
+        version, _ = self.get_data_version()
+        label = self.queryset.model._meta.label
+        digest = hashlib.md5(
+            repr((self.action, sorted(params.items()))).encode()
+        ).hexdigest()
+
+        return f"list:{label}:{self.request.user.id}:{version}:{digest}"
+
+    def list(self, request, *args, **kwargs):
+        """List objects, from the response cache when possible."""
+        config = getattr(settings, "RESPONSE_CACHE", {})
+        key = self.get_list_cache_key() if config.get("CACHE") else None
+        if key is None:
+            return super().list(request, *args, **kwargs)
+
+        cache = caches[config["CACHE"]]
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            # The rendered size stands in for the entry's; the backend
+            # serializes response.data itself.
+            def store(response):
+                max_bytes = config.get("MAX_ENTRY_BYTES", 256 * 1024)
+                if len(response.rendered_content) <= max_bytes:
+                    cache.set(key, response.data)
+
+            response.add_post_render_callback(store)
+
+        return response
+
+
+class IncludedMixin:
+    """
+    Side-load related objects once per list response with ?include=.
+
+    Relations named in include are rendered on each object as a list of
+    ids, and every referenced object is returned once under "included",
+    keyed by relation and ordered by id. The list becomes an object:
+    {"results": [...], "included": {...}}, paginated lists gain the
+    "included" key. Sit below CachedListMixin so cached entries hold the
+    side-loaded objects too.
+    """
+    include_serializers = {}
+
+    def get_included_relations(self):
+        """Return the relations named in ?include= on list, else empty."""
+        if self.action != "list" or "include" not in self.request.query_params:
+            return set()
+
+        include = set(normalize_names(self.request.query_params["include"]))
+        unknown = sorted(include - self.include_serializers.keys())
+        if unknown:
+            raise ValidationError(
+                {"include": [f"Cannot include: {', '.join(unknown)}."]}
+            )
+        return include
+
+    def get_included(self, items, relations):
+        """Return {relation: serialized objects referenced by items}."""
+        included = {}
+        for relation in sorted(relations):
+            serializer_class = self.include_serializers[relation]
+            ids = {pk for item in items for pk in item.get(relation, ())}
+            objects = serializer_class.Meta.model.objects.filter(
+                id__in=ids
+            ).order_by("id") if ids else []
+            included[relation] = serializer_class(
+                objects, many=True, context=self.get_serializer_context()
+            ).data
+        return included
+
+    def list(self, request, *args, **kwargs):
+        """List objects, side-loading the included relations."""
+        relations = self.get_included_relations()
+        response = super().list(request, *args, **kwargs)
+        if not relations or response.status_code != 200:
+            return response
+
+        data = response.data
+        if isinstance(data, dict):
+            data["included"] = self.get_included(data["results"], relations)
+        else:
+            response.data = {
+                "results": data,
+                "included": self.get_included(data, relations),
+            }
+        return response
@@ -0,0 +1,54 @@
+"""
+Pagination for the recipe APIs.
+"""
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class RecipeCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the recipe list's -id ordering.
+
+    Each page is a `WHERE id < <cursor> ORDER BY id DESC LIMIT n` query,
+    so page N costs the same as page 1 and no COUNT(*) is issued.
+    Pagination is opt-in: requests without a cursor or page size get the
+    full, unpaginated list as before.
+    """
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    ordering = "-id"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Paginate only when the client asked for a page."""
+        params = request.query_params
+        if (
+            self.cursor_query_param not in params
+            and self.page_size_query_param not in params
+        ):
+            return None
+
+        return super().paginate_queryset(queryset, request, view)
+
+
+class RecipeSearchPagination(PageNumberPagination):
+    """
+    Page numbers over search results, which are ordered by rank.
+
+    A cursor over -id would drop the rank ordering, so searches are
+    paginated by offset instead; result sets are bounded by the search.
+    Like the list, pagination is opt-in with ?page= or ?page_size=.
+    """
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Paginate only when the client asked for a page."""
+        params = request.query_params
+        if (
+            self.page_query_param not in params
+            and self.page_size_query_param not in params
+        ):
+            return None
+
+        return super().paginate_queryset(queryset, request, view)
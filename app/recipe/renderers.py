@@ -0,0 +1,61 @@
+"""
+Renderers for the recipe APIs.
+"""
+import csv
+
+from rest_framework import renderers
+
+from core.renderers import dumps
+
+
+class StreamingRenderer(renderers.BaseRenderer):
+    """
+    Renderer that can also stream rows, one dict at a time.
+
+    render() serves ordinary responses such as errors; stream() serves
+    views that return a StreamingHttpResponse.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        return b"".join(self.stream(rows))
+
+    def stream(self, rows):
+        """Yield the encoded bytes of rows."""
+        raise NotImplementedError
+
+
+class JSONLinesRenderer(StreamingRenderer):
+    """One JSON document per line."""
+    media_type = "application/x-ndjson"
+    format = "jsonl"
+
+    def stream(self, rows):
+        for row in rows:
+            yield dumps(row) + b"\n"
+
+
+class Echo:
+    """File-like object handing back whatever is written to it."""
+
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(StreamingRenderer):
+    """CSV with a header row; list values are joined with "|"."""
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(self, rows):
+        writer = csv.writer(Echo())
+        header = None
+        for row in rows:
+            if header is None:
+                header = list(row)
+                yield writer.writerow(header).encode()
+            yield writer.writerow([
+                "|".join(map(str, value)) if isinstance(value, list)
+                else value
+                for value in (row.get(key) for key in header)
+            ]).encode()
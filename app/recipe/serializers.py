@@ -1,12 +1,37 @@
+import os
+
+from PIL import Image
 from rest_framework import serializers
 from core.models import (
+    ImageUpload,
     Recipe,
     Tag,
-    Ingradient
+    Ingradient,
+    UserDataVersion,
 )
+from core.storage import release_on_commit
+from recipe import images, uploads
+
+
+class RecipeAttrSerializer(serializers.ModelSerializer):
+    """Base serializer for per-user named recipe attributes."""
+
+    def validate_name(self, value):
+        """Reject renaming onto a name the user already has."""
+        if self.instance is not None and (
+            self.Meta.model.objects
+            .filter(user=self.instance.user, name=value)
+            .exclude(pk=self.instance.pk)
+            .exists()
+        ):
+            raise serializers.ValidationError(
+                f"{self.Meta.model.__name__} with this name already exists."
+            )
 
+        return value
 
-class IngradientSerializer(serializers.ModelSerializer):
+
+class IngradientSerializer(RecipeAttrSerializer):
     """Serializer for ingradient objects."""
 
     class Meta:
@@ -15,7 +40,7 @@ class IngradientSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(RecipeAttrSerializer):
     """Serializer for tag objects."""
 
     class Meta:
@@ -24,10 +49,164 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class IngradientCountSerializer(IngradientSerializer):
+    """Serializer for ingradients with the number of recipes using them."""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngradientSerializer.Meta):
+        fields = IngradientSerializer.Meta.fields + ["recipe_count"]
+
+
+class TagCountSerializer(TagSerializer):
+    """Serializer for tags with the number of recipes using them."""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ["recipe_count"]
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """
+    Serializer for writing many recipes at once.
+
+    Tags and ingradients named anywhere in the batch are resolved together
+    and all through-table rows are written together, so the query count
+    does not grow with the batch size.
+    """
+    relations = {"tags": Tag, "ingradients": Ingradient}
+
+    def _pop_relations(self, validated_data):
+        """Split the nested tags and ingradients off each item."""
+        return [
+            {field: item.pop(field) for field in self.relations
+             if field in item}
+            for item in validated_data
+        ]
+
+    def _link_all(self, recipes, relations, replace=False):
+        """Resolve and link the nested objects of every recipe."""
+        for field, model in self.relations.items():
+            named = [
+                (recipe, related[field])
+                for recipe, related in zip(recipes, relations)
+                if field in related
+            ]
+            if not named:
+                continue
+
+            objs = {
+                obj.name: obj
+                for obj in self.child._get_or_create(
+                    model, [item for _, items in named for item in items]
+                )
+            }
+            self.child._link(
+                field,
+                {
+                    recipe.id: [objs[item["name"]] for item in items]
+                    for recipe, items in named
+                },
+                replace,
+            )
+
+    def create(self, validated_data):
+        """Create and return recipes."""
+        relations = self._pop_relations(validated_data)
+        recipes = Recipe.objects.bulk_create(
+            [Recipe(**item) for item in validated_data]
+        )
+        self._link_all(recipes, relations)
+        UserDataVersion.bump(self.context["request"].user.id)
+
+        return recipes
+
+    def update(self, instance, validated_data):
+        """Update and return recipes, instance[i] taking validated_data[i]."""
+        relations = self._pop_relations(validated_data)
+        changed = set()
+        for recipe, item in zip(instance, validated_data):
+            for attr, value in item.items():
+                if getattr(recipe, attr) != value:
+                    setattr(recipe, attr, value)
+                    changed.add(attr)
+
+        if changed:
+            Recipe.objects.bulk_update(instance, sorted(changed))
+        self._link_all(instance, relations, replace=True)
+        UserDataVersion.bump(self.context["request"].user.id)
+
+        return instance
+
+
+IMAGE_METADATA_FIELDS = [
+    "image_width",
+    "image_height",
+    "image_size",
+    "image_placeholder",
+]
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """URLs of a recipe's generated image variants, once they are ready."""
+
+    def __init__(self, list_only=False, **kwargs):
+        self.list_only = list_only
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        storage = Recipe._meta.get_field("image").storage
+        config = images.get_config().get("VARIANTS", {})
+        request = self.context.get("request")
+        urls = {}
+        for variant, name in value.items():
+            if self.list_only and not config.get(variant, {}).get("list"):
+                continue
+            url = storage.url(name)
+            urls[variant] = (
+                request.build_absolute_uri(url) if request else url
+            )
+
+        return urls
+
+
+class SparseFieldsMixin:
+    """
+    Serialize only the fields a request selected.
+
+    The view passes context["sparse"] as (fields, expand): fields is the
+    set of field names to keep, or None for all of them. Relations in
+    expandable that are kept but not in expand are rendered as a list of
+    ids, so their nested serializer never runs.
+    """
+    expandable = ()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        sparse = self.context.get("sparse")
+        if sparse is None:
+            return fields
+
+        wanted, expand = sparse
+        if wanted is not None:
+            fields = {
+                name: field for name, field in fields.items()
+                if name in wanted
+            }
+        for name in self.expandable:
+            if name in fields and name not in expand:
+                fields[name] = serializers.PrimaryKeyRelatedField(
+                    many=True, read_only=True
+                )
+
+        return fields
+
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer of recipe object."""
+    expandable = ("tags", "ingradients")
     tags = TagSerializer(many=True, required=False)
     ingradients = IngradientSerializer(many=True, required=False)
+    image_variants = ImageVariantsField(list_only=True)
 
     class Meta:
         model = Recipe
@@ -38,37 +217,109 @@ class RecipeSerializer(serializers.ModelSerializer):
             "price",
             "link",
             "tags",
-            "ingradients"
-        ]
+            "ingradients",
+            "image_variants",
+        ] + IMAGE_METADATA_FIELDS
         read_only_fields = ["id"]
+        list_serializer_class = RecipeListSerializer
 
-    def _get_or_create_tags(self, tags, recipe):
-        """Handle getting or creating tags as needed."""
+    def _get_or_create(self, model, items):
+        """
+        Return the user's objects named in items, creating missing ones.
+
+        Resolves every name in one SELECT and inserts the missing ones in
+        one INSERT. Conflicting rows from a concurrent create are skipped
+        by the insert and picked up by the follow-up SELECT.
+        """
         auth_user = self.context["request"].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
+        names = list(dict.fromkeys(item["name"] for item in items))
+        if not names:
+            return []
+
+        objs = {
+            obj.name: obj
+            for obj in model.objects.filter(user=auth_user, name__in=names)
+        }
+        missing = [name for name in names if name not in objs]
+        if missing:
+            model.objects.bulk_create(
+                [model(user=auth_user, name=name) for name in missing],
+                ignore_conflicts=True,
             )
-            recipe.tags.add(tag_obj)
+            objs.update(
+                (obj.name, obj)
+                for obj in model.objects.filter(
+                    user=auth_user, name__in=missing
+                )
+            )
+
+        return [objs[name] for name in names]
+
+    def _link(self, field, links, replace=False):
+        """
+        Link recipes to objects through field in a single INSERT.
+
+        links maps each recipe id to the objects it should be linked to.
+        With replace, other links of those recipes are removed. Only the
+        difference against the current links is written, so unchanged
+        rows are neither deleted nor re-inserted. Returns whether any
+        link was written.
+        """
+        m2m = Recipe._meta.get_field(field)
+        through = m2m.remote_field.through
+        source, target = m2m.m2m_column_name(), m2m.m2m_reverse_name()
+        wanted = {
+            (recipe_id, obj.id)
+            for recipe_id, objs in links.items()
+            for obj in objs
+        }
+
+        if replace:
+            rows = through.objects.filter(**{f"{source}__in": list(links)})
+            current = {
+                (recipe_id, obj_id): pk
+                for pk, recipe_id, obj_id in rows.values_list(
+                    "id", source, target
+                )
+            }
+            stale = [pk for pair, pk in current.items() if pair not in wanted]
+            if stale:
+                through.objects.filter(id__in=stale).delete()
+            wanted -= current.keys()
+        else:
+            stale = []
+
+        through.objects.bulk_create(
+            [through(**{source: recipe_id, target: obj_id})
+             for recipe_id, obj_id in wanted],
+            ignore_conflicts=True,
+        )
+
+        return bool(stale or wanted)
+
+    def _get_or_create_tags(self, tags, recipe, replace=False):
+        """Handle getting or creating tags as needed."""
+        return self._link(
+            "tags", {recipe.id: self._get_or_create(Tag, tags)}, replace
+        )
 
-    def _get_or_create_ingradients(self, ingradients, recipe):
+    def _get_or_create_ingradients(self, ingradients, recipe, replace=False):
         """Handle getting or creating ingradients as needed."""
-        auth_user = self.context["request"].user
-        for ing in ingradients:
-            ing_obj, createted = Ingradient.objects.get_or_create(
-                user=auth_user,
-                **ing
-            )
-            recipe.ingradients.add(ing_obj)
+        return self._link(
+            "ingradients",
+            {recipe.id: self._get_or_create(Ingradient, ingradients)},
+            replace,
+        )
 
     def create(self, validated_data):
         """Create and return a recipe."""
         tags = validated_data.pop("tags", [])
         ings = validated_data.pop("ingradients", [])
         recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingradients(ings, recipe)
+        linked = self._get_or_create_tags(tags, recipe)
+        linked = self._get_or_create_ingradients(ings, recipe) or linked
+        if linked:
+            UserDataVersion.bump(recipe.user_id)
 
         return recipe
 
@@ -77,23 +328,33 @@ class RecipeSerializer(serializers.ModelSerializer):
         tags = validated_data.pop("tags", None)
         ings = validated_data.pop("ingradients", None)
 
+        linked = False
         if ings is not None:
-            instance.ingradients.clear()
-            self._get_or_create_ingradients(ings, instance)
+            linked = self._get_or_create_ingradients(
+                ings, instance, replace=True
+            )
 
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            linked = self._get_or_create_tags(
+                tags, instance, replace=True
+            ) or linked
 
+        changed = []
         for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+            if getattr(instance, attr) != value:
+                setattr(instance, attr, value)
+                changed.append(attr)
 
-        instance.save()
+        if changed:
+            instance.save(update_fields=changed)
+        elif linked:
+            UserDataVersion.bump(instance.user_id)
         return instance
 
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for recipe detail view."""
+    image_variants = ImageVariantsField()
 
     class Meta(RecipeSerializer.Meta):
         fields = RecipeSerializer.Meta.fields + ["description", "image"]
@@ -104,6 +365,49 @@ class RecipeImageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        fields = ["id", "image"]
+        fields = ["id", "image"] + IMAGE_METADATA_FIELDS
         read_only_fields = ["id"]
         extra_kwargs = {"image": {"required": True}}
+
+    def validate(self, attrs):
+        """Read the image's metadata, rejecting files that do not decode."""
+        try:
+            attrs.update(images.image_metadata(attrs["image"]))
+        except (OSError, Image.DecompressionBombError):
+            raise serializers.ValidationError(
+                {"image": ["Upload a valid image."]}
+            )
+
+        return attrs
+
+    def update(self, instance, validated_data):
+        """Store the image and its metadata; resize it in the background."""
+        release_on_commit(instance.image.storage, instance.image_files())
+        instance.image_variants = {}
+        instance = super().update(instance, validated_data)
+        images.schedule_variants(instance)
+
+        return instance
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    """Serializer to open a resumable image upload."""
+
+    class Meta:
+        model = ImageUpload
+        fields = ["id", "filename", "size", "offset"]
+        read_only_fields = ["id", "offset"]
+
+    def validate_size(self, value):
+        """Reject empty uploads and uploads over the size limit."""
+        max_bytes = uploads.get_config().get("MAX_BYTES", 10 << 20)
+        if not 0 < value <= max_bytes:
+            raise serializers.ValidationError(
+                f"Must be between 1 and {max_bytes} bytes."
+            )
+
+        return value
+
+    def validate_filename(self, value):
+        """Keep only the base name of the client's file."""
+        return os.path.basename(value)
@@ -0,0 +1,219 @@
+"""
+Tests that the .values() fast path renders exactly what the serializers do.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Ingradient, Recipe, Tag
+from recipe.fastpath import ValuesSerializer
+from recipe.serializers import RecipeDetailSerializer, RecipeSerializer
+from recipe.views import RELATION_PREFETCHES
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+SPARSE_CASES = [
+    None,
+    ({"id", "title"}, set()),
+    ({"id", "title", "tags", "price"}, set()),
+    (None, {"tags"}),
+    (None, {"tags", "ingradients"}),
+    ({"id", "ingradients", "image_variants"}, {"ingradients"}),
+]
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail url."""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+class ValuesSerializerParityTests(TestCase):
+    """Test ValuesSerializer output is byte-identical to the serializers."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        self.user = get_user_model().objects.create_user(
+            "user@example.com", "test123"
+        )
+        self.request = APIRequestFactory().get("/api/recipe/recipes/")
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ("Veg", "Quick", "Ünïcode \"quoted\"")
+        ]
+        ings = [
+            Ingradient.objects.create(user=self.user, name=name)
+            for name in ("Salt", "Rice")
+        ]
+        plain = Recipe.objects.create(
+            user=self.user, title="Plain", time_minutes=0,
+            price=Decimal("0"),
+        )
+        imaged = Recipe.objects.create(
+            user=self.user, title="Imaged", time_minutes=45,
+            price=Decimal("12.5"), link="http://example.com/r",
+            description="Long\ndescription", image="uploads/recipe/a.jpg",
+            image_variants={
+                "thumb": "blobs/aa/thumb.jpg", "large": "blobs/bb/large.jpg",
+            },
+            image_width=640, image_height=480, image_size=1234,
+            image_placeholder="LEHV6nWB2yk8pyo0adR*.7kCMdnj",
+        )
+        # Linked out of id order, to check relations come out sorted.
+        imaged.tags.add(tags[2], tags[0])
+        imaged.ingradients.add(ings[1], ings[0])
+        plain.tags.add(tags[1])
+        self.recipes = [plain, imaged]
+
+    def render_both(self, serializer_class, sparse, many=True):
+        """Return (serializer JSON, fast path JSON) for the recipes."""
+        context = {"request": self.request, "sparse": sparse}
+        queryset = Recipe.objects.filter(user=self.user).order_by("-id")
+        fast = ValuesSerializer(serializer_class, context=context)
+        rows = queryset.values(*fast.columns())
+        instances = queryset.prefetch_related(*RELATION_PREFETCHES)
+        if not many:
+            rows, instances = rows.last(), instances.last()
+
+        slow = serializer_class(instances, many=many, context=context)
+        fast = ValuesSerializer(
+            serializer_class, rows, many=many, context=context
+        )
+        return (
+            JSONRenderer().render(slow.data),
+            JSONRenderer().render(fast.data),
+        )
+
+    def test_list_parity(self):
+        """Test list output matches RecipeSerializer for each fieldset."""
+        for sparse in SPARSE_CASES:
+            with self.subTest(sparse=sparse):
+                slow, fast = self.render_both(RecipeSerializer, sparse)
+                self.assertEqual(fast, slow)
+
+    def test_detail_parity(self):
+        """Test detail output matches RecipeDetailSerializer."""
+        for sparse in SPARSE_CASES + [({"id", "image", "description"}, set())]:
+            for many in (True, False):
+                with self.subTest(sparse=sparse, many=many):
+                    slow, fast = self.render_both(
+                        RecipeDetailSerializer, sparse, many
+                    )
+                    self.assertEqual(fast, slow)
+
+    def test_no_rows(self):
+        """Test an empty list renders without querying relations."""
+        fast = ValuesSerializer(
+            RecipeSerializer, Recipe.objects.none().values("id"), many=True,
+        )
+
+        with self.assertNumQueries(0):
+            self.assertEqual(fast.data, [])
+
+    def test_columns(self):
+        """Test only the selected non-relation columns are read."""
+        fast = ValuesSerializer(
+            RecipeSerializer,
+            context={"sparse": ({"id", "title", "tags"}, set())},
+        )
+
+        self.assertEqual(fast.columns(), ["id", "title"])
+
+
+# Caching would serve the second request from the first one's entry.
+@override_settings(RESPONSE_CACHE={})
+class FastPathApiTests(TestCase):
+    """Test API responses match what the serializers render."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@example.com", "test123"
+        )
+        self.client.force_authenticate(self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=f"Tag{i}")
+            for i in range(4)
+        ]
+        for i in range(6):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f"Curry {i}", time_minutes=i,
+                price=Decimal(i) / 4, description="Spicy curry",
+            )
+            recipe.tags.add(*tags[i % 3:])
+        self.recipe = recipe
+
+    def render(self, serializer_class, instance, many=False, sparse=None):
+        """Return the serializer's JSON for instance."""
+        request = APIRequestFactory().get(RECIPES_URL)
+        serializer = serializer_class(
+            instance, many=many,
+            context={"request": request, "sparse": sparse},
+        )
+        return JSONRenderer().render(serializer.data)
+
+    def test_list_matches_serializer(self):
+        """Test list results match RecipeSerializer, sparse or not."""
+        recipes = Recipe.objects.filter(user=self.user).order_by(
+            "-id"
+        ).prefetch_related(*RELATION_PREFETCHES)
+        cases = [
+            ({}, None),
+            ({"search": "curry"}, None),
+            ({"fields": "title,tags", "expand": "tags"},
+             ({"id", "title", "tags"}, {"tags"})),
+        ]
+        for params, sparse in cases:
+            with self.subTest(params=params):
+                res = self.client.get(RECIPES_URL, params)
+
+                self.assertEqual(res.status_code, 200)
+                self.assertEqual(
+                    res.content,
+                    self.render(RecipeSerializer, recipes, True, sparse),
+                )
+
+        res = self.client.get(RECIPES_URL, {"page_size": 4})
+
+        self.assertEqual(
+            JSONRenderer().render(res.data["results"]),
+            self.render(RecipeSerializer, recipes[:4], True),
+        )
+
+    def test_detail_matches_serializer(self):
+        """Test detail output matches RecipeDetailSerializer."""
+        recipe = Recipe.objects.prefetch_related(
+            *RELATION_PREFETCHES
+        ).get(id=self.recipe.id)
+        cases = [
+            ({}, None),
+            ({"fields": "description,tags"},
+             ({"id", "description", "tags"}, set())),
+        ]
+        for params, sparse in cases:
+            with self.subTest(params=params):
+                res = self.client.get(detail_url(recipe.id), params)
+
+                self.assertEqual(res.status_code, 200)
+                self.assertEqual(
+                    res.content,
+                    self.render(RecipeDetailSerializer, recipe, sparse=sparse),
+                )
+
+    def test_missing_recipe(self):
+        """Test retrieving another user's recipe is still a 404."""
+        other = get_user_model().objects.create_user(
+            "other@example.com", "test123"
+        )
+        recipe = Recipe.objects.create(
+            user=other, title="Other", time_minutes=1, price=Decimal("1"),
+        )
+
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, 404)
@@ -1,14 +1,19 @@
+from django.core.cache import caches
 from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from core.models import Ingradient, Recipe
 from rest_framework import status
 from rest_framework.test import APIClient
 from django.urls import reverse
+from recipe import autocomplete
 from recipe.serializers import IngradientSerializer
 from decimal import Decimal
 
 
 INGREADIENT_URLS = reverse("recipe:ingradient-list")
+AUTOCOMPLETE_URL = reverse("recipe:ingradient-autocomplete")
 
 
 def detail_url(ingradient_id):
@@ -28,6 +33,7 @@ class PublicIngradientsApiTests(TestCase):
     """Test unathenticated API requests."""
 
     def setUp(self):
+        caches["api-responses"].clear()
         self.client = APIClient()
 
     def test_auth_required(self):
@@ -41,6 +47,7 @@ class PrivateIngredientApiTests(TestCase):
     """Test authenticated API requests."""
 
     def setUp(self):
+        caches["api-responses"].clear()
         self.user = create_user()
         self.client = APIClient()
         self.client.force_authenticate(self.user)
@@ -140,3 +147,85 @@ class PrivateIngredientApiTests(TestCase):
         res = self.client.get(INGREADIENT_URLS, {"assigned_only": 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_assigned_only_uses_semi_join(self):
+        """Test assigned_only is an EXISTS filter without DISTINCT."""
+        Ingradient.objects.create(user=self.user, name="Eggs")
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(INGREADIENT_URLS, {"assigned_only": 1})
+
+        sql = next(
+            q["sql"] for q in ctx.captured_queries
+            if q["sql"].startswith('SELECT "core_ingradient"')
+        )
+        self.assertIn("EXISTS", sql)
+        self.assertNotIn("DISTINCT", sql)
+
+    def test_list_with_counts(self):
+        """Test with_counts includes each ingradient's recipe count."""
+        eggs = Ingradient.objects.create(user=self.user, name="Eggs")
+        salt = Ingradient.objects.create(user=self.user, name="Salt")
+        Ingradient.objects.create(user=self.user, name="Chilli")
+        for title in ("Omelette", "Egg curry"):
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=10,
+                price=Decimal("2.00"),
+                user=self.user,
+            )
+            recipe.ingradients.add(eggs)
+        recipe.ingradients.add(salt)
+
+        res = self.client.get(INGREADIENT_URLS, {"with_counts": 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(i["name"], i["recipe_count"]) for i in res.data],
+            [("Salt", 1), ("Eggs", 2), ("Chilli", 0)],
+        )
+
+    def test_assigned_only_with_counts(self):
+        """Test with_counts combines with assigned_only."""
+        eggs = Ingradient.objects.create(user=self.user, name="Eggs")
+        Ingradient.objects.create(user=self.user, name="Chilli")
+        recipe = Recipe.objects.create(
+            title="Omelette",
+            time_minutes=10,
+            price=Decimal("2.00"),
+            user=self.user,
+        )
+        recipe.ingradients.add(eggs)
+
+        res = self.client.get(
+            INGREADIENT_URLS, {"assigned_only": 1, "with_counts": 1}
+        )
+
+        self.assertEqual(
+            res.data, [{"id": eggs.id, "name": "Eggs", "recipe_count": 1}]
+        )
+
+    def test_invalid_flags_rejected(self):
+        """Test flags other than 0 or 1 are a 400, not a 500."""
+        for name in ("assigned_only", "with_counts"):
+            for value in ("x", "2"):
+                with self.subTest(name=name, value=value):
+                    res = self.client.get(INGREADIENT_URLS, {name: value})
+
+                    self.assertEqual(
+                        res.status_code, status.HTTP_400_BAD_REQUEST
+                    )
+                    self.assertEqual(res.data, {name: ["Must be 0 or 1."]})
+
+    def test_autocomplete(self):
+        """Test suggesting the user's ingradient names."""
+        autocomplete.get_cache().clear()
+        salt = Ingradient.objects.create(user=self.user, name="Salt")
+        Ingradient.objects.create(user=self.user, name="Sugar")
+        Ingradient.objects.create(user=self.user, name="Basil")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "sa"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0], {"id": salt.id, "name": "Salt"})
+        self.assertNotIn("Sugar", [i["name"] for i in res.data])
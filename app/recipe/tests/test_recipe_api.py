@@ -1,25 +1,41 @@
 from decimal import Decimal
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.cache import caches
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+import csv
+import hashlib
+import json
 import tempfile
+import threading
 import os
+from io import BytesIO
+from unittest.mock import patch
 from PIL import Image
 
 from core.models import (
+    ImageBlob,
+    ImageUpload,
     Recipe,
     Tag,
     Ingradient,
 )
+from core.tests.query_budget import QueryBudgetMixin
+from recipe import blurhash, checks, images, uploads
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
+    TagSerializer,
 )
+from recipe.views import RecipeViewSet
 
 
 RECIPES_URL = reverse("recipe:recipe-list")
+BULK_URL = reverse("recipe:recipe-bulk")
 
 
 def detail_url(recipe_id):
@@ -57,6 +73,7 @@ class PublicRecipeAPITests(TestCase):
     """Test public features of the Recipe API."""
 
     def setUp(self):
+        caches["api-responses"].clear()
         self.client = APIClient()
 
     def test_auth_required(self):
@@ -70,6 +87,7 @@ class PrivateRecipeAPITests(TestCase):
     """Test API requests that required authentication."""
 
     def setUp(self):
+        caches["api-responses"].clear()
         self.client = APIClient()
         self.user = create_user(email="user@example.com", password="test123")
         self.client.force_authenticate(self.user)
@@ -253,6 +271,21 @@ class PrivateRecipeAPITests(TestCase):
             ).exists()
             self.assertTrue(tag_exist)
 
+    def test_create_recipe_with_repeated_tag(self):
+        """Test a tag named twice in one payload is linked once."""
+        payload = {
+            "title": "Idli",
+            "time_minutes": 20,
+            "price": Decimal("1.50"),
+            "tags": [{"name": "Breakfast"}, {"name": "Breakfast"}]
+        }
+        res = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data["id"])
+        self.assertEqual(recipe.tags.count(), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_create_tag_on_update(self):
         """Test creating a tag when updating a recipe."""
         recipe = create_recipe(user=self.user)
@@ -282,6 +315,53 @@ class PrivateRecipeAPITests(TestCase):
         self.assertIn(tag_lunch, recipe.tags.all())
         self.assertNotIn(tag_breakfast, recipe.tags.all())
 
+    def test_update_tags_only_writes_difference(self):
+        """Test updating tags keeps unchanged links and removes stale ones."""
+        keep = Tag.objects.create(user=self.user, name="Keep")
+        drop = Tag.objects.create(user=self.user, name="Drop")
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(keep, drop)
+        through = Recipe.tags.through
+        kept_link = through.objects.get(recipe=recipe, tag=keep)
+
+        payload = {"tags": [{"name": "Keep"}, {"name": "New"}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(recipe.tags.values_list("name", flat=True)), {"Keep", "New"}
+        )
+        self.assertTrue(through.objects.filter(id=kept_link.id).exists())
+
+    def test_update_unchanged_tags_issues_no_writes(self):
+        """Test re-sending the current tags does not touch the links."""
+        tag = Tag.objects.create(user=self.user, name="Lunch")
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+
+        payload = {"tags": [{"name": "Lunch"}]}
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.patch(detail_url(recipe.id), payload, format="json")
+
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertNotIn("DELETE", sql)
+        self.assertNotIn("INSERT", sql)
+
+    def test_partial_update_writes_changed_columns_only(self):
+        """Test a partial update rewrites only the changed column."""
+        recipe = create_recipe(user=self.user, title="Old title")
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.patch(detail_url(recipe.id), {"title": "New title"})
+
+        updates = [
+            q["sql"] for q in ctx.captured_queries
+            if q["sql"].startswith('UPDATE "core_recipe"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"title"', updates[0])
+        self.assertNotIn('"description"', updates[0])
+
     def test_clear_recipe_tags(self):
         """Test clearing recipes tags."""
         tag = Tag.objects.create(user=self.user, name="Non-veg")
@@ -427,10 +507,713 @@ class PrivateRecipeAPITests(TestCase):
         self.assertNotIn(s3.data, res.data)
 
 
+class RecipeFilterTests(TestCase):
+    """Test filtering recipes by tags and ingradients."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="test123")
+        self.client.force_authenticate(self.user)
+        self.veg = Tag.objects.create(user=self.user, name="Veg")
+        self.quick = Tag.objects.create(user=self.user, name="Quick")
+        self.both = create_recipe(user=self.user, title="Salad")
+        self.both.tags.add(self.veg, self.quick)
+        self.veg_only = create_recipe(user=self.user, title="Dal")
+        self.veg_only.tags.add(self.veg)
+        create_recipe(user=self.user, title="Steak")
+
+    def _ids(self, params):
+        """Return the ids listed for params."""
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [r["id"] for r in res.data]
+
+    def test_match_any_returns_each_recipe_once(self):
+        """Test a recipe matching several tags is listed once."""
+        ids = self._ids({"tags": f"{self.veg.id},{self.quick.id}"})
+
+        self.assertEqual(ids, [self.veg_only.id, self.both.id])
+
+    def test_filter_uses_semi_join(self):
+        """Test filtering uses EXISTS instead of JOIN plus DISTINCT."""
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(RECIPES_URL, {"tags": self.veg.id})
+
+        sql = next(
+            q["sql"] for q in ctx.captured_queries
+            if q["sql"].startswith('SELECT "core_recipe"')
+        )
+        self.assertIn("EXISTS", sql)
+        self.assertNotIn("DISTINCT", sql)
+
+    def test_match_all_tags(self):
+        """Test match=all returns recipes having every listed tag."""
+        ids = self._ids({
+            "tags": f"{self.veg.id},{self.quick.id},{self.veg.id}",
+            "match": "all",
+        })
+
+        self.assertEqual(ids, [self.both.id])
+
+    def test_match_all_tags_and_ingradients(self):
+        """Test match=all applies to tags and ingradients together."""
+        salt = Ingradient.objects.create(user=self.user, name="Salt")
+        self.veg_only.ingradients.add(salt)
+
+        ids = self._ids({
+            "tags": str(self.veg.id),
+            "ingradients": str(salt.id),
+            "match": "all",
+        })
+
+        self.assertEqual(ids, [self.veg_only.id])
+
+    def test_invalid_match_error(self):
+        """Test an unknown match mode is rejected."""
+        res = self.client.get(
+            RECIPES_URL, {"tags": self.veg.id, "match": "some"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeSearchTests(TestCase):
+    """Test full-text search over recipes."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="test123")
+        self.client.force_authenticate(self.user)
+        self.curry = create_recipe(
+            user=self.user, title="Chickpea curry",
+            description="Simmered with tomatoes",
+        )
+        self.soup = create_recipe(
+            user=self.user, title="Tomato soup",
+            description="Serve with a curry leaf garnish",
+        )
+        create_recipe(user=self.user, title="Pancakes")
+
+    def _ids(self, params):
+        """Return the ids listed for params."""
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [r["id"] for r in res.data]
+
+    def test_search_title_and_description(self):
+        """Test search matches words in the title or description."""
+        ids = self._ids({"search": "tomato"})
+
+        self.assertCountEqual(ids, [self.curry.id, self.soup.id])
+
+    def test_search_ranks_title_first(self):
+        """Test a title match ranks above a description match."""
+        if connection.vendor != "postgresql":
+            self.skipTest("Ranking needs PostgreSQL full-text search.")
+
+        ids = self._ids({"search": "curry"})
+
+        self.assertEqual(ids, [self.curry.id, self.soup.id])
+
+    def test_search_paginated_by_rank(self):
+        """Test paginated search results keep the rank ordering."""
+        if connection.vendor != "postgresql":
+            self.skipTest("Ranking needs PostgreSQL full-text search.")
+
+        res = self.client.get(RECIPES_URL, {"search": "curry", "page_size": 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 2)
+        self.assertEqual(
+            [r["id"] for r in res.data["results"]], [self.curry.id]
+        )
+
+        res = self.client.get(res.data["next"])
+
+        self.assertEqual(
+            [r["id"] for r in res.data["results"]], [self.soup.id]
+        )
+        self.assertIsNone(res.data["next"])
+
+    def test_search_tracks_updates(self):
+        """Test search sees edited titles."""
+        self.client.patch(detail_url(self.soup.id), {"title": "Gazpacho"})
+
+        self.assertEqual(self._ids({"search": "gazpacho"}), [self.soup.id])
+
+    def test_search_composes_with_filters(self):
+        """Test search applies together with the tag filter."""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        self.soup.tags.add(tag)
+
+        ids = self._ids({"search": "tomato", "tags": tag.id})
+
+        self.assertEqual(ids, [self.soup.id])
+
+    def test_search_limited_to_user(self):
+        """Test search never returns other users' recipes."""
+        other = create_user(email="other@example.com", password="test123")
+        create_recipe(user=other, title="Tomato salad")
+
+        ids = self._ids({"search": "tomato"})
+
+        self.assertCountEqual(ids, [self.curry.id, self.soup.id])
+
+
+class RecipePaginationTests(QueryBudgetMixin, TestCase):
+    """Test cursor pagination of the recipe list."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="test123")
+        self.client.force_authenticate(self.user)
+
+    def test_list_unpaginated_by_default(self):
+        """Test the list is a plain array without pagination params."""
+        create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.data, list)
+
+    def test_walk_pages_with_cursor(self):
+        """Test following next links returns each recipe once, newest first."""
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+
+        res = self.client.get(RECIPES_URL, {"page_size": 2})
+        ids = []
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", res.data)
+            ids.extend(r["id"] for r in res.data["results"])
+            if not res.data["next"]:
+                break
+            res = self.client.get(res.data["next"])
+
+        self.assertEqual(ids, sorted((r.id for r in recipes), reverse=True))
+
+    def test_pagination_with_tag_filter(self):
+        """Test paginating a tag-filtered list."""
+        tag = Tag.objects.create(user=self.user, name="Veg")
+        tagged = []
+        for _ in range(3):
+            recipe = create_recipe(user=self.user)
+            recipe.tags.add(tag)
+            tagged.append(recipe.id)
+            create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {"tags": tag.id, "page_size": 2})
+        ids = [r["id"] for r in res.data["results"]]
+        res = self.client.get(res.data["next"])
+        ids.extend(r["id"] for r in res.data["results"])
+
+        self.assertEqual(ids, sorted(tagged, reverse=True))
+        self.assertIsNone(res.data["next"])
+
+    def test_later_pages_cost_the_same(self):
+        """Test a deep page issues no OFFSET or COUNT and fixed queries."""
+        recipes = [create_recipe(user=self.user) for _ in range(6)]
+        page = {}
+
+        def seed(count):
+            res = self.client.get(RECIPES_URL, {"page_size": 1})
+            for _ in range(count):
+                res = self.client.get(res.data["next"])
+            page["url"] = res.data["next"]
+
+        self.assertQueryBudget(
+            seed, lambda: self.client.get(page["url"]), sizes=(1, 4),
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(page["url"])
+        sql = " ".join(q["sql"] for q in ctx.captured_queries).upper()
+        self.assertNotIn("OFFSET", sql)
+        self.assertNotIn("COUNT(", sql)
+        self.assertEqual(res.data["results"][0]["id"], recipes[0].id)
+
+
+class RecipeQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test recipe endpoints run in a fixed number of queries."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="test123")
+        self.client.force_authenticate(self.user)
+
+    def _seed_recipes(self, count):
+        """Grow the user's recipes, each with a tag and an ingradient."""
+        while Recipe.objects.filter(user=self.user).count() < count:
+            recipe = create_recipe(user=self.user)
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f"Tag{recipe.id}")
+            )
+            recipe.ingradients.add(
+                Ingradient.objects.create(user=self.user, name=f"{recipe.id}")
+            )
+
+    def test_list_query_count_is_constant(self):
+        """Test listing recipes does not issue a query per recipe."""
+        self.assertQueryBudget(
+            self._seed_recipes,
+            lambda: self.client.get(RECIPES_URL),
+            sizes=(1, 5, 10),
+            budget=4,
+        )
+
+    def test_filtered_list_query_count_is_constant(self):
+        """Test filtering recipes by tags keeps the query count fixed."""
+        tag = Tag.objects.create(user=self.user, name="Veg")
+
+        def seed(count):
+            self._seed_recipes(count)
+            for recipe in Recipe.objects.filter(user=self.user):
+                recipe.tags.add(tag)
+
+        self.assertQueryBudget(
+            seed,
+            lambda: self.client.get(RECIPES_URL, {"tags": str(tag.id)}),
+            budget=4,
+        )
+
+    def test_create_query_count_is_constant(self):
+        """Test creating a recipe does not issue queries per tag."""
+        Tag.objects.create(user=self.user, name="Tag0")
+        payload = {"title": "Curry", "time_minutes": 30, "price": "2.50"}
+
+        def seed(count):
+            payload["tags"] = [{"name": f"Tag{i}"} for i in range(count)]
+            payload["ingradients"] = [
+                {"name": f"Ing{i}"} for i in range(count)
+            ]
+
+        self.assertQueryBudget(
+            seed,
+            lambda: self.client.post(RECIPES_URL, payload, format="json"),
+            sizes=(2, 30),
+        )
+        recipe = Recipe.objects.filter(user=self.user).latest("id")
+        self.assertEqual(recipe.tags.count(), 30)
+        self.assertEqual(recipe.ingradients.count(), 30)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 30)
+
+    def test_retrieve_query_count_is_constant(self):
+        """Test retrieving a recipe does not issue a query per tag."""
+        recipe = create_recipe(user=self.user)
+
+        def seed(count):
+            for i in range(recipe.tags.count(), count):
+                recipe.tags.add(
+                    Tag.objects.create(user=self.user, name=f"Tag{i}")
+                )
+                recipe.ingradients.add(
+                    Ingradient.objects.create(user=self.user, name=f"Ing{i}")
+                )
+
+        self.assertQueryBudget(
+            seed,
+            lambda: self.client.get(detail_url(recipe.id)),
+            budget=4,
+        )
+
+
+class BulkRecipeApiTests(QueryBudgetMixin, TestCase):
+    """Test the bulk recipe create, update and delete endpoint."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="test123")
+        self.client.force_authenticate(self.user)
+
+    def _payload(self, title, tags=(), ings=()):
+        """Return a recipe payload naming tags and ingradients."""
+        return {
+            "title": title,
+            "time_minutes": 10,
+            "price": "1.50",
+            "tags": [{"name": name} for name in tags],
+            "ingradients": [{"name": name} for name in ings],
+        }
+
+    def test_bulk_create(self):
+        """Test creating many recipes sharing tags in one request."""
+        Tag.objects.create(user=self.user, name="Veg")
+        payload = [
+            self._payload("Dal", tags=["Veg", "Dinner"], ings=["Lentils"]),
+            self._payload("Salad", tags=["Veg"], ings=["Lentils", "Salt"]),
+        ]
+
+        res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([r["title"] for r in res.data], ["Dal", "Salad"])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(
+            Ingradient.objects.filter(user=self.user).count(), 2
+        )
+        salad = Recipe.objects.get(id=res.data[1]["id"])
+        self.assertEqual(salad.user, self.user)
+        self.assertEqual(
+            set(salad.ingradients.values_list("name", flat=True)),
+            {"Lentils", "Salt"},
+        )
+
+    def test_bulk_create_query_count_is_constant(self):
+        """Test bulk create cost does not grow with the batch size."""
+        payload = []
+
+        def seed(count):
+            payload[:] = [
+                self._payload(
+                    f"R{i}",
+                    tags=[f"T{count}-{i}", f"Shared{count}"],
+                    ings=[f"I{count}"],
+                )
+                for i in range(count)
+            ]
+
+        self.assertQueryBudget(
+            seed,
+            lambda: self.client.post(BULK_URL, payload, format="json"),
+            sizes=(2, 20),
+        )
+
+    def test_bulk_create_invalid_item_writes_nothing(self):
+        """Test an invalid item fails the batch with per-item errors."""
+        payload = [self._payload("Dal"), {"title": "No time or price"}]
+
+        res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn("time_minutes", res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_requires_list(self):
+        """Test a non-list body is rejected."""
+        res = self.client.post(BULK_URL, self._payload("Dal"), format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update(self):
+        """Test updating many recipes, matched by id, in one request."""
+        tag = Tag.objects.create(user=self.user, name="Old")
+        r1 = create_recipe(user=self.user, title="One")
+        r2 = create_recipe(user=self.user, title="Two")
+        r1.tags.add(tag)
+        payload = [
+            {"id": r1.id, "tags": [{"name": "New"}]},
+            {"id": r2.id, "title": "Second"},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        r1.refresh_from_db()
+        r2.refresh_from_db()
+        self.assertEqual(r1.title, "One")
+        self.assertEqual(list(r1.tags.values_list("name", flat=True)),
+                         ["New"])
+        self.assertEqual(r2.title, "Second")
+
+    def test_bulk_update_other_users_recipe_error(self):
+        """Test bulk updating another user's recipe fails the batch."""
+        other = create_user(email="other@example.com", password="test123")
+        mine = create_recipe(user=self.user, title="Mine")
+        theirs = create_recipe(user=other, title="Theirs")
+        payload = [
+            {"id": mine.id, "title": "Changed"},
+            {"id": theirs.id, "title": "Changed"},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn("id", res.data[1])
+        mine.refresh_from_db()
+        theirs.refresh_from_db()
+        self.assertEqual(mine.title, "Mine")
+        self.assertEqual(theirs.title, "Theirs")
+
+    def test_bulk_delete(self):
+        """Test deleting many recipes in one request."""
+        r1 = create_recipe(user=self.user)
+        r2 = create_recipe(user=self.user)
+        r3 = create_recipe(user=self.user)
+
+        res = self.client.delete(BULK_URL, [r1.id, r2.id], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            list(Recipe.objects.values_list("id", flat=True)), [r3.id]
+        )
+
+    def test_bulk_delete_query_count_is_constant(self):
+        """Test bulk delete cost does not grow with the batch size."""
+        ids = []
+
+        def seed(count):
+            ids[:] = [
+                create_recipe(user=self.user).id for _ in range(count)
+            ]
+
+        self.assertQueryBudget(
+            seed,
+            lambda: self.client.delete(BULK_URL, ids, format="json"),
+            sizes=(2, 20),
+        )
+
+    def test_bulk_delete_bumps_data_version(self):
+        """Test a bulk delete still invalidates the user's lists."""
+        recipe = create_recipe(user=self.user)
+        etag = self.client.get(RECIPES_URL)["ETag"]
+
+        self.client.delete(BULK_URL, [recipe.id], format="json")
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_bulk_non_integer_ids_rejected(self):
+        """Test ids that are not integers get per-item errors, not a 500."""
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.delete(
+            BULK_URL, [{"id": recipe.id}, True, recipe.id], format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        error = {"id": ["A valid integer is required."]}
+        self.assertEqual(res.data, [error, error, {}])
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+        res = self.client.patch(
+            BULK_URL, [{"id": [recipe.id], "title": "X"}], format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data, [error])
+
+    def test_bulk_delete_unknown_id_deletes_nothing(self):
+        """Test deleting with an unknown id fails the batch."""
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.delete(
+            BULK_URL, [recipe.id, recipe.id + 100], format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag and Last-Modified handling on recipe reads."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="test123")
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def _revalidate(self, url, etag):
+        """Issue a conditional GET with etag."""
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_list_not_modified(self):
+        """Test an unchanged list returns 304 after one cheap query."""
+        res = self.client.get(RECIPES_URL)
+        etag = res["ETag"]
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self._revalidate(RECIPES_URL, etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_if_modified_since_not_modified(self):
+        """Test Last-Modified can be used to revalidate."""
+        res = self.client.get(RECIPES_URL)
+
+        res = self.client.get(
+            RECIPES_URL, HTTP_IF_MODIFIED_SINCE=res["Last-Modified"]
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_write_changes_etag(self):
+        """Test creating, updating and deleting invalidate the ETag."""
+        etag = self.client.get(RECIPES_URL)["ETag"]
+        writes = [
+            lambda: self.client.post(
+                RECIPES_URL,
+                {"title": "New", "time_minutes": 5, "price": "1.00"},
+            ),
+            lambda: self.client.patch(
+                detail_url(self.recipe.id),
+                {"tags": [{"name": "Lunch"}]},
+                format="json",
+            ),
+            lambda: self.client.patch(
+                reverse("recipe:tag-detail",
+                        args=[Tag.objects.get(name="Lunch").id]),
+                {"name": "Dinner"},
+            ),
+            lambda: self.client.delete(detail_url(self.recipe.id)),
+        ]
+
+        for write in writes:
+            write()
+            res = self._revalidate(RECIPES_URL, etag)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            etag = res["ETag"]
+
+    def test_etag_depends_on_query_params(self):
+        """Test a filtered list does not match the unfiltered ETag."""
+        etag = self.client.get(RECIPES_URL)["ETag"]
+
+        res = self.client.get(
+            RECIPES_URL, {"tags": "1"}, HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_etag_not_shared_between_users(self):
+        """Test one user's ETag does not validate another user's list."""
+        etag = self.client.get(RECIPES_URL)["ETag"]
+        other = create_user(email="other@example.com", password="test123")
+        self.client.force_authenticate(other)
+
+        res = self._revalidate(RECIPES_URL, etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_unchanged_detail_not_modified(self):
+        """Test an unchanged recipe detail returns 304."""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)["ETag"]
+
+        res = self._revalidate(url, etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class ResponseCacheTests(TestCase):
+    """Test the per-user list response cache."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="test123")
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def _list_queries(self, params=None):
+        """Return (response, query count) for listing recipes."""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL, params or {})
+        return res, len(ctx.captured_queries)
+
+    def test_repeated_list_served_from_cache(self):
+        """Test a repeated list only looks up the data version."""
+        first, _ = self._list_queries()
+        second, queries = self._list_queries()
+
+        self.assertEqual(queries, 1)
+        self.assertEqual(second.data, first.data)
+
+    def test_equivalent_params_share_entry(self):
+        """Test reordered and respaced filter ids hit the same entry."""
+        tag1 = Tag.objects.create(user=self.user, name="Veg")
+        tag2 = Tag.objects.create(user=self.user, name="Quick")
+        self.recipe.tags.add(tag1)
+
+        self._list_queries({"tags": f"{tag1.id},{tag2.id}"})
+        res, queries = self._list_queries({"tags": f"{tag2.id}, {tag1.id}"})
+
+        self.assertEqual(queries, 1)
+        self.assertEqual(len(res.data), 1)
+
+    def test_lists_cached_per_model(self):
+        """Test other lists are not served the cached recipe list."""
+        tag = Tag.objects.create(user=self.user, name="Veg")
+        ingradient = Ingradient.objects.create(user=self.user, name="Salt")
+        self._list_queries()
+
+        tags = self.client.get(reverse("recipe:tag-list"))
+        ingradients = self.client.get(reverse("recipe:ingradient-list"))
+
+        self.assertEqual(tags.data, [{"id": tag.id, "name": "Veg"}])
+        self.assertEqual(
+            ingradients.data, [{"id": ingradient.id, "name": "Salt"}]
+        )
+
+    @override_settings(RESPONSE_CACHE={
+        "CACHE": "api-responses", "MAX_ENTRY_BYTES": 100,
+    })
+    def test_large_lists_not_cached(self):
+        """Test lists rendering above MAX_ENTRY_BYTES are not cached."""
+        self._list_queries()
+        _, queries = self._list_queries()
+
+        self.assertGreater(queries, 1)
+
+    def test_unknown_params_not_cached(self):
+        """Test requests with params outside the cache key bypass it."""
+        self._list_queries({"page_size": 10})
+        _, queries = self._list_queries({"page_size": 10})
+
+        self.assertGreater(queries, 1)
+
+    def test_write_invalidates(self):
+        """Test a write through the API is visible on the next list."""
+        self._list_queries()
+        self.client.patch(detail_url(self.recipe.id), {"title": "Changed"})
+
+        res, _ = self._list_queries()
+
+        self.assertEqual(res.data[0]["title"], "Changed")
+
+    def test_upload_image_invalidates(self):
+        """Test uploading an image bumps the data version."""
+        self._list_queries()
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as image_file:
+            Image.new("RGB", (10, 10)).save(image_file, format="JPEG")
+            image_file.seek(0)
+            self.client.post(
+                image_upload_url(self.recipe.id),
+                {"image": image_file},
+                format="multipart",
+            )
+        self.recipe.refresh_from_db()
+        self.addCleanup(self.recipe.image.delete)
+
+        _, queries = self._list_queries()
+
+        self.assertGreater(queries, 1)
+
+    @override_settings(RESPONSE_CACHE={})
+    def test_cache_disabled(self):
+        """Test the cache can be switched off."""
+        self._list_queries()
+        _, queries = self._list_queries()
+
+        self.assertGreater(queries, 1)
+
+
 class ImageUploadTests(TestCase):
     """Tests for the Image upload API."""
 
     def setUp(self):
+        caches["api-responses"].clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             "user@example.com",
@@ -464,3 +1247,777 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, payload, format="multipart")
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+VARIANTS_SETTINGS = {
+    "EAGER": True,
+    "VARIANTS": {
+        "thumb": {"size": (20, 20), "format": "JPEG", "list": True},
+        "webp": {"size": (50, 50), "format": "WEBP"},
+    },
+}
+
+
+@override_settings(IMAGE_PROCESSING=VARIANTS_SETTINGS)
+class ImageVariantTests(TestCase):
+    """Tests for the resized image variants."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="test123")
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def _upload(self, size=(120, 80)):
+        """Upload an image of size and return the refreshed recipe."""
+        with tempfile.NamedTemporaryFile(suffix=".png") as image_file:
+            Image.new("RGBA", size).save(image_file, format="PNG")
+            image_file.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(
+                    image_upload_url(self.recipe.id),
+                    {"image": image_file},
+                    format="multipart",
+                )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self._delete_files_later(self.recipe)
+
+        return self.recipe
+
+    def _delete_files_later(self, recipe):
+        """Remove recipe's current image and variants after the test."""
+        names = [recipe.image.name, *recipe.image_variants.values()]
+        for name in names:
+            self.addCleanup(recipe.image.storage.delete, name)
+
+    def test_variants_generated(self):
+        """Test each configured variant is stored, scaled to fit."""
+        recipe = self._upload()
+
+        self.assertEqual(set(recipe.image_variants), {"thumb", "webp"})
+        with Image.open(recipe.image.storage.path(
+            recipe.image_variants["thumb"]
+        )) as thumb:
+            self.assertEqual((thumb.format, thumb.size), ("JPEG", (20, 13)))
+        with Image.open(recipe.image.storage.path(
+            recipe.image_variants["webp"]
+        )) as webp:
+            self.assertEqual((webp.format, webp.size), ("WEBP", (50, 33)))
+
+    def test_variant_urls_exposed(self):
+        """Test detail lists every variant and list only list variants."""
+        recipe = self._upload()
+
+        detail = self.client.get(detail_url(recipe.id)).data
+        listed = self.client.get(RECIPES_URL).data[0]
+
+        self.assertEqual(set(detail["image_variants"]), {"thumb", "webp"})
+        self.assertTrue(
+            detail["image_variants"]["thumb"].startswith("http://testserver/")
+        )
+        self.assertEqual(set(listed["image_variants"]), {"thumb"})
+
+    def test_upload_does_not_wait_for_variants(self):
+        """Test variants are only generated after the upload commits."""
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as image_file:
+            Image.new("RGB", (10, 10)).save(image_file, format="JPEG")
+            image_file.seek(0)
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.client.post(
+                    image_upload_url(self.recipe.id),
+                    {"image": image_file},
+                    format="multipart",
+                )
+        self.recipe.refresh_from_db()
+        self._delete_files_later(self.recipe)
+
+        self.assertEqual(self.recipe.image_variants, {})
+        self.assertEqual(len(callbacks), 1)
+
+    def test_replaced_image_keeps_new_variants(self):
+        """Test variants of a replaced image are discarded."""
+        stale = self._upload().image.name
+        recipe = self._upload(size=(30, 30))
+
+        variants = images.generate_variants(recipe.id, stale)
+
+        recipe.refresh_from_db()
+        self.assertNotEqual(recipe.image_variants, variants)
+        for name in variants.values():
+            self.assertFalse(recipe.image.storage.exists(name))
+
+    def test_failed_variant_releases_saved_ones(self):
+        """Test a failing variant releases the variants already stored."""
+        recipe = self._upload()
+        name = recipe.image.name
+        thumb = recipe.image_variants["thumb"]
+        render = images.render_variant
+
+        def fail_webp(image, size, image_format, quality):
+            if image_format == "WEBP":
+                raise OSError("encoder error")
+            return render(image, size, image_format, quality)
+
+        with patch.object(images, "render_variant", side_effect=fail_webp):
+            with self.assertRaises(OSError):
+                images.generate_variants(recipe.id, name)
+
+        self.assertEqual(ImageBlob.objects.get(name=thumb).refs, 1)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants["thumb"], thumb)
+
+    @override_settings(IMAGE_PROCESSING={"VARIANTS": {
+        "thumb": {"size": (20, 20), "format": "GIF"},
+        "medium": {"format": "JPEG"},
+    }})
+    def test_variant_settings_checked(self):
+        """Test unsupported formats and missing sizes fail the checks."""
+        errors = checks.check_image_variants(None)
+
+        self.assertEqual(
+            [error.id for error in errors], ["recipe.E001", "recipe.E002"]
+        )
+
+    def test_pool_bounded(self):
+        """Test jobs beyond the pending limit are dropped."""
+        pool = images.WorkerPool()
+        release = threading.Event()
+        config = {"WORKERS": 1, "MAX_PENDING": 1}
+        with override_settings(IMAGE_PROCESSING=config):
+            self.assertTrue(pool.submit(release.wait))
+            with self.assertLogs("recipe.images", "WARNING"):
+                self.assertFalse(pool.submit(release.wait))
+        release.set()
+        pool._executor.shutdown(wait=True)
+
+
+def image_uploads_url(recipe_id, upload_id=None):
+    """Create and return a resumable image upload url."""
+    if upload_id is None:
+        return reverse("recipe:recipe-image-uploads", args=[recipe_id])
+    return reverse(
+        "recipe:recipe-image-upload", args=[recipe_id, upload_id]
+    )
+
+
+def png_bytes(size=(64, 64)):
+    """Return the bytes of a noisy PNG image."""
+    buffer = BytesIO()
+    Image.effect_noise(size, 50).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@override_settings(
+    IMAGE_UPLOAD={"MAX_BYTES": 1 << 20, "MAX_CHUNK_BYTES": 1024},
+    IMAGE_PROCESSING={"EAGER": True, "VARIANTS": {}},
+)
+class ResumableImageUploadTests(TestCase):
+    """Tests for chunked, resumable image uploads."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="test123")
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+        self.data = png_bytes()
+
+    def _open(self, size=None, filename="photo.png"):
+        """Open an upload and return its id."""
+        res = self.client.post(
+            image_uploads_url(self.recipe.id),
+            {"filename": filename, "size": size or len(self.data)},
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["offset"], 0)
+        upload = ImageUpload.objects.get(id=res.data["id"])
+        self.addCleanup(self._remove_partial, upload)
+        return res.data["id"]
+
+    def _remove_partial(self, upload):
+        """Remove a partial file left by a test."""
+        storage = Recipe._meta.get_field("image").storage
+        storage.delete(upload.partial_name)
+
+    def _send(self, upload_id, offset, chunk):
+        """Send chunk at offset."""
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch(
+                image_uploads_url(self.recipe.id, upload_id),
+                chunk,
+                content_type="application/offset+octet-stream",
+                HTTP_UPLOAD_OFFSET=str(offset),
+            )
+
+    def _send_all(self, upload_id, start=0):
+        """Send the image from start in maximum size chunks."""
+        for offset in range(start, len(self.data), 1024):
+            res = self._send(upload_id, offset, self.data[offset:][:1024])
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def test_chunked_upload(self):
+        """Test an image sent in chunks is set on the recipe."""
+        upload_id = self._open()
+
+        res = self._send_all(upload_id)
+
+        self.recipe.refresh_from_db()
+        self.addCleanup(self.recipe.image.delete)
+        self.assertEqual(res.data["id"], self.recipe.id)
+        self.assertTrue(self.recipe.image.name.endswith(".png"))
+        self.assertEqual(self.recipe.image_size, len(self.data))
+        self.assertEqual(self.recipe.image_width, 64)
+        with self.recipe.image.open() as image:
+            self.assertEqual(image.read(), self.data)
+        self.assertFalse(ImageUpload.objects.filter(id=upload_id).exists())
+
+    def test_resume_after_interruption(self):
+        """Test the offset is reported and the upload resumes there."""
+        upload_id = self._open()
+        self._send(upload_id, 0, self.data[:1024])
+
+        res = self.client.get(image_uploads_url(self.recipe.id, upload_id))
+        self.assertEqual(res.data["offset"], 1024)
+        self._send_all(upload_id, start=res.data["offset"])
+
+        self.recipe.refresh_from_db()
+        self.addCleanup(self.recipe.image.delete)
+        self.assertEqual(self.recipe.image.size, len(self.data))
+
+    def test_short_first_chunks(self):
+        """Test chunks shorter than an image signature are accepted."""
+        upload_id = self._open()
+        self._send(upload_id, 0, self.data[:4])
+        self._send(upload_id, 4, self.data[4:10])
+
+        res = self._send_all(upload_id, start=10)
+
+        self.recipe.refresh_from_db()
+        self.addCleanup(self.recipe.image.delete)
+        self.assertEqual(res.data["id"], self.recipe.id)
+        with self.recipe.image.open() as image:
+            self.assertEqual(image.read(), self.data)
+
+    def test_short_non_image_rejected_once_header_arrives(self):
+        """Test a non-image is rejected when its first 12 bytes are in."""
+        upload_id = self._open(size=2048)
+        res = self._send(upload_id, 0, b"%PDF")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self._send(upload_id, 4, b"-1.4 and more")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ImageUpload.objects.filter(id=upload_id).exists())
+
+    def test_raced_chunk_leaves_partial_intact(self):
+        """Test a chunk losing the race to its retry does not write."""
+        upload_id = self._open()
+        upload = ImageUpload.objects.get(id=upload_id)
+        stale = ImageUpload.objects.get(id=upload_id)
+        path, received = uploads.receive_chunk(
+            stale, BytesIO(b"\0" * 1024), 1024
+        )
+        self.addCleanup(os.remove, path)
+        self._send(upload_id, 0, self.data[:1024])
+
+        current, appended = uploads.append_chunk(stale, path, received)
+
+        self.assertFalse(appended)
+        self.assertEqual(current.offset, 1024)
+        with open(uploads.partial_path(upload), "rb") as partial:
+            self.assertEqual(partial.read(), self.data[:1024])
+
+    def test_wrong_offset_conflict(self):
+        """Test a chunk at the wrong offset is refused with the offset."""
+        upload_id = self._open()
+        self._send(upload_id, 0, self.data[:1024])
+
+        res = self._send(upload_id, 0, self.data[:1024])
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data["offset"], 1024)
+
+    def test_non_image_rejected_on_first_chunk(self):
+        """Test a body that does not start like an image is rejected."""
+        upload_id = self._open(size=2048)
+
+        res = self._send(upload_id, 0, b"%PDF-1.4" + b"\0" * 1000)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ImageUpload.objects.filter(id=upload_id).exists())
+
+    def test_corrupt_image_rejected_on_finalize(self):
+        """Test a file with an image header but bad body is rejected."""
+        self.data = self.data[:16] + b"\0" * 2000
+        upload_id = self._open()
+
+        res = self._send(upload_id, 0, self.data[:1024])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self._send(upload_id, 1024, self.data[1024:])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_truncated_image_rejected_on_finalize(self):
+        """Test an image cut short is rejected rather than a 500."""
+        buffer = BytesIO()
+        Image.effect_noise((64, 64), 50).convert("RGB").save(
+            buffer, format="JPEG"
+        )
+        self.data = buffer.getvalue()[:len(buffer.getvalue()) * 3 // 4]
+        upload_id = self._open(filename="photo.jpg")
+
+        for offset in range(0, len(self.data), 1024):
+            res = self._send(upload_id, offset, self.data[offset:][:1024])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ImageUpload.objects.filter(id=upload_id).exists())
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_oversized_chunk_rejected(self):
+        """Test chunks above the chunk size limit are rejected."""
+        upload_id = self._open()
+
+        res = self._send(upload_id, 0, self.data[:2048])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_oversized_upload_rejected(self):
+        """Test uploads above the size limit cannot be opened."""
+        res = self.client.post(
+            image_uploads_url(self.recipe.id),
+            {"filename": "big.png", "size": (1 << 20) + 1},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_users_recipe_not_found(self):
+        """Test uploads to another user's recipe are refused."""
+        other = create_user(email="other@example.com", password="test123")
+        recipe = create_recipe(user=other)
+
+        res = self.client.post(
+            image_uploads_url(recipe.id),
+            {"filename": "photo.png", "size": 100},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cancel_upload(self):
+        """Test an upload can be cancelled."""
+        upload_id = self._open()
+        self._send(upload_id, 0, self.data[:1024])
+
+        res = self.client.delete(image_uploads_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(ImageUpload.objects.filter(id=upload_id).exists())
+
+
+class ImageMetadataTests(TestCase):
+    """Tests for the image metadata stored at upload time."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="test123")
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def _upload(self, image, **save_kwargs):
+        """Upload image as a JPEG and return the response."""
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as image_file:
+            image.save(image_file, format="JPEG", **save_kwargs)
+            size = image_file.tell()
+            image_file.seek(0)
+            res = self.client.post(
+                image_upload_url(self.recipe.id),
+                {"image": image_file},
+                format="multipart",
+            )
+        self.recipe.refresh_from_db()
+        self.addCleanup(self.recipe.image.delete)
+        return res, size
+
+    def test_metadata_stored_and_exposed(self):
+        """Test dimensions, size and placeholder are saved and listed."""
+        res, size = self._upload(Image.new("RGB", (40, 20), (200, 30, 30)))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            (self.recipe.image_width, self.recipe.image_height), (40, 20)
+        )
+        self.assertEqual(self.recipe.image_size, size)
+        self.assertEqual(len(self.recipe.image_placeholder), 28)
+        self.assertEqual(res.data["image_placeholder"],
+                         self.recipe.image_placeholder)
+        listed = self.client.get(RECIPES_URL).data[0]
+        self.assertEqual(
+            (listed["image_width"], listed["image_height"]), (40, 20)
+        )
+
+    def test_exif_rotation_applied(self):
+        """Test dimensions are reported as displayed after EXIF rotation."""
+        image = Image.new("RGB", (40, 20))
+        exif = image.getexif()
+        exif[images.ORIENTATION] = 6
+
+        self._upload(image, exif=exif)
+
+        self.assertEqual(
+            (self.recipe.image_width, self.recipe.image_height), (20, 40)
+        )
+
+    def test_failed_upload_leaves_no_blob(self):
+        """Test a save failing after the file is stored removes it."""
+        buffer = BytesIO()
+        Image.effect_noise((20, 20), 50).convert("RGB").save(
+            buffer, format="JPEG"
+        )
+        digest = hashlib.sha256(buffer.getvalue()).hexdigest()
+        name = f"blobs/{digest[:2]}/{digest}.jpg"
+        buffer.name = "photo.jpg"
+        buffer.seek(0)
+
+        with patch.object(
+            images, "schedule_variants", side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            self.client.post(
+                image_upload_url(self.recipe.id),
+                {"image": buffer},
+                format="multipart",
+            )
+
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+        self.assertFalse(Recipe._meta.get_field("image").storage.exists(name))
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_truncated_image_rejected(self):
+        """Test an image cut short is a 400, not a server error."""
+        buffer = BytesIO()
+        Image.effect_noise((200, 200), 64).convert("RGB").save(
+            buffer, format="JPEG"
+        )
+        data = buffer.getvalue()
+        upload = BytesIO(data[:len(data) * 3 // 4])
+        upload.name = "truncated.jpg"
+
+        res = self.client.post(
+            image_upload_url(self.recipe.id),
+            {"image": upload},
+            format="multipart",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("image", res.data)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_blurhash_of_solid_color(self):
+        """Test a flat image encodes its size flag and average colour."""
+        placeholder = blurhash.encode(Image.new("RGB", (8, 8), (255, 0, 0)))
+
+        self.assertEqual(len(placeholder), 28)
+        self.assertEqual(placeholder[0], "L")
+        self.assertEqual(placeholder[2:6], blurhash.encode83(0xFF0000, 4))
+
+
+EXPORT_URL = reverse("recipe:recipe-export")
+
+
+class RecipeExportTests(TestCase):
+    """Tests for streaming recipe exports."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="test123")
+        self.client.force_authenticate(self.user)
+        self.veg = Tag.objects.create(user=self.user, name="Veg")
+        self.salt = Ingradient.objects.create(user=self.user, name="Salt")
+        self.recipes = [
+            create_recipe(user=self.user, title=f"Recipe {i}")
+            for i in range(5)
+        ]
+        self.recipes[0].tags.add(self.veg)
+        self.recipes[0].ingradients.add(self.salt)
+
+    def _export(self, params=None, **extra):
+        """Return the response and the decoded export body."""
+        res = self.client.get(EXPORT_URL, params or {}, **extra)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return res, b"".join(res.streaming_content).decode()
+
+    def test_export_jsonl(self):
+        """Test the default export is one JSON recipe per line."""
+        res, body = self._export()
+
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        self.assertIn("recipes.jsonl", res["Content-Disposition"])
+        self.assertEqual([r["id"] for r in rows],
+                         [r.id for r in self.recipes])
+        self.assertEqual(rows[0]["tags"], ["Veg"])
+        self.assertEqual(rows[0]["ingradients"], ["Salt"])
+        self.assertEqual(rows[0]["price"], "5.25")
+        self.assertIsNone(rows[0]["image"])
+
+    def test_export_csv(self):
+        """Test ?format=csv exports a header and a row per recipe."""
+        res, body = self._export({"format": "csv"})
+
+        rows = list(csv.DictReader(body.splitlines()))
+        self.assertEqual(res["Content-Type"], "text/csv")
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]["title"], "Recipe 0")
+        self.assertEqual(rows[0]["tags"], "Veg")
+
+    def test_export_accept_header(self):
+        """Test the format can be negotiated with Accept."""
+        res, _ = self._export(HTTP_ACCEPT="text/csv")
+
+        self.assertEqual(res["Content-Type"], "text/csv")
+
+    def test_export_limited_to_user(self):
+        """Test only the user's recipes are exported."""
+        other = create_user(email="other@example.com", password="test123")
+        create_recipe(user=other)
+
+        _, body = self._export()
+
+        self.assertEqual(len(body.splitlines()), 5)
+
+    def test_export_applies_filters(self):
+        """Test the list filters narrow the export."""
+        _, body = self._export({"tags": self.veg.id})
+
+        self.assertEqual(len(body.splitlines()), 1)
+
+    def test_export_queries_per_chunk(self):
+        """Test relations are fetched once per chunk, not per recipe."""
+        with patch.object(RecipeViewSet, "export_chunk_size", 2):
+            with CaptureQueriesContext(connection) as ctx:
+                self._export()
+
+        # The recipes, then tags and ingradients for each of 3 chunks.
+        self.assertEqual(len(ctx.captured_queries), 1 + 2 * 3)
+
+
+class SparseFieldsetTests(TestCase):
+    """Test selecting fields and expanding relations with the query."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="test123")
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user, title="Dal")
+        self.tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ("Veg", "Quick")
+        ]
+        self.recipe.tags.add(*self.tags)
+        self.ing = Ingradient.objects.create(user=self.user, name="Lentils")
+        self.recipe.ingradients.add(self.ing)
+
+    def _list(self, params):
+        """Return (response, captured SQL) for listing recipes."""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL, params)
+        return res, [query["sql"] for query in ctx.captured_queries]
+
+    def test_fields_limit_output_and_columns(self):
+        """Test fields keeps only the named fields, id and their columns."""
+        res, queries = self._list({"fields": "title"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{"id": self.recipe.id, "title": "Dal"}])
+        recipe_sql = [sql for sql in queries if "core_recipe" in sql]
+        self.assertEqual(len(recipe_sql), 1)
+        self.assertNotIn("time_minutes", recipe_sql[0])
+        self.assertFalse(any("core_tag" in sql for sql in queries))
+
+    def test_unexpanded_relations_are_ids(self):
+        """Test relations not in expand are rendered as id lists."""
+        res, queries = self._list({"fields": "title,tags"})
+
+        self.assertEqual(
+            sorted(res.data[0]["tags"]), sorted(tag.id for tag in self.tags)
+        )
+        self.assertNotIn("ingradients", res.data[0])
+        self.assertFalse(any("core_ingradient" in sql for sql in queries))
+
+    def test_expand_nests_relations(self):
+        """Test expand renders that relation as objects, others as ids."""
+        res, _ = self._list({"expand": "tags"})
+
+        recipe = res.data[0]
+        self.assertEqual(
+            recipe["tags"],
+            TagSerializer(self.recipe.tags.all(), many=True).data,
+        )
+        self.assertEqual(recipe["ingradients"], [self.ing.id])
+        self.assertEqual(
+            set(recipe), set(RecipeSerializer.Meta.fields)
+        )
+
+    def test_default_output_unchanged(self):
+        """Test requests without fields or expand keep nested objects."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data[0]["ingradients"], [
+            {"id": self.ing.id, "name": "Lentils"}
+        ])
+
+    def test_retrieve_fields(self):
+        """Test detail fields can be selected on retrieve."""
+        res = self.client.get(
+            detail_url(self.recipe.id),
+            {"fields": "description,ingradients", "expand": "ingradients"},
+        )
+
+        self.assertEqual(res.data, {
+            "id": self.recipe.id,
+            "description": "Sample description",
+            "ingradients": [{"id": self.ing.id, "name": "Lentils"}],
+        })
+
+    def test_unknown_names_rejected(self):
+        """Test unknown fields and non-relation expands are a 400."""
+        res = self.client.get(
+            RECIPES_URL, {"fields": "title,secret", "expand": "price"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", res.data)
+        self.assertIn("expand", res.data)
+
+    def test_description_not_listed(self):
+        """Test detail-only fields cannot be selected on the list."""
+        res = self.client.get(RECIPES_URL, {"fields": "description"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fieldsets_cached_separately(self):
+        """Test cached lists are keyed by the normalized fieldset."""
+        first = self.client.get(RECIPES_URL, {"fields": "title,price"})
+        second = self.client.get(RECIPES_URL, {"fields": " price,title"})
+        other = self.client.get(RECIPES_URL, {"fields": "title"})
+
+        self.assertEqual(second.data, first.data)
+        self.assertNotIn("price", other.data[0])
+
+
+class IncludedRelationsTests(TestCase):
+    """Test side-loading tags and ingradients with ?include=."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="test123")
+        self.client.force_authenticate(self.user)
+        self.veg = Tag.objects.create(user=self.user, name="Veg")
+        self.quick = Tag.objects.create(user=self.user, name="Quick")
+        Tag.objects.create(user=self.user, name="Unused")
+        self.salt = Ingradient.objects.create(user=self.user, name="Salt")
+        self.recipes = []
+        for title in ("Dal", "Soup", "Curry"):
+            recipe = create_recipe(user=self.user, title=title)
+            recipe.tags.add(self.veg, self.quick)
+            recipe.ingradients.add(self.salt)
+            self.recipes.append(recipe)
+
+    def test_included_once(self):
+        """Test shared tags are listed once and recipes carry ids."""
+        res = self.client.get(RECIPES_URL, {"include": "tags"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 3)
+        for recipe in res.data["results"]:
+            self.assertEqual(recipe["tags"], [self.veg.id, self.quick.id])
+            self.assertEqual(recipe["ingradients"], [self.salt.id])
+        self.assertEqual(res.data["included"], {"tags": [
+            {"id": self.veg.id, "name": "Veg"},
+            {"id": self.quick.id, "name": "Quick"},
+        ]})
+
+    def test_include_both_relations(self):
+        """Test both relations can be side-loaded together."""
+        res = self.client.get(RECIPES_URL, {"include": "ingradients,tags"})
+
+        self.assertEqual(sorted(res.data["included"]), ["ingradients", "tags"])
+        self.assertEqual(
+            res.data["included"]["ingradients"],
+            [{"id": self.salt.id, "name": "Salt"}],
+        )
+
+    def test_include_with_expand(self):
+        """Test other relations can still be expanded."""
+        res = self.client.get(
+            RECIPES_URL, {"include": "tags", "expand": "ingradients"}
+        )
+
+        self.assertEqual(
+            res.data["results"][0]["ingradients"],
+            [{"id": self.salt.id, "name": "Salt"}],
+        )
+
+    def test_include_adds_field(self):
+        """Test included relations are rendered even if not in fields."""
+        res = self.client.get(
+            RECIPES_URL, {"include": "tags", "fields": "title"}
+        )
+
+        self.assertEqual(
+            set(res.data["results"][0]), {"id", "title", "tags"}
+        )
+
+    def test_include_paginated(self):
+        """Test a page side-loads only what its recipes reference."""
+        self.recipes[0].tags.clear()
+        other = Tag.objects.create(user=self.user, name="Old")
+        self.recipes[0].tags.add(other)
+
+        res = self.client.get(RECIPES_URL, {"include": "tags", "page_size": 2})
+
+        self.assertIn("next", res.data)
+        self.assertEqual(len(res.data["results"]), 2)
+        self.assertNotIn(
+            other.id, [tag["id"] for tag in res.data["included"]["tags"]]
+        )
+
+    def test_include_query_count(self):
+        """Test included objects cost one query per included relation."""
+        # Version, recipes, the links of each relation, then the tags.
+        with self.assertNumQueries(5):
+            self.client.get(RECIPES_URL, {"include": "tags"})
+
+    def test_include_invalid(self):
+        """Test unknown relations, or expanding included ones, are a 400."""
+        for params in (
+            {"include": "price"},
+            {"include": "tags", "expand": "tags"},
+        ):
+            with self.subTest(params=params):
+                res = self.client.get(RECIPES_URL, params)
+                self.assertEqual(
+                    res.status_code, status.HTTP_400_BAD_REQUEST
+                )
+
+    def test_include_cached(self):
+        """Test cached responses keep the included objects."""
+        first = self.client.get(RECIPES_URL, {"include": "tags"})
+        second = self.client.get(RECIPES_URL, {"include": "tags"})
+
+        self.assertEqual(second.data, first.data)
+        self.assertIn("included", second.data)
@@ -1,13 +1,17 @@
+from django.core.cache import caches
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
 from core.models import Tag, Recipe
+from core.tests.query_budget import count_queries
+from recipe import autocomplete
 from recipe.serializers import TagSerializer
 from decimal import Decimal
 
 TAGS_URL = reverse("recipe:tag-list")
+AUTOCOMPLETE_URL = reverse("recipe:tag-autocomplete")
 
 
 def tag_detail(tag_id):
@@ -24,6 +28,7 @@ class PublicTagsApiTests(TestCase):
     """Test unauthenticated API requests."""
 
     def setUp(self):
+        caches["api-responses"].clear()
         self.client = APIClient()
 
     def test_auth_required(self):
@@ -37,6 +42,7 @@ class PrivateTagsApiTests(TestCase):
     """Test authenticated API requests."""
 
     def setUp(self):
+        caches["api-responses"].clear()
         self.user = create_user()
         self.client = APIClient()
         self.client.force_authenticate(self.user)
@@ -80,6 +86,29 @@ class PrivateTagsApiTests(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload["name"])
 
+    def test_update_tag_duplicate_name_error(self):
+        """Test renaming a tag onto an existing name returns an error."""
+        Tag.objects.create(user=self.user, name="Dinner")
+        tag = Tag.objects.create(user=self.user, name="Lunch")
+
+        res = self.client.patch(tag_detail(tag.id), {"name": "Dinner"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, "Lunch")
+
+    def test_unchanged_tags_not_modified(self):
+        """Test revalidating an unchanged tag list returns 304."""
+        tag = Tag.objects.create(user=self.user, name="Lunch")
+        etag = self.client.get(TAGS_URL)["ETag"]
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.delete(tag_detail(tag.id))
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
     def test_delete_tag(self):
         """Test deleting the tag."""
         tag = Tag.objects.create(user=self.user, name="Snack")
@@ -110,6 +139,15 @@ class PrivateTagsApiTests(TestCase):
         self.assertIn(s1.data, res.data)
         self.assertNotIn(s2.data, res.data)
 
+    def test_assigned_only_cached_separately(self):
+        """Test assigned_only lists are cached apart from the full list."""
+        Tag.objects.create(user=self.user, name="Unused")
+
+        self.client.get(TAGS_URL)
+        res = self.client.get(TAGS_URL, {"assigned_only": 1})
+
+        self.assertEqual(res.data, [])
+
     def test_filter_tags_list_unique(self):
         """Test filtered tag returned a unique list."""
         tag = Tag.objects.create(user=self.user, name="South Indian")
@@ -132,3 +170,109 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_list_with_counts(self):
+        """Test with_counts includes each tag's recipe count."""
+        tag = Tag.objects.create(user=self.user, name="Lunch")
+        Tag.objects.create(user=self.user, name="Dinner")
+        recipe = Recipe.objects.create(
+            title="Thali",
+            time_minutes=40,
+            price=Decimal("6.00"),
+            user=self.user,
+        )
+        recipe.tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {"with_counts": 1})
+
+        self.assertEqual(
+            [(t["name"], t["recipe_count"]) for t in res.data],
+            [("Lunch", 1), ("Dinner", 0)],
+        )
+
+
+class TagAutocompleteTests(TestCase):
+    """Test suggesting tag names."""
+
+    def setUp(self):
+        caches["api-responses"].clear()
+        autocomplete.get_cache().clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for name in ("Dinner", "Dessert", "Breakfast", "Side dish"):
+            Tag.objects.create(user=self.user, name=name)
+
+    def tearDown(self):
+        autocomplete.get_cache().clear()
+
+    def _names(self, params):
+        """Return the suggested names for params."""
+        res = self.client.get(AUTOCOMPLETE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [tag["name"] for tag in res.data]
+
+    def test_prefix_matches_first(self):
+        """Test prefix matches rank above other matches."""
+        names = self._names({"q": "d"})
+
+        self.assertEqual(names[:2], ["Dessert", "Dinner"])
+        self.assertIn("Side dish", names)
+
+    def test_case_insensitive(self):
+        """Test suggestions ignore case."""
+        self.assertEqual(self._names({"q": "BREAK"}), ["Breakfast"])
+
+    def test_fuzzy_match(self):
+        """Test misspelt names are suggested with pg_trgm."""
+        if not autocomplete.trigram_enabled():
+            self.skipTest("pg_trgm is not installed.")
+
+        self.assertEqual(self._names({"q": "Breakfsat"})[0], "Breakfast")
+
+    def test_limit(self):
+        """Test the number of suggestions is limited."""
+        self.assertEqual(len(self._names({"q": "d", "limit": 1})), 1)
+
+    def test_limited_to_user(self):
+        """Test only the user's own tags are suggested."""
+        other = create_user(email="other@example.com")
+        Tag.objects.create(user=other, name="Brunch")
+
+        self.assertEqual(self._names({"q": "br"}), ["Breakfast"])
+
+    def test_query_required(self):
+        """Test a missing or blank q is rejected."""
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": " "})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_hot_prefix_cached(self):
+        """Test a repeated prefix is served without the name query."""
+        autocomplete.trigram_enabled()
+        first = count_queries(
+            lambda: self.client.get(AUTOCOMPLETE_URL, {"q": "de"})
+        )
+        second = count_queries(
+            lambda: self.client.get(AUTOCOMPLETE_URL, {"q": "DE"})
+        )
+
+        self.assertEqual(first, 2)
+        self.assertEqual(second, 1)
+
+    def test_write_invalidates_cache(self):
+        """Test a new tag is suggested after a cached lookup."""
+        self._names({"q": "br"})
+        Tag.objects.create(user=self.user, name="Brunch")
+
+        self.assertEqual(self._names({"q": "br"}), ["Breakfast", "Brunch"])
+
+    def test_unchanged_not_modified(self):
+        """Test a repeated lookup can be answered with 304."""
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "de"})
+
+        res = self.client.get(
+            AUTOCOMPLETE_URL, {"q": "de"}, HTTP_IF_NONE_MATCH=res["ETag"],
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
@@ -0,0 +1,188 @@
+"""
+Resumable, chunked uploads of recipe images.
+
+A client opens an upload with the total size, then sends the bytes in
+chunks, each tagged with the offset it starts at. Each chunk is streamed
+into a file of its own on the media volume, so no request holds more
+than one read buffer in memory, and is then appended to the partial file
+with the upload row locked. The upload must start with a known image
+signature, and the finished file is checked with Pillow before it is
+moved into storage and onto Recipe.image.
+"""
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from core.models import ImageUpload, Recipe, recipe_image_file_path
+from core.storage import atomic_save, release_on_commit
+from recipe import images
+
+READ_BYTES = 64 * 1024
+
+# Bytes needed to recognise every signature below, WebP's being longest.
+HEADER_BYTES = 12
+
+SIGNATURES = (
+    b"\xff\xd8\xff",  # JPEG
+    b"\x89PNG\r\n\x1a\n",
+    b"GIF87a",
+    b"GIF89a",
+)
+
+
+def get_config():
+    """Return the IMAGE_UPLOAD setting."""
+    return getattr(settings, "IMAGE_UPLOAD", {})
+
+
+def is_image_header(data):
+    """Return whether data starts like an image we accept."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return True
+
+    return data.startswith(SIGNATURES)
+
+
+def is_expired(upload):
+    """Return whether upload was opened too long ago to resume."""
+    expires = timedelta(seconds=get_config().get("EXPIRES", 86400))
+    return upload.created_at + expires < timezone.now()
+
+
+class PartialFile(File):
+    """A finished partial file, moved rather than copied into storage."""
+
+    def temporary_file_path(self):
+        return self.name
+
+
+def partial_path(upload):
+    """Return the filesystem path of upload's partial file."""
+    storage = Recipe._meta.get_field("image").storage
+    return storage.path(upload.partial_name)
+
+
+def discard(upload):
+    """Delete upload and its partial file."""
+    try:
+        os.remove(partial_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def receive_chunk(upload, stream, length):
+    """
+    Stream length bytes of stream into a chunk file of their own.
+
+    Returns (path, bytes received), fewer than length if the client went
+    away mid-chunk. Nothing is locked while the body arrives, however
+    slowly; append_chunk() then adds the chunk to the upload.
+    """
+    max_chunk = get_config().get("MAX_CHUNK_BYTES", 1 << 20)
+    if length > max_chunk:
+        raise ValidationError(
+            {"detail": f"Chunks may be at most {max_chunk} bytes."}
+        )
+    if upload.offset + length > upload.size:
+        raise ValidationError({"detail": "Chunk exceeds the upload size."})
+
+    directory = os.path.dirname(partial_path(upload))
+    os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(
+        dir=directory, prefix=f"{upload.pk}.", suffix=".chunk"
+    )
+    received = 0
+    try:
+        with os.fdopen(fd, "wb") as chunk:
+            while received < length:
+                data = stream.read(min(READ_BYTES, length - received))
+                if not data:
+                    break
+                chunk.write(data)
+                received += len(data)
+    except BaseException:
+        os.remove(path)
+        raise
+
+    return path, received
+
+
+def append_chunk(upload, path, length):
+    """
+    Append the chunk file at path to upload if it is still at its offset.
+
+    The upload row is locked while the chunk is copied and the offset
+    advanced, so a retried chunk racing the original cannot write to the
+    partial file at the same time. Returns (upload as stored, whether
+    the chunk was appended). Once the first HEADER_BYTES have arrived,
+    an upload that does not start like an image is discarded.
+    """
+    with transaction.atomic():
+        current = ImageUpload.objects.select_for_update().filter(
+            pk=upload.pk
+        ).first()
+        if current is None or current.offset != upload.offset:
+            return current, False
+
+        with open(path, "rb") as chunk, open(
+            partial_path(current), "r+b" if current.offset else "wb"
+        ) as partial:
+            partial.seek(current.offset)
+            partial.truncate()
+            shutil.copyfileobj(chunk, partial, READ_BYTES)
+        current.offset += length
+        current.save(update_fields=["offset"])
+
+    header = min(HEADER_BYTES, current.size)
+    if upload.offset < header <= current.offset:
+        with open(partial_path(current), "rb") as partial:
+            if not is_image_header(partial.read(header)):
+                discard(current)
+                raise ValidationError({"image": ["Upload a valid image."]})
+
+    return current, True
+
+
+def finalize(upload):
+    """
+    Verify the complete file and move it onto the recipe's image.
+
+    The partial file is renamed into place on the same volume, so the
+    image appears atomically and is never copied.
+    """
+    path = partial_path(upload)
+    try:
+        with Image.open(path) as image:
+            image.verify()
+        with File(open(path, "rb")) as file:
+            metadata = images.image_metadata(file)
+    except Exception:
+        discard(upload)
+        raise ValidationError({"image": ["Upload a valid image."]})
+
+    with atomic_save():
+        recipe = Recipe.objects.select_for_update().get(pk=upload.recipe_id)
+        storage = recipe._meta.get_field("image").storage
+        release_on_commit(storage, recipe.image_files())
+        with PartialFile(open(path, "rb"), name=path) as content:
+            name = storage.save(
+                recipe_image_file_path(recipe, upload.filename), content
+            )
+        recipe.image = name
+        recipe.image_variants = {}
+        for field, value in metadata.items():
+            setattr(recipe, field, value)
+        recipe.save(update_fields=["image", "image_variants", *metadata])
+        upload.delete()
+        images.schedule_variants(recipe)
+
+    return recipe
@@ -1,31 +1,85 @@
+import os
+
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
     OpenApiParameter,
     OpenApiTypes,
 )
+from . import autocomplete, uploads
+from .mixins import (
+    CachedListMixin,
+    ConditionalGetMixin,
+    IncludedMixin,
+    normalize_ids,
+    normalize_names,
+)
+from .fastpath import ValuesSerializer
+from .pagination import RecipeCursorPagination, RecipeSearchPagination
+from .renderers import CSVRenderer, JSONLinesRenderer
 from .serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
     TagSerializer,
+    TagCountSerializer,
     IngradientSerializer,
+    IngradientCountSerializer,
+    ImageUploadSerializer,
     RecipeImageSerializer
 )
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection, transaction
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.db.models import Count, Exists, F, OuterRef, Prefetch, Q
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from user.authentication import CachedTokenAuthentication
 from core.models import (
+    ImageUpload,
     Recipe,
     Tag,
     Ingradient,
+    UserDataVersion,
 )
+from core.signals import bulk_write
+from core.storage import atomic_save
+
+
+SPARSE_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        OpenApiTypes.STR,
+        description=(
+            "comma separated list of fields to return; id is always "
+            "included."
+        ),
+    ),
+    OpenApiParameter(
+        "expand",
+        OpenApiTypes.STR,
+        description=(
+            "comma separated list of relations (tags, ingradients) to "
+            "return as objects. With fields, expand or include given, "
+            "the other relations are returned as lists of ids."
+        ),
+    ),
+]
+
+# Prefetches rendering the relations the way the .values() fast path
+# does, for loading recipes through RecipeSerializer outside the views.
+RELATION_PREFETCHES = [
+    Prefetch("tags", queryset=Tag.objects.order_by("id")),
+    Prefetch("ingradients", queryset=Ingradient.objects.order_by("id")),
+]
 
 
 @extend_schema_view(
     list=extend_schema(
-        parameters=[
+        parameters=SPARSE_PARAMETERS + [
             OpenApiParameter(
                 'tags',
                 OpenApiTypes.STR,
@@ -35,48 +89,233 @@ from core.models import (
                 "ingradients",
                 OpenApiTypes.STR,
                 description="comma separated list of IDs to filter."
-            )
+            ),
+            OpenApiParameter(
+                "match",
+                OpenApiTypes.STR, enum=["any", "all"],
+                description=(
+                    "Return recipes having any (default) or all of the "
+                    "listed tags and ingradients."
+                ),
+            ),
+            OpenApiParameter(
+                "search",
+                OpenApiTypes.STR,
+                description=(
+                    "Full-text search over title and description; "
+                    "results are ranked by relevance."
+                ),
+            ),
+            OpenApiParameter(
+                "include",
+                OpenApiTypes.STR,
+                description=(
+                    "comma separated list of relations (tags, ingradients) "
+                    "to return once each under \"included\"; recipes then "
+                    "carry their ids and the list is returned as "
+                    "\"results\"."
+                ),
+            ),
         ]
-    )
+    ),
+    retrieve=extend_schema(parameters=SPARSE_PARAMETERS),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    ConditionalGetMixin,
+    CachedListMixin,
+    IncludedMixin,
+    viewsets.ModelViewSet,
+):
     """Views for manage recipe API's."""
-    queryset = Recipe.objects.all()
+    # The search vector is only read inside the database.
+    queryset = Recipe.objects.defer("search_vector")
     serializer_class = RecipeDetailSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
+    include_serializers = {
+        "tags": TagSerializer,
+        "ingradients": IngradientSerializer,
+    }
+    bulk_max_items = 1000
+    export_chunk_size = 1000
+    cache_params = {
+        "tags": normalize_ids,
+        "ingradients": normalize_ids,
+        "match": str,
+        "search": str.strip,
+        "fields": normalize_names,
+        "expand": normalize_names,
+        "include": normalize_names,
+    }
 
     def _params_to_ints(self, qs):
         """Convert list of strings to integers."""
         return [int(str_id) for str_id in qs.split(",")]
 
+    def _filter_linked(self, queryset, field, ids, match_all=False):
+        """
+        Keep recipes linked through field to any, or every, of ids.
+
+        Uses semi-joins on the link table rather than joining it in, so
+        no DISTINCT over the fanned-out rows is needed. Matching all ids
+        counts each recipe's matching links in one grouped subquery.
+        """
+        m2m = Recipe._meta.get_field(field)
+        source, target = m2m.m2m_column_name(), m2m.m2m_reverse_name()
+        links = m2m.remote_field.through.objects.filter(
+            **{f"{target}__in": ids}
+        )
+
+        if match_all:
+            matched = (
+                links.values(source)
+                .annotate(matches=Count("id"))
+                .filter(matches=len(set(ids)))
+                .values(source)
+            )
+            return queryset.filter(id__in=matched)
+
+        return queryset.filter(
+            Exists(links.filter(**{source: OuterRef("pk")}))
+        )
+
+    @property
+    def paginator(self):
+        """Return the paginator, by page number for ranked searches."""
+        if not hasattr(self, "_paginator"):
+            if self.request.query_params.get("search", "").strip():
+                self._paginator = RecipeSearchPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def _search(self, queryset, terms):
+        """
+        Keep recipes matching the search terms, best matches first.
+
+        On PostgreSQL this probes the GIN index on the trigger-maintained
+        search_vector and ranks title hits above description hits; other
+        databases fall back to an unranked substring match.
+        """
+        if connection.vendor != "postgresql":
+            return queryset.filter(
+                Q(title__icontains=terms) | Q(description__icontains=terms)
+            ).order_by("-id")
+
+        query = SearchQuery(terms, config="english", search_type="websearch")
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F("search_vector"), query)
+        ).order_by("-rank", "-id")
+
     def get_queryset(self):
         """Rterieves recipes for authenticated users."""
         tags = self.request.query_params.get("tags")
         ings = self.request.query_params.get("ingradients")
+        match = self.request.query_params.get("match", "any")
+        if match not in ("any", "all"):
+            raise ValidationError({"match": ['Must be "any" or "all".']})
         queryset = self.queryset
 
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = self._filter_linked(
+                queryset, "tags", tag_ids, match == "all"
+            )
 
         if ings:
             ing_ids = self._params_to_ints(ings)
-            queryset = queryset.filter(ingradients__id__in=ing_ids)
+            queryset = self._filter_linked(
+                queryset, "ingradients", ing_ids, match == "all"
+            )
 
-        return queryset.filter(
-            user=self.request.user
-        ).order_by("-id").distinct()
+        queryset = queryset.filter(user=self.request.user).order_by("-id")
+
+        search = self.request.query_params.get("search", "").strip()
+        if search:
+            queryset = self._search(queryset, search)
+
+        if self.use_fast_path():
+            return queryset.values(*self.get_serializer().columns())
+
+        return queryset
+
+    def get_sparse_fields(self):
+        """
+        Return the (fields, expand) the request selected, or None.
+
+        Only list and retrieve take ?fields= and ?expand=. fields is None
+        when every field is wanted; id is always kept. Relations side-loaded
+        with ?include= are kept and rendered as ids.
+        """
+        params = self.request.query_params
+        include = self.get_included_relations()
+        if self.action not in ("list", "retrieve") or not include and (
+            "fields" not in params and "expand" not in params
+        ):
+            return None
+
+        serializer_class = self.get_serializer_class()
+        fields = set(normalize_names(params.get("fields", "")))
+        expand = set(normalize_names(params.get("expand", "")))
+        errors = {}
+        if expand & include:
+            errors["include"] = ["Relations cannot be expanded and included."]
+        unknown = sorted(fields - set(serializer_class.Meta.fields))
+        if unknown:
+            errors["fields"] = [f"Unknown fields: {', '.join(unknown)}."]
+        unknown = sorted(expand - set(serializer_class.expandable))
+        if unknown:
+            errors["expand"] = [f"Cannot expand: {', '.join(unknown)}."]
+        if errors:
+            raise ValidationError(errors)
+
+        return (fields | include | {"id"} if fields else None), expand
+
+    def use_fast_path(self):
+        """
+        Return whether this request is rendered from .values() rows.
+
+        List and retrieve always are, see recipe.fastpath; the other
+        actions write, so they load model instances.
+        """
+        return (
+            self.action in ("list", "retrieve")
+            and not getattr(self, "swagger_fake_view", False)
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        """Return the serializer, or its .values() stand-in when fast."""
+        if not self.use_fast_path():
+            return super().get_serializer(*args, **kwargs)
+
+        kwargs.setdefault("context", self.get_serializer_context())
+        return ValuesSerializer(
+            self.get_serializer_class(), *args, **kwargs
+        )
+
+    def get_serializer_context(self):
+        """Pass the requested sparse fieldset to the serializer."""
+        context = super().get_serializer_context()
+        if self.request is not None:
+            context["sparse"] = self.get_sparse_fields()
+        return context
 
     def get_serializer_class(self):
         """Returns the serializer class for request."""
-        if self.action == "list":
+        if self.action in ("list", "bulk"):
             return RecipeSerializer
         elif self.action == "upload_image":
             return RecipeImageSerializer
+        elif self.action == "image_uploads":
+            return ImageUploadSerializer
 
         return self.serializer_class
 
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe, or 304 if the client's copy is current."""
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """Create a new recipe."""
         serializer.save(user=self.request.user)
@@ -88,11 +327,259 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            with atomic_save():
+                serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=["POST"], detail=True, url_path="image-uploads")
+    def image_uploads(self, request, pk=None):
+        """Open a resumable upload of the recipe's image."""
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(recipe=recipe)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        request={"application/offset+octet-stream": OpenApiTypes.BINARY},
+        parameters=[OpenApiParameter(
+            "Upload-Offset", OpenApiTypes.INT, OpenApiParameter.HEADER,
+            description="Byte offset the chunk starts at (PATCH only).",
+        )],
+    )
+    @action(
+        methods=["GET", "PATCH", "DELETE"], detail=True,
+        url_path=r"image-uploads/(?P<upload_id>[0-9a-f-]{36})",
+    )
+    def image_upload(self, request, pk=None, upload_id=None):
+        """
+        Report (GET), continue (PATCH) or cancel (DELETE) an image upload.
+
+        PATCH streams the raw body into the upload at Upload-Offset, which
+        must equal the upload's current offset; on a mismatch the response
+        is 409 with the offset to resume from. The chunk that completes
+        the upload sets the recipe's image and returns it.
+        """
+        recipe = self.get_object()
+        upload = ImageUpload.objects.filter(
+            pk=upload_id, recipe=recipe
+        ).first()
+        if upload is None or uploads.is_expired(upload):
+            if upload is not None:
+                uploads.discard(upload)
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        if request.method == "DELETE":
+            uploads.discard(upload)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        progress = ImageUploadSerializer(upload)
+        if request.method == "GET":
+            return Response(progress.data)
+
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.headers["Content-Length"])
+        except (KeyError, ValueError):
+            raise ValidationError({"detail": (
+                "Upload-Offset and Content-Length headers are required."
+            )})
+        if offset != upload.offset:
+            return Response(progress.data, status=status.HTTP_409_CONFLICT)
+
+        path, received = uploads.receive_chunk(
+            upload, request.stream, length
+        )
+        try:
+            upload, appended = uploads.append_chunk(upload, path, received)
+        finally:
+            os.remove(path)
+        if upload is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        if not appended:
+            return Response(
+                ImageUploadSerializer(upload).data,
+                status=status.HTTP_409_CONFLICT,
+            )
+        if upload.offset < upload.size:
+            return Response(ImageUploadSerializer(upload).data)
+
+        recipe = uploads.finalize(upload)
+        serializer = RecipeImageSerializer(
+            recipe, context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
+
+    def _export_rows(self, queryset):
+        """
+        Yield a dict per recipe of queryset.
+
+        Recipes are read through a server-side cursor, chunk by chunk,
+        and each chunk's tags and ingradients are fetched in one query
+        per relation, so memory stays flat however many rows there are.
+        """
+        storage = Recipe._meta.get_field("image").storage
+        chunk = []
+        recipes = queryset.iterator(chunk_size=self.export_chunk_size)
+        for recipe in recipes:
+            chunk.append(recipe)
+            if len(chunk) < self.export_chunk_size:
+                continue
+            yield from self._export_chunk(chunk, storage)
+            chunk = []
+        yield from self._export_chunk(chunk, storage)
+
+    def _export_chunk(self, recipes, storage):
+        """Yield the export rows of a chunk of recipes."""
+        prefetch_related_objects(recipes, "tags", "ingradients")
+        for recipe in recipes:
+            yield {
+                "id": recipe.id,
+                "title": recipe.title,
+                "time_minutes": recipe.time_minutes,
+                "price": str(recipe.price),
+                "description": recipe.description,
+                "link": recipe.link,
+                "tags": [tag.name for tag in recipe.tags.all()],
+                "ingradients": [
+                    ing.name for ing in recipe.ingradients.all()
+                ],
+                "image": self.request.build_absolute_uri(
+                    storage.url(recipe.image.name)
+                ) if recipe.image else None,
+            }
+
+    @extend_schema(responses={
+        (200, "application/x-ndjson"): OpenApiTypes.STR,
+        (200, "text/csv"): OpenApiTypes.STR,
+    })
+    @action(
+        methods=["GET"], detail=False,
+        renderer_classes=[JSONLinesRenderer, CSVRenderer],
+    )
+    def export(self, request):
+        """
+        Stream the user's recipes as JSON Lines or CSV.
+
+        Pick the format with ?format=jsonl|csv or the Accept header. The
+        list filters apply; rows are ordered by id.
+        """
+        queryset = self.get_queryset().order_by("id")
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(self._export_rows(queryset)),
+            content_type=renderer.media_type,
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="recipes.{renderer.format}"'
+        )
+
+        return response
+
+    def _bulk_response(self, recipes, status_code):
+        """Serialize written recipes, in request order, with fixed queries."""
+        ids = [recipe.id for recipe in recipes]
+        fresh = Recipe.objects.prefetch_related(
+            "tags", "ingradients"
+        ).in_bulk(ids)
+        serializer = self.get_serializer([fresh[i] for i in ids], many=True)
+
+        return Response(serializer.data, status=status_code)
+
+    def _bulk_instances(self, ids):
+        """Return the user's recipes for ids, or per-item errors."""
+        valid = [
+            isinstance(i, int) and not isinstance(i, bool) for i in ids
+        ]
+        recipes = Recipe.objects.filter(user=self.request.user).in_bulk(
+            [i for i, ok in zip(ids, valid) if ok]
+        )
+        errors, seen = [], set()
+        for recipe_id, ok in zip(ids, valid):
+            if not ok:
+                errors.append({"id": ["A valid integer is required."]})
+                continue
+            if recipe_id not in recipes:
+                errors.append({"id": ["Not found."]})
+            elif recipe_id in seen:
+                errors.append({"id": ["Duplicate id."]})
+            else:
+                errors.append({})
+            seen.add(recipe_id)
+
+        return recipes, errors
+
+    def _bulk_create(self, items):
+        """Create every recipe in items."""
+        serializer = self.get_serializer(data=items, many=True)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        recipes = serializer.save(user=self.request.user)
+
+        return self._bulk_response(recipes, status.HTTP_201_CREATED)
+
+    def _bulk_update(self, items):
+        """Partially update every recipe in items, matched by id."""
+        ids = [item.get("id") if isinstance(item, dict) else None
+               for item in items]
+        recipes, errors = self._bulk_instances(ids)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(
+            [recipes[i] for i in ids], data=items, many=True, partial=True
+        )
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer.save()
+
+        return self._bulk_response(serializer.instance, status.HTTP_200_OK)
+
+    def _bulk_destroy(self, ids):
+        """Delete every recipe whose id is in ids."""
+        recipes, errors = self._bulk_instances(ids)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        with bulk_write():
+            Recipe.objects.filter(id__in=list(recipes)).delete()
+        UserDataVersion.bump(self.request.user.id)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(methods=["POST", "PATCH", "DELETE"], detail=False)
+    def bulk(self, request):
+        """
+        Create (POST), update (PATCH) or delete (DELETE) many recipes.
+
+        The body is a list of recipes, of recipes with their id, or of
+        ids respectively. The batch is written in one transaction; if any
+        item is invalid nothing is written and the response lists the
+        errors per item, in request order.
+        """
+        items = request.data
+        if not isinstance(items, list) or len(items) > self.bulk_max_items:
+            return Response(
+                {"non_field_errors": [
+                    f"Expected a list of at most {self.bulk_max_items} items."
+                ]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        handler = {
+            "POST": self._bulk_create,
+            "PATCH": self._bulk_update,
+            "DELETE": self._bulk_destroy,
+        }[request.method]
+        with transaction.atomic():
+            return handler(items)
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -101,41 +588,114 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 "assigned_only",
                 OpenApiTypes.INT, enum=[0, 1],
                 description="Filter by items assign to recipes."
-            )
+            ),
+            OpenApiParameter(
+                "with_counts",
+                OpenApiTypes.INT, enum=[0, 1],
+                description="Include the number of recipes using each item."
+            ),
         ]
     )
 )
 class BaseRecipeAttrViewSet(
+                    ConditionalGetMixin,
+                    CachedListMixin,
                     mixins.UpdateModelMixin,
                     mixins.DestroyModelMixin,
                     mixins.ListModelMixin,
                     viewsets.GenericViewSet
 ):
     """Base viewset for recipe attributes."""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    cache_params = {"assigned_only": int, "with_counts": int}
+
+    def _flag(self, name):
+        """Return whether the 0 or 1 query param name is set."""
+        value = self.request.query_params.get(name, "0")
+        if value not in ("0", "1"):
+            raise ValidationError({name: ["Must be 0 or 1."]})
+        return value == "1"
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
-        assigned_only = bool(
-            int(self.request.query_params.get("assigned_only", 0))
-        )
         queryset = self.queryset
 
-        if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+        if self._flag("assigned_only"):
+            m2m = Recipe._meta.get_field(self.recipe_field)
+            links = m2m.remote_field.through.objects.filter(
+                **{m2m.m2m_reverse_name(): OuterRef("pk")}
+            )
+            queryset = queryset.filter(Exists(links))
+
+        if self.action == "list" and self._flag("with_counts"):
+            queryset = queryset.annotate(recipe_count=Count("recipe"))
 
-        return queryset.filter(
-            user=self.request.user).order_by("-name").distinct()
+        return queryset.filter(user=self.request.user).order_by("-name")
+
+    def get_serializer_class(self):
+        """Return the serializer with recipe counts when requested."""
+        if self.action == "list" and self._flag("with_counts"):
+            return self.count_serializer_class
+
+        return self.serializer_class
+
+    @extend_schema(parameters=[
+        OpenApiParameter(
+            "q", OpenApiTypes.STR, required=True,
+            description="Prefix or approximate name to complete.",
+        ),
+        OpenApiParameter(
+            "limit", OpenApiTypes.INT,
+            description="Maximum number of suggestions.",
+        ),
+    ])
+    @action(methods=["GET"], detail=False)
+    def autocomplete(self, request):
+        """Suggest the user's names matching q, best matches first."""
+        return self.conditional(self._autocomplete, request)
+
+    def _autocomplete(self, request):
+        """Return suggestions, from the hot-prefix cache when possible."""
+        config = autocomplete.get_config()
+        term = request.query_params.get("q", "").strip()
+        if not term:
+            raise ValidationError({"q": ["This parameter is required."]})
+        try:
+            limit = int(request.query_params.get(
+                "limit", config.get("LIMIT", 10)
+            ))
+        except ValueError:
+            raise ValidationError({"limit": ["A valid integer is required."]})
+        limit = max(1, min(limit, config.get("MAX_LIMIT", 50)))
+
+        version, _ = self.get_data_version()
+        key = (
+            self.queryset.model._meta.label, request.user.id, version,
+            term.lower(), limit,
+        )
+        cache = autocomplete.get_cache()
+        data = cache.get(key)
+        if data is None:
+            data = autocomplete.suggest(
+                self.queryset.filter(user=request.user), term, limit
+            )
+            cache.set(key, data)
+
+        return Response(data)
 
 
 class TagViewSet(BaseRecipeAttrViewSet, viewsets.GenericViewSet):
     """Manage tags in the database."""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    count_serializer_class = TagCountSerializer
+    recipe_field = "tags"
 
 
 class IngradientViewSet(BaseRecipeAttrViewSet, viewsets.GenericViewSet):
     """Manage ingradients in the database."""
     queryset = Ingradient.objects.all()
     serializer_class = IngradientSerializer
+    count_serializer_class = IngradientCountSerializer
+    recipe_field = "ingradients"
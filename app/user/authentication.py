@@ -0,0 +1,152 @@
+"""
+Authentication for the API views.
+"""
+import hashlib
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.cache import LRUCache
+
+
+class TokenCache:
+    """
+    Two-tier cache of token key -> the token's and its user's fields.
+
+    The first tier is an in-process LRU; the optional second tier is the
+    Django cache named by TOKEN_AUTH_CACHE["SHARED_CACHE"], shared by all
+    workers. Only USER_FIELDS are cached, never the password hash, and
+    each hit builds a fresh User whose other fields are deferred, so
+    they load on access and saving it writes only what was loaded or
+    changed. Keys are SHA-256 digests so raw tokens never reach the
+    shared cache.
+    """
+    USER_FIELDS = ("id", "email", "name", "is_active", "is_staff",
+                   "is_superuser")
+
+    def __init__(self):
+        self._local = None
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        """Return the TOKEN_AUTH_CACHE setting."""
+        return getattr(settings, "TOKEN_AUTH_CACHE", {})
+
+    @property
+    def local(self):
+        """Return the in-process tier, created on first use."""
+        if self._local is None:
+            with self._lock:
+                if self._local is None:
+                    self._local = LRUCache(
+                        self.config.get("MAX_ENTRIES", 10000),
+                        self.config.get("TTL", 60),
+                    )
+        return self._local
+
+    @property
+    def shared(self):
+        """Return the shared Django cache tier, if configured."""
+        alias = self.config.get("SHARED_CACHE")
+        return caches[alias] if alias else None
+
+    @staticmethod
+    def digest(key):
+        """Return the cache key for a token key."""
+        return "auth-token:" + hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        """Return the cached (user, token) for key, or None."""
+        digest = self.digest(key)
+        data = self.local.get(digest)
+        if data is None and self.shared is not None:
+            data = self.shared.get(digest)
+            if data is not None:
+                self.local.set(digest, data)
+        if data is None:
+            return None
+
+        user_fields, created = data
+        user = self.build(get_user_model(), user_fields)
+        token = self.build(
+            Token, {"key": key, "user_id": user.pk, "created": created}
+        )
+        token.user = user
+
+        return user, token
+
+    @staticmethod
+    def build(model, fields):
+        """Return a model instance loaded with only the given fields."""
+        names = [
+            f.attname for f in model._meta.concrete_fields
+            if f.attname in fields
+        ]
+        return model.from_db(
+            router.db_for_read(model), names, [fields[n] for n in names]
+        )
+
+    def set(self, key, user, token):
+        """Cache (user, token) for key in both tiers."""
+        digest = self.digest(key)
+        data = (
+            {name: getattr(user, name) for name in self.USER_FIELDS},
+            token.created,
+        )
+        self.local.set(digest, data)
+        if self.shared is not None:
+            self.shared.set(digest, data, self.local.ttl)
+
+    def delete(self, *keys):
+        """Invalidate keys in both tiers."""
+        digests = [self.digest(key) for key in keys]
+        for digest in digests:
+            self.local.delete(digest)
+        if digests and self.shared is not None:
+            self.shared.delete_many(digests)
+
+    def clear(self):
+        """Drop the in-process tier."""
+        self.local.clear()
+
+
+token_cache = TokenCache()
+
+
+def invalidate_token(key):
+    """Forget a single token."""
+    token_cache.delete(key)
+
+
+def invalidate_user(user):
+    """Forget every token of user."""
+    token_cache.delete(
+        *Token.objects.filter(user=user).values_list("key", flat=True)
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that caches the token lookup.
+
+    Only successful lookups are cached. Other workers' in-process tiers
+    are not notified of invalidations and may serve a stale entry for
+    at most TOKEN_AUTH_CACHE["TTL"] seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        """Return (user, token) for key, from the cache when possible."""
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user, token)
+
+        return user, token
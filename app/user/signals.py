@@ -0,0 +1,22 @@
+"""
+Signal handlers for the user app.
+"""
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import invalidate_token, invalidate_user
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    """Stop authenticating with a deleted token."""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_updated_user_tokens(sender, instance, created, **kwargs):
+    """Drop cached copies of a user that was updated or deactivated."""
+    if not created:
+        invalidate_user(instance)
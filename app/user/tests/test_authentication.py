@@ -0,0 +1,131 @@
+"""
+Tests for the cached token authentication.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.tests.query_budget import count_queries
+from user.authentication import token_cache
+
+ME_URL = reverse("user:me")
+
+
+def create_user(**params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating API requests with a cached token."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = create_user(
+            email="test@example.com", password="testpass123", name="Test",
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_token_lookup_cached(self):
+        """Test repeated requests skip the token query."""
+        first = count_queries(lambda: self.client.get(ME_URL))
+        second = count_queries(lambda: self.client.get(ME_URL))
+
+        self.assertEqual(first, 1)
+        self.assertEqual(second, 0)
+
+    def test_invalid_token_rejected(self):
+        """Test an unknown token is rejected."""
+        self.client.credentials(HTTP_AUTHORIZATION="Token invalid")
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """Test a cached token stops working once deleted."""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test a cached user stops authenticating once deactivated."""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_invalidates(self):
+        """Test updating the user through the API refreshes the cache."""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {"name": "Updated"})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data["name"], "Updated")
+
+    @override_settings(
+        TOKEN_AUTH_CACHE={"SHARED_CACHE": "default"},
+        CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }},
+    )
+    def test_shared_tier_refills_local(self):
+        """Test a miss in the local tier is served by the shared tier."""
+        self.client.get(ME_URL)
+        token_cache.clear()
+
+        queries = count_queries(lambda: self.client.get(ME_URL))
+
+        self.assertEqual(queries, 0)
+        self.token.delete()
+        token_cache.clear()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(
+        TOKEN_AUTH_CACHE={"SHARED_CACHE": "default"},
+        CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }},
+    )
+    def test_password_hash_not_cached(self):
+        """Test the cached entry never holds the password hash."""
+        self.client.get(ME_URL)
+
+        digest = token_cache.digest(self.token.key)
+        for data in (token_cache.local.get(digest),
+                     token_cache.shared.get(digest)):
+            self.assertNotIn(self.user.password, repr(data))
+
+    def test_cached_user_update_keeps_password(self):
+        """Test updating a cached user leaves its password intact."""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {"name": "Updated"})
+        self.user.refresh_from_db()
+
+        self.assertTrue(self.user.check_password("testpass123"))
+
+    def test_cached_user_password_change(self):
+        """Test a cached user can still change their password."""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {"password": "newpass456"})
+        self.user.refresh_from_db()
+
+        self.assertTrue(self.user.check_password("newpass456"))
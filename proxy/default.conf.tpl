@@ -7,6 +7,23 @@ server { # this block defines the settings for the server or group of servers
         alias /vol/static; # path where nginx looks for static files
     }
 
+    location /static/static { # collected static files
+        root /vol; # /static/static/<name> is /vol/static/static/<name>
+        gzip_static on; # send <name>.gz, written by collectstatic, to clients accepting gzip
+        gzip_vary on;
+        # <name>.br is written too; with the ngx_brotli module, add: brotli_static on;
+
+        location ~ "\.[0-9a-f]{12}\.\w+$" { # hashed names change whenever the content does
+            add_header Cache-Control "public, max-age=31536000, immutable";
+        }
+    }
+
+    location /static/media/blobs { # content-addressed uploads, named by the hash of their bytes
+        alias /vol/static/media/blobs;
+        # a blob's bytes never change, so clients and CDNs may cache it forever
+        add_header Cache-Control "public, max-age=31536000, immutable";
+    }
+
     location / { # location directive for the root path
         uwsgi_pass            ${APP_HOST}:${APP_PORT}; # pass request to the uwsgi server for processing
         include               /etc/nginx/uwsgi_params;